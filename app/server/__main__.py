@@ -12,29 +12,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import contextlib
 import logging
-import httpx
+import os
+import time
 
 import click
-from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore, BasePushNotificationSender, InMemoryPushNotificationConfigStore
-from a2a.types import AgentCapabilities, AgentCard, AgentSkill
-from a2ui.a2ui_extension import get_a2ui_agent_extension
-from starlette.applications import Starlette
-from starlette.middleware.cors import CORSMiddleware
-from starlette.staticfiles import StaticFiles
-from starlette.responses import JSONResponse
-from starlette.requests import Request
-from agent.graph_executor import RestaurantGraphExecutor
-from agent.graph.restaurant_graph import RestaurantGraph
+
+from agent.startup import Readiness, StartupProfiler
+
+# Cold start is measured from here; --profile-startup prints the breakdown once warmup is done
+PROFILER = StartupProfiler(time.perf_counter())
+
+with PROFILER.phase("import a2a"):
+    import httpx
+    from a2a.server.apps import A2AStarletteApplication
+    from a2a.server.request_handlers import DefaultRequestHandler
+    from a2a.server.tasks import InMemoryTaskStore, BasePushNotificationSender, InMemoryPushNotificationConfigStore
+    from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+    from a2ui.a2ui_extension import get_a2ui_agent_extension
+with PROFILER.phase("import starlette"):
+    from starlette.applications import Starlette
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import JSONResponse
+    from starlette.requests import Request
 
 from dotenv import load_dotenv
+# Before the agent modules, several of which read their settings at import time
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
+with PROFILER.phase("import agent server modules"):
+    # Only the light modules: the graph stack (langchain, langgraph, OCI) is imported during warmup
+    from agent.admission import GOVERNOR
+    from agent.compression import CompressionMiddleware
+    from agent.graph_executor import RestaurantGraphExecutor
+    from agent.graph.struct import SUPPORTED_CONTENT_TYPES
+    from agent.image_variants import IMAGE_VARIANTS
+    from agent.metrics import METRICS
+    from agent.static_files import CachedStaticFiles
+    from agent.structured_logging import REQUEST_LOG, configure_logging
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
+# Heavy modules imported during warmup, timed one by one in the startup profile
+WARMUP_IMPORTS = (
+    "langgraph.graph",
+    "langchain.agents",
+    "langchain_oci",
+    "jsonschema",
+    "agent.prompt_builder",
+    "agent.graph.restaurant_graph",
+)
+
 
 class MissingAPIKeyError(Exception):
     """Exception for missing API key."""
@@ -43,7 +74,8 @@ class MissingAPIKeyError(Exception):
 @click.command()
 @click.option("--host", default="localhost")
 @click.option("--port", default=10002)
-def main(host, port):
+@click.option("--profile-startup", is_flag=True, help="Print cold-start time by import and init phase once ready.")
+def main(host, port, profile_startup):
     try:
         capabilities = AgentCapabilities(
             streaming=True,
@@ -67,13 +99,15 @@ def main(host, port):
             description="This agent helps find restaurants based on user criteria.",
             url=agent_base_url,
             version="1.0.0",
-            default_input_modes=RestaurantGraph.SUPPORTED_CONTENT_TYPES,
-            default_output_modes=RestaurantGraph.SUPPORTED_CONTENT_TYPES,
+            default_input_modes=SUPPORTED_CONTENT_TYPES,
+            default_output_modes=SUPPORTED_CONTENT_TYPES,
             capabilities=capabilities,
             skills=[skill],
         )
 
-        agent_executor = RestaurantGraphExecutor(base_url=agent_base_url)
+        with PROFILER.phase("init executor"):
+            agent_executor = RestaurantGraphExecutor(base_url=agent_base_url)
+        readiness = Readiness(PROFILER.started_at)
 
         httpx_client = httpx.AsyncClient()
         agent_push_config_store = InMemoryPushNotificationConfigStore()
@@ -88,10 +122,44 @@ def main(host, port):
         agent_server = A2AStarletteApplication(
             agent_card=agent_card, http_handler=agent_request_handler
         )
-        agent_app = agent_server.build()
+        with PROFILER.phase("init a2a app"):
+            agent_app = agent_server.build()
+
+        #region warmup
+        def import_graph_stack():
+            for module in WARMUP_IMPORTS:
+                PROFILER.import_module(module)
+
+        async def warmup():
+            try:
+                await asyncio.to_thread(import_graph_stack)
+                with PROFILER.phase("build graphs"):
+                    await agent_executor.warmup()
+                readiness.mark_ready()
+            except Exception as e:
+                readiness.mark_failed(e)
+            if IMAGE_VARIANTS.enabled and os.getenv("IMAGE_VARIANTS_WARM", "true").lower() == "true":
+                # Not needed for readiness (variants are also built on first use), so it runs last
+                with PROFILER.phase("warm image variants"):
+                    await asyncio.to_thread(IMAGE_VARIANTS.warm)
+            if profile_startup:
+                click.echo("\n--- Startup profile ---\n" + PROFILER.report(readiness.snapshot()["startup_s"]))
+
+        serve_started = None
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            PROFILER.record("uvicorn startup", serve_started)
+            # Bind first, then warm up in the background; /agent/ready reports when it is done
+            warmup_task = asyncio.create_task(warmup())
+            yield
+            warmup_task.cancel()
+            # Let a build that is still running unwind before the loop closes
+            with contextlib.suppress(asyncio.CancelledError):
+                await warmup_task
 
         #region main app setup
-        main_app = Starlette()
+        main_app = Starlette(lifespan=lifespan)
 
         main_app.add_middleware(
             CORSMiddleware,
@@ -102,16 +170,31 @@ def main(host, port):
         )
 
         #region config endpoints
+        def config_headers() -> dict:
+            active = agent_executor.config_status()["active"]
+            headers = {"X-Config-Version": str(active["version"])}
+            if active["build_s"] is not None:
+                headers["X-Config-Build-Seconds"] = str(active["build_s"])
+            return headers
+
         async def get_config(request: Request):
             config = agent_executor.get_config()
-            return JSONResponse(config)
+            return JSONResponse(config, headers=config_headers())
+
+        async def get_config_status(request: Request):
+            return JSONResponse(agent_executor.config_status())
 
         async def post_config(request: Request):
             try:
                 data = await request.json()
                 success, error = agent_executor.update_config(data)
                 if success:
-                    return JSONResponse({"status": "success", "message": "Configuration updated"})
+                    # Built in the background; poll /agent/config/status for the swap
+                    version = agent_executor.config_status()["pending_version"]
+                    return JSONResponse(
+                        {"status": "success", "message": f"Configuration version {version} is building", "version": version},
+                        status_code=202,
+                    )
                 else:
                     return JSONResponse({"status": "error", "message": error}, status_code=400)
             except Exception as e:
@@ -119,17 +202,59 @@ def main(host, port):
 
         async def delete_config(request: Request):
             agent_executor.reset_config()
-            return JSONResponse({"status": "success", "message": "Configuration reset to default"})
+            version = agent_executor.config_status()["pending_version"]
+            return JSONResponse(
+                {"status": "success", "message": f"Configuration reset to default as version {version}", "version": version},
+                status_code=202,
+            )
+
+        async def get_metrics(request: Request):
+            return JSONResponse({**METRICS.snapshot(), "admission": GOVERNOR.snapshot()})
+
+        #region debug endpoints
+        admin_token = os.getenv("ADMIN_TOKEN", "")
+
+        def is_admin(request: Request) -> bool:
+            # With no token configured, debug data is only served to local callers
+            if admin_token:
+                return request.headers.get("Authorization", "") == f"Bearer {admin_token}"
+            return request.client is not None and request.client.host in ("127.0.0.1", "::1", "localhost")
+
+        async def get_recent_requests(request: Request):
+            if not is_admin(request):
+                return JSONResponse({"status": "error", "message": "Forbidden"}, status_code=403)
+            try:
+                limit = int(request.query_params.get("limit", "50"))
+            except ValueError:
+                return JSONResponse({"status": "error", "message": "limit must be an integer"}, status_code=400)
+            return JSONResponse({"requests": REQUEST_LOG.recent(max(1, limit))})
+
+        async def get_ready(request: Request):
+            return JSONResponse(readiness.snapshot(), status_code=200 if readiness.ready else 503)
 
         #region app mount
+        main_app.add_route("/agent/ready", get_ready, methods=["GET"])
+        main_app.add_route("/agent/metrics", get_metrics, methods=["GET"])
+        main_app.add_route("/agent/debug/requests", get_recent_requests, methods=["GET"])
+        main_app.add_route("/agent/config/status", get_config_status, methods=["GET"])
         main_app.add_route("/agent/config", get_config, methods=["GET"])
         main_app.add_route("/agent/config", post_config, methods=["POST"])
         main_app.add_route("/agent/config", delete_config, methods=["DELETE"])
 
-        main_app.mount("/static", StaticFiles(directory="images"), name="static")
-        main_app.mount("/agent", agent_app)
+        # Resized thumbnails live under content-hash names; mounted first so /static doesn't shadow them
+        IMAGE_VARIANTS.cache_dir.mkdir(parents=True, exist_ok=True)
+        main_app.mount(
+            IMAGE_VARIANTS.variants_path,
+            CachedStaticFiles(directory=str(IMAGE_VARIANTS.cache_dir), immutable=True),
+            name="static-variants",
+        )
+        main_app.mount("/static", CachedStaticFiles(directory="images"), name="static")
+        # gzip/brotli for JSON-RPC replies and SSE streams (flushed per event)
+        main_app.mount("/agent", CompressionMiddleware(agent_app))
 
-        import uvicorn
+        with PROFILER.phase("import uvicorn"):
+            import uvicorn
+        serve_started = time.perf_counter()
         uvicorn.run(main_app, host=host, port=port)
     except MissingAPIKeyError as e:
         logger.error(f"Error: {e}")
@@ -0,0 +1,252 @@
+"""Deterministic A2UI message builders.
+
+These mirror the templates in `a2ui_components.RESTAURANT_UI_EXAMPLES` so the
+server can render a UI without an LLM round trip, e.g. when the request's time
+budget is exhausted.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from agent import json_codec
+
+_STYLES = {"primaryColor": "#FF0000", "font": "Roboto"}
+
+
+def value_entry(key: str, value: Any) -> Dict[str, Any]:
+    """Encode a Python value as an A2UI data model entry."""
+    if isinstance(value, bool):
+        return {"key": key, "valueBoolean": value}
+    if isinstance(value, (int, float)):
+        return {"key": key, "valueNumber": value}
+    if isinstance(value, dict):
+        return {"key": key, "valueMap": [value_entry(str(k), v) for k, v in value.items() if v is not None]}
+    if isinstance(value, list):
+        return {"key": key, "valueMap": [value_entry(str(i), v) for i, v in enumerate(value) if v is not None]}
+    return {"key": key, "valueString": "" if value is None else str(value)}
+
+
+def decode_entries(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Inverse of `value_entry` for a list of data model entries."""
+    out: Dict[str, Any] = {}
+    for entry in entries or []:
+        if not isinstance(entry, dict) or "key" not in entry:
+            continue
+        if "valueMap" in entry:
+            out[entry["key"]] = decode_entries(entry["valueMap"])
+        else:
+            for field in ("valueString", "valueNumber", "valueBoolean"):
+                if field in entry:
+                    out[entry["key"]] = entry[field]
+                    break
+    return out
+
+
+def restaurant_card_fields(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a formatter item onto the field names the list templates bind to."""
+    fields = {
+        "name": item.get("name") or "Unknown",
+        "rating": item.get("rating") or "",
+        "detail": item.get("detail") or item.get("caption") or "",
+        "infoLink": item.get("infoLink") or "",
+        "imageUrl": item.get("imageUrl") or item.get("imageURL") or "",
+        "address": item.get("address") or item.get("location") or "",
+    }
+    for coord in ("lat", "lng"):
+        if isinstance(item.get(coord), (int, float)):
+            fields[coord] = item[coord]
+    return fields
+
+
+def restaurant_list_messages(items: List[Dict[str, Any]], title: str = "Top Restaurants", surface_id: str = "default") -> List[Dict[str, Any]]:
+    """Single column restaurant list with map, as in SINGLE_COLUMN_LIST_EXAMPLE."""
+    components = [
+        {"id": "root-column", "component": {"Column": {"children": {"explicitList": ["title-heading", "item-list", "map-view"]}}}},
+        {"id": "map-view", "component": {"Map": {"dataPath": "/items", "height": "360px"}}},
+        {"id": "title-heading", "component": {"Text": {"usageHint": "h1", "text": {"path": "title"}}}},
+        {"id": "item-list", "component": {"List": {"direction": "vertical", "children": {"template": {"componentId": "item-card-template", "dataBinding": "/items"}}}}},
+        {"id": "item-card-template", "component": {"Card": {"child": "card-layout"}}},
+        {"id": "card-layout", "component": {"Row": {"children": {"explicitList": ["template-image", "card-details"]}}}},
+        {"id": "template-image", "weight": 1, "component": {"Image": {"url": {"path": "imageUrl"}}}},
+        {"id": "card-details", "weight": 2, "component": {"Column": {"children": {"explicitList": ["template-name", "template-rating", "template-detail", "template-link", "template-book-button"]}}}},
+        {"id": "template-name", "component": {"Text": {"usageHint": "h3", "text": {"path": "name"}}}},
+        {"id": "template-rating", "component": {"Text": {"text": {"path": "rating"}}}},
+        {"id": "template-detail", "component": {"Text": {"text": {"path": "detail"}}}},
+        {"id": "template-link", "component": {"Text": {"text": {"path": "infoLink"}}}},
+        {"id": "template-book-button", "component": {"Button": {"child": "book-now-text", "primary": True, "action": {"name": "book_restaurant", "context": [
+            {"key": "restaurantName", "value": {"path": "name"}},
+            {"key": "imageUrl", "value": {"path": "imageUrl"}},
+            {"key": "address", "value": {"path": "address"}},
+        ]}}}},
+        {"id": "book-now-text", "component": {"Text": {"text": {"literalString": "Book Now"}}}},
+    ]
+    item_entries = items_value_map([restaurant_card_fields(it) for it in items if isinstance(it, dict)])
+    return [
+        {"beginRendering": {"surfaceId": surface_id, "root": "root-column", "styles": dict(_STYLES)}},
+        {"surfaceUpdate": {"surfaceId": surface_id, "components": components}},
+        {"dataModelUpdate": {"surfaceId": surface_id, "path": "/", "contents": [
+            {"key": "title", "valueString": title},
+            {"key": "items", "valueMap": item_entries},
+        ]}},
+    ]
+
+
+def items_value_map(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Items as native valueMap entries keyed by index, so both template
+    bindings over `/items` and explicit `/items/0/name` paths resolve."""
+    return [value_entry(str(i), item) for i, item in enumerate(items)]
+
+
+def _surface_id(ui_msgs: List[Dict[str, Any]]) -> str:
+    # Find surfaceId from any existing message; fallback to "default".
+    for m in ui_msgs:
+        if not isinstance(m, dict):
+            continue
+        sid = (
+            (m.get("beginRendering") or {}).get("surfaceId")
+            or (m.get("surfaceUpdate") or {}).get("surfaceId")
+            or (m.get("dataModelUpdate") or {}).get("surfaceId")
+        )
+        if isinstance(sid, str) and sid:
+            return sid
+    return "default"
+
+
+def _root_update(ui_msgs: List[Dict[str, Any]], surface_id: str) -> Optional[Dict[str, Any]]:
+    for m in ui_msgs:
+        update = m.get("dataModelUpdate") if isinstance(m, dict) else None
+        if isinstance(update, dict) and update.get("surfaceId") == surface_id and update.get("path", "/") in ("", "/"):
+            return update
+    return None
+
+
+def inject_items(ui_msgs: List[Dict[str, Any]], formatter_items: List[Dict[str, Any]], encoding: str = "native") -> List[Dict[str, Any]]:
+    """Make sure `/items` carries every formatter field the Map needs (lat/lng, links).
+
+    "json" appends a dataModelUpdate holding the items as one JSON string at
+    `/items`, which duplicates the LLM's valueMap and is re-parsed client side.
+    "native" merges the formatter fields into the LLM's own `items` valueMap
+    (its values win) so every item is sent exactly once.
+    """
+    surface_id = _surface_id(ui_msgs)
+    if encoding == "json":
+        # We use the special `{ key: '.', valueString: JSON }` convention at a non-root path
+        # so the client sets the primitive value at that exact location.
+        return ui_msgs + [{
+            "dataModelUpdate": {
+                "surfaceId": surface_id,
+                "path": "/items",
+                "contents": [{"key": ".", "valueString": json_codec.dumps(formatter_items, ensure_ascii=False)}],
+            }
+        }]
+
+    root = _root_update(ui_msgs, surface_id)
+    contents = root.get("contents") if root is not None else None
+    llm_items: List[Dict[str, Any]] = []
+    items_index = None
+    if isinstance(contents, list):
+        for index, entry in enumerate(contents):
+            if isinstance(entry, dict) and entry.get("key") == "items" and "valueMap" in entry:
+                llm_items = [v for v in decode_entries(entry["valueMap"]).values() if isinstance(v, dict)]
+                items_index = index
+                break
+
+    # The LLM may reorder or drop cards, so its entries are matched by place, not position
+    llm_by_key: Dict[str, Dict[str, Any]] = {}
+    for llm_item in llm_items:
+        for key in _item_keys(llm_item):
+            llm_by_key.setdefault(key, llm_item)
+
+    merged = []
+    for i, item in enumerate(formatter_items):
+        if not isinstance(item, dict):
+            continue
+        fields = restaurant_card_fields(item)
+        keys = _item_keys(item)
+        if keys:
+            match = next((llm_by_key[key] for key in keys if key in llm_by_key), None)
+        else:
+            match = llm_items[i] if i < len(llm_items) else None
+        if match is not None:
+            fields.update(match)
+        merged.append(fields)
+
+    items_entry = {"key": "items", "valueMap": items_value_map(merged)}
+    if items_index is not None:
+        contents[items_index] = items_entry
+    elif isinstance(contents, list):
+        contents.append(items_entry)
+    else:
+        return ui_msgs + [{"dataModelUpdate": {"surfaceId": surface_id, "path": "/items", "contents": items_value_map(merged)}}]
+    return ui_msgs
+
+
+def _item_keys(item: Dict[str, Any]) -> List[str]:
+    """Stable identities of a restaurant across formatter and LLM output: placeId, then normalized name."""
+    keys = []
+    if item.get("placeId"):
+        keys.append(f"id:{item['placeId']}")
+    name = re.sub(r"[^a-z0-9]+", " ", str(item.get("name") or "").lower()).strip()
+    if name:
+        keys.append(f"name:{name}")
+    return keys
+
+
+def booking_form_messages(restaurant_name: str, address: str = "", image_url: str = "", surface_id: str = "booking-form") -> List[Dict[str, Any]]:
+    """Reservation form for one restaurant, as in BOOKING_FORM_EXAMPLE."""
+    components = [
+        {"id": "booking-form-column", "component": {"Column": {"children": {"explicitList": ["booking-title", "restaurant-image", "restaurant-address", "party-size-field", "datetime-field", "dietary-field", "submit-button"]}}}},
+        {"id": "booking-title", "component": {"Text": {"usageHint": "h2", "text": {"path": "title"}}}},
+        {"id": "restaurant-image", "component": {"Image": {"url": {"path": "imageUrl"}}}},
+        {"id": "restaurant-address", "component": {"Text": {"text": {"path": "address"}}}},
+        {"id": "party-size-field", "component": {"TextField": {"label": {"literalString": "Party Size"}, "text": {"path": "partySize"}, "type": "number"}}},
+        {"id": "datetime-field", "component": {"DateTimeInput": {"label": {"literalString": "Date & Time"}, "value": {"path": "reservationTime"}, "enableDate": True, "enableTime": True}}},
+        {"id": "dietary-field", "component": {"TextField": {"label": {"literalString": "Dietary Requirements"}, "text": {"path": "dietary"}}}},
+        {"id": "submit-button", "component": {"Button": {"child": "submit-reservation-text", "action": {"name": "submit_booking", "context": [
+            {"key": "restaurantName", "value": {"path": "restaurantName"}},
+            {"key": "partySize", "value": {"path": "partySize"}},
+            {"key": "reservationTime", "value": {"path": "reservationTime"}},
+            {"key": "dietary", "value": {"path": "dietary"}},
+            {"key": "imageUrl", "value": {"path": "imageUrl"}},
+        ]}}}},
+        {"id": "submit-reservation-text", "component": {"Text": {"text": {"literalString": "Submit Reservation"}}}},
+    ]
+    return [
+        {"beginRendering": {"surfaceId": surface_id, "root": "booking-form-column", "styles": dict(_STYLES)}},
+        {"surfaceUpdate": {"surfaceId": surface_id, "components": components}},
+        {"dataModelUpdate": {"surfaceId": surface_id, "path": "/", "contents": [
+            {"key": "title", "valueString": f"Book a Table at {restaurant_name}"},
+            {"key": "address", "valueString": address},
+            {"key": "restaurantName", "valueString": restaurant_name},
+            {"key": "partySize", "valueString": "2"},
+            {"key": "reservationTime", "valueString": ""},
+            {"key": "dietary", "valueString": ""},
+            {"key": "imageUrl", "valueString": image_url},
+        ]}},
+    ]
+
+
+def confirmation_messages(restaurant_name: str, party_size: str, reservation_time: str, dietary: str = "", image_url: str = "", surface_id: str = "confirmation") -> List[Dict[str, Any]]:
+    """Booking confirmation card, as in CONFIRMATION_EXAMPLE."""
+    components = [
+        {"id": "confirmation-card", "component": {"Card": {"child": "confirmation-column"}}},
+        {"id": "confirmation-column", "component": {"Column": {"children": {"explicitList": ["confirm-title", "confirm-image", "divider1", "confirm-details", "divider2", "confirm-dietary", "divider3", "confirm-text"]}}}},
+        {"id": "confirm-title", "component": {"Text": {"usageHint": "h2", "text": {"path": "title"}}}},
+        {"id": "confirm-image", "component": {"Image": {"url": {"path": "imageUrl"}}}},
+        {"id": "confirm-details", "component": {"Text": {"text": {"path": "bookingDetails"}}}},
+        {"id": "confirm-dietary", "component": {"Text": {"text": {"path": "dietaryRequirements"}}}},
+        {"id": "confirm-text", "component": {"Text": {"usageHint": "h5", "text": {"literalString": "We look forward to seeing you!"}}}},
+        {"id": "divider1", "component": {"Divider": {}}},
+        {"id": "divider2", "component": {"Divider": {}}},
+        {"id": "divider3", "component": {"Divider": {}}},
+    ]
+    return [
+        {"beginRendering": {"surfaceId": surface_id, "root": "confirmation-card", "styles": dict(_STYLES)}},
+        {"surfaceUpdate": {"surfaceId": surface_id, "components": components}},
+        {"dataModelUpdate": {"surfaceId": surface_id, "path": "/", "contents": [
+            {"key": "title", "valueString": f"Booking at {restaurant_name}"},
+            {"key": "bookingDetails", "valueString": f"{party_size} people at {reservation_time}"},
+            {"key": "dietaryRequirements", "valueString": f"Dietary Requirements: {dietary or 'None'}"},
+            {"key": "imageUrl", "valueString": image_url},
+        ]}},
+    ]
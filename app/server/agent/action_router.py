@@ -0,0 +1,62 @@
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from agent import json_codec
+from agent.a2ui_templates import booking_form_messages, confirmation_messages
+
+logger = logging.getLogger(__name__)
+
+# Handler signature: (action context, use_ui) -> final content in the graph's
+# "text ---a2ui_JSON--- json" format (or plain text when the UI is off)
+ActionHandler = Callable[[Dict[str, Any], bool], str]
+
+
+def _ui_content(text: str, messages: list, use_ui: bool) -> str:
+    if not use_ui:
+        return text
+    return f"{text}\n---a2ui_JSON---\n{json_codec.dumps(messages, ensure_ascii=False)}"
+
+
+def handle_book_restaurant(ctx: Dict[str, Any], use_ui: bool) -> str:
+    restaurant_name = ctx.get("restaurantName", "Unknown Restaurant")
+    address = ctx.get("address", "Address not provided")
+    image_url = ctx.get("imageUrl", "")
+    if not use_ui:
+        return (
+            f"Let's book a table at {restaurant_name} ({address}). "
+            "How many people, what date and time, and any dietary requirements?"
+        )
+    return _ui_content(
+        f"Great choice! Fill in the details to book a table at {restaurant_name}.",
+        booking_form_messages(restaurant_name, address, image_url),
+        use_ui,
+    )
+
+
+def handle_submit_booking(ctx: Dict[str, Any], use_ui: bool) -> str:
+    restaurant_name = ctx.get("restaurantName", "Unknown Restaurant")
+    party_size = ctx.get("partySize", "Unknown Size")
+    reservation_time = ctx.get("reservationTime", "Unknown Time")
+    dietary = ctx.get("dietary", "None")
+    image_url = ctx.get("imageUrl", "")
+    return _ui_content(
+        f"Your table at {restaurant_name} for {party_size} people at {reservation_time} is booked. "
+        f"Dietary requirements: {dietary or 'None'}.",
+        confirmation_messages(restaurant_name, party_size, reservation_time, dietary, image_url),
+        use_ui,
+    )
+
+
+ACTION_HANDLERS: Dict[str, ActionHandler] = {
+    "book_restaurant": handle_book_restaurant,
+    "submit_booking": handle_submit_booking,
+}
+
+
+def route_action(action: Optional[str], ctx: Dict[str, Any], use_ui: bool) -> Optional[str]:
+    """Render a known A2UI action directly; None means the graph should handle it."""
+    handler = ACTION_HANDLERS.get(action or "")
+    if handler is None:
+        return None
+    logger.info("--- ACTION_ROUTER: Handling '%s' without the graph ---", action)
+    return handler(ctx or {}, use_ui)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Longest a request waits for a graph slot before it is turned away
+ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "10"))
+
+# Backends are "graph", "apify" and "oci:<model>"; limits apply per backend, so each OCI model gets its own
+_DEFAULT_LIMITS = {"graph": 16, "apify": 4, "oci": 8}
+_DEFAULT_QUEUES = {"graph": 32, "apify": 16, "oci": 32}
+
+
+def _parse_limits(raw: str, defaults: Dict[str, int]) -> Dict[str, int]:
+    """Parse `backend=n,backend=n` overrides, e.g. ADMISSION_LIMITS=graph=16,oci=8,oci:xai.grok-4=4."""
+    limits = dict(defaults)
+    for pair in raw.split(","):
+        if "=" not in pair:
+            continue
+        backend, value = pair.split("=", 1)
+        try:
+            limits[backend.strip()] = max(0, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+ADMISSION_LIMITS = _parse_limits(os.getenv("ADMISSION_LIMITS", ""), _DEFAULT_LIMITS)
+ADMISSION_QUEUES = _parse_limits(os.getenv("ADMISSION_QUEUES", ""), _DEFAULT_QUEUES)
+
+
+class Overloaded(Exception):
+    """A backend's concurrency limit and wait queue are both full."""
+
+    def __init__(self, backend: str, retry_after_s: int, reason: str = "queue_full"):
+        self.backend = backend
+        self.retry_after_s = retry_after_s
+        self.reason = reason
+        super().__init__(f"{backend} is overloaded ({reason}); retry in {retry_after_s}s")
+
+
+class Limiter:
+    """At most `limit` concurrent holders, at most `max_queue` waiting, first come first served."""
+
+    def __init__(self, backend: str, limit: int, max_queue: int):
+        self.backend = backend
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queued caller would get a slot, from recent hold times."""
+        held = METRICS.percentile("admission.hold_s", 50, backend=self.backend) or 5.0
+        return max(1, min(60, math.ceil(held * (self.waiting + 1) / max(1, self.limit))))
+
+    def _reject(self, reason: str) -> Overloaded:
+        METRICS.incr("admission.rejected", backend=self.backend, reason=reason)
+        error = Overloaded(self.backend, self.retry_after(), reason)
+        logger.info("Rejecting %s call: %s", self.backend, error)
+        return error
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        started = time.monotonic()
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            METRICS.observe("admission.queue_s", 0.0, backend=self.backend)
+            return
+        if self.waiting >= self.max_queue:
+            raise self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            # release() may have handed over a slot just as the wait timed out; keep it then
+            if not self._granted(waiter):
+                self._leave_queue(waiter)
+                raise self._reject("wait_timeout")
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                self.release()
+            else:
+                self._leave_queue(waiter)
+            raise
+        # release() handed its slot to this waiter, so in_flight already counts it
+        METRICS.observe("admission.queue_s", time.monotonic() - started, backend=self.backend)
+
+    @staticmethod
+    def _granted(waiter: asyncio.Future) -> bool:
+        return waiter.done() and not waiter.cancelled()
+
+    def _leave_queue(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class Governor:
+    """Per-backend concurrency limits shared by every request in the process."""
+
+    def __init__(self, limits: Dict[str, int], queues: Dict[str, int], enabled: bool = True):
+        self.limits = limits
+        self.queues = queues
+        self.enabled = enabled
+        self._limiters: Dict[str, Limiter] = {}
+
+    def limiter(self, backend: str) -> Limiter:
+        limiter = self._limiters.get(backend)
+        if limiter is None:
+            kind = backend.split(":", 1)[0]
+            limit = self.limits.get(backend, self.limits.get(kind, 8))
+            queue = self.queues.get(backend, self.queues.get(kind, 32))
+            limiter = self._limiters[backend] = Limiter(backend, limit, queue)
+        return limiter
+
+    @asynccontextmanager
+    async def slot(self, backend: Optional[str], timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one of `backend`'s slots; raises Overloaded when its queue is full or `timeout` passes."""
+        if not self.enabled or not backend:
+            yield
+            return
+        limiter = self.limiter(backend)
+        await limiter.acquire(timeout)
+        held_from = time.monotonic()
+        try:
+            yield
+        finally:
+            METRICS.observe("admission.hold_s", time.monotonic() - held_from, backend=backend)
+            limiter.release()
+
+    def saturated(self, backend: Optional[str]) -> bool:
+        """Whether a new call to `backend` would have to queue."""
+        limiter = self._limiters.get(backend) if self.enabled and backend else None
+        return limiter is not None and (limiter.waiting > 0 or limiter.in_flight >= limiter.limit)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {
+            backend: {"in_flight": l.in_flight, "waiting": l.waiting, "limit": l.limit, "max_queue": l.max_queue}
+            for backend, l in self._limiters.items()
+        }
+
+
+GOVERNOR = Governor(ADMISSION_LIMITS, ADMISSION_QUEUES, enabled=ADMISSION_ENABLED)
+
+
+def oci_backend(model: str) -> str:
+    return f"oci:{model}"
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
 import logging
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -22,9 +21,9 @@ from a2a.types import (
     DataPart,
     Part,
     Task,
+    TaskNotFoundError,
     TaskState,
     TextPart,
-    UnsupportedOperationError,
 )
 from a2a.utils import (
     new_agent_parts_message,
@@ -33,7 +32,11 @@ from a2a.utils import (
 )
 from a2a.utils.errors import ServerError
 from a2ui.a2ui_extension import create_a2ui_part, try_activate_a2ui_extension
+from agent import json_codec
+from agent.cancellation import RunningTasks
+from agent.metrics import METRICS
 from agent.oci_agent import OCIRestaurantAgent
+from agent.structured_logging import log_event, truncated
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +49,7 @@ class RestaurantAgentExecutor(AgentExecutor):
         # The appropriate one will be chosen at execution time.
         self.oci_ui_agent = OCIRestaurantAgent(base_url=base_url, use_ui=True)
         self.oci_text_agent = OCIRestaurantAgent(base_url=base_url, use_ui=False)
+        self._running = RunningTasks()
 
     async def execute(
         self,
@@ -76,23 +80,14 @@ class RestaurantAgentExecutor(AgentExecutor):
             )
 
         if context.message and context.message.parts:
-            logger.info(
-                f"--- AGENT_EXECUTOR: Processing {len(context.message.parts)} message parts ---"
-            )
+            logger.info("Processing %d message parts", len(context.message.parts))
             for i, part in enumerate(context.message.parts):
-                if isinstance(part.root, DataPart):
-                    if "userAction" in part.root.data:
-                        logger.info(f"  Part {i}: Found a2ui UI ClientEvent payload.")
-                        ui_event_part = part.root.data["userAction"]
-                    else:
-                        logger.info(f"  Part {i}: DataPart (data: {part.root.data})")
-                elif isinstance(part.root, TextPart):
-                    logger.info(f"  Part {i}: TextPart (text: {part.root.text})")
-                else:
-                    logger.info(f"  Part {i}: Unknown part type ({type(part.root)})")
+                if isinstance(part.root, DataPart) and "userAction" in part.root.data:
+                    ui_event_part = part.root.data["userAction"]
+                log_event(logger, "payload", "Message part %d: %s", i, truncated(part.root))
 
         if ui_event_part:
-            logger.info(f"Received a2ui ClientEvent: {ui_event_part}")
+            logger.info("Received a2ui ClientEvent %r", ui_event_part.get("name"))
             # Changed on event name due to new version, could change in the future
             action = ui_event_part.get("name")
             ctx = ui_event_part.get("context", {})
@@ -117,7 +112,7 @@ class RestaurantAgentExecutor(AgentExecutor):
             logger.info("No a2ui UI event part found. Falling back to text input.")
             query = context.get_user_input()
 
-        logger.info(f"--- AGENT_EXECUTOR: Final query for LLM: '{query}' ---")
+        log_event(logger, "payload", "Final query for LLM: %s", truncated(query, 500))
 
         task = context.current_task
 
@@ -125,6 +120,8 @@ class RestaurantAgentExecutor(AgentExecutor):
             task = new_task(context.message)
             await event_queue.enqueue_event(task)
         updater = TaskUpdater(event_queue, task.id, task.context_id)
+        # tasks/cancel finds this run here and cancels it
+        self._running.register(task.id)
 
         # async for item in agent.stream(query, task.context_id):
         async for item in agent.oci_stream(query, task.context_id):
@@ -158,11 +155,11 @@ class RestaurantAgentExecutor(AgentExecutor):
                         )
                         # The new protocol sends a stream of JSON objects.
                         # For this example, we'll assume they are sent as a list in the final response.
-                        json_data = json.loads(json_string_cleaned)
+                        json_data = json_codec.loads(json_string_cleaned)
 
                         if isinstance(json_data, list):
                             logger.info(
-                                f"Found {len(json_data)} messages. Creating individual DataParts."
+                                "Found %d messages. Creating individual DataParts.", len(json_data)
                             )
                             for message in json_data:
                                 final_parts.append(create_a2ui_part(message))
@@ -173,20 +170,15 @@ class RestaurantAgentExecutor(AgentExecutor):
                             )
                             final_parts.append(create_a2ui_part(json_data))
 
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse UI JSON: {e}")
+                    except json_codec.JSONDecodeError as e:
+                        logger.error("Failed to parse UI JSON: %s", e)
                         final_parts.append(Part(root=TextPart(text=json_string)))
             else:
                 final_parts.append(Part(root=TextPart(text=content.strip())))
 
-            logger.info("--- FINAL PARTS TO BE SENT ---")
+            logger.info("Sending %d final parts for task %s", len(final_parts), task.id)
             for i, part in enumerate(final_parts):
-                logger.info(f"  - Part {i}: Type = {type(part.root)}")
-                if isinstance(part.root, TextPart):
-                    logger.info(f"    - Text: {part.root.text[:200]}...")
-                elif isinstance(part.root, DataPart):
-                    logger.info(f"    - Data: {str(part.root.data)[:200]}...")
-            logger.info("-----------------------------")
+                log_event(logger, "payload", "Final part %d: %s", i, truncated(part.root))
             # TODO: remove in case multiturn is enabled
             final_state = TaskState.completed
 
@@ -200,4 +192,14 @@ class RestaurantAgentExecutor(AgentExecutor):
     async def cancel(
         self, request: RequestContext, event_queue: EventQueue
     ) -> Task | None:
-        raise ServerError(error=UnsupportedOperationError())
+        """Stop the running search and mark the task canceled."""
+        task = request.current_task
+        if task is None:
+            raise ServerError(error=TaskNotFoundError())
+        # Report first: once the run is cancelled its event queue may already be closed
+        updater = TaskUpdater(event_queue, task.id, task.context_id)
+        await updater.cancel(new_agent_text_message("Request canceled.", task.context_id, task.id))
+        if await self._running.cancel(task.id):
+            METRICS.incr("executor.canceled")
+        logger.info("--- AGENT_EXECUTOR: Task %s canceled ---", task.id)
+        return None
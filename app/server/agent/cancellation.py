@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict
+
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# How long tasks/cancel waits for a run to unwind before reporting the task canceled anyway
+CANCEL_GRACE_S = float(os.getenv("CANCEL_GRACE_S", "5"))
+
+
+class RunningTasks:
+    """The asyncio task executing each A2A task, so tasks/cancel can stop it.
+
+    Cancelling raises CancelledError inside the graph stream; every layer below
+    (LLM calls, Apify requests, admission slots, shared cache fetches) releases
+    its resources while that error unwinds.
+    """
+
+    def __init__(self, grace_s: float = CANCEL_GRACE_S):
+        self.grace_s = grace_s
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def register(self, task_id: str) -> None:
+        """Record the current asyncio task as the one running `task_id` until it finishes."""
+        current = asyncio.current_task()
+        if current is None:
+            return
+        self._tasks[task_id] = current
+        current.add_done_callback(lambda done: self._forget(task_id, done))
+
+    def _forget(self, task_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(task_id) is task:
+            del self._tasks[task_id]
+
+    async def cancel(self, task_id: str) -> bool:
+        """Cancel the run for `task_id` and wait up to `grace_s` for it to unwind; False if none was running."""
+        task = self._tasks.get(task_id)
+        if task is None or task.done():
+            return False
+        started = time.monotonic()
+        task.cancel()
+        done, _ = await asyncio.wait({task}, timeout=self.grace_s)
+        METRICS.observe("executor.cancel_s", time.monotonic() - started)
+        if not done:
+            logger.warning("Task %s still unwinding %.1fs after cancel", task_id, self.grace_s)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
@@ -0,0 +1,182 @@
+import logging
+import os
+import time
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+try:  # brotli is optional; gzip is always available
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported Content-Encoding for an Accept-Encoding header, or None."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.strip().lower()] = q
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda enc: offered.get(enc, offered.get("*", 0.0)))
+    return best if offered.get(best, offered.get("*", 0.0)) > 0 else None
+
+
+class _Encoder:
+    """Incremental gzip/brotli encoder; `flush` ends a block the client can decode right away."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + self._br.flush() if flush else out
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli for JSON-RPC responses and SSE streams.
+
+    Whole responses are compressed once they reach `minimum_size`. Streaming
+    responses (SSE `message/stream`) are compressed incrementally and flushed
+    after every body chunk, so each event reaches the client as soon as it is
+    sent rather than waiting for the compressor's buffer to fill. Bytes in/out
+    and the CPU time spent compressing are recorded in METRICS as
+    compression.bytes_in / compression.bytes_out / compression.cpu_ms.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = int(minimum_size if minimum_size is not None else os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "500"))
+        self.gzip_level = int(gzip_level if gzip_level is not None else os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", "6"))
+        self.brotli_quality = int(brotli_quality if brotli_quality is not None else os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", "4"))
+        self.enabled = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(self, encoding, send).run(self.app, scope, receive)
+
+
+class _CompressedResponse:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+        self.streaming = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_s = 0.0
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        try:
+            await app(scope, receive, self.on_send)
+        finally:
+            if self.encoder is not None and self.bytes_in:
+                labels = {"encoding": self.encoding, "mode": "stream" if self.streaming else "whole"}
+                METRICS.incr("compression.bytes_in", self.bytes_in, **labels)
+                METRICS.incr("compression.bytes_out", self.bytes_out, **labels)
+                METRICS.observe("compression.cpu_ms", self.cpu_s * 1000, **labels)
+
+    def _compress(self, data: bytes, flush: bool = False, finish: bool = False) -> bytes:
+        started = time.thread_time()
+        out = self.encoder.compress(data, flush=flush) if data else b""
+        if finish:
+            out += self.encoder.finish()
+        self.cpu_s += time.thread_time() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    async def on_send(self, message: Message) -> None:
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.streaming = content_type.startswith(STREAMING_TYPES)
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            # First body chunk decides: small complete responses go out untouched
+            if not more_body and not self.streaming and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body or self.streaming:
+                del headers["content-length"]
+                compressed = self._compress(body, flush=True) if more_body else self._compress(body, finish=True)
+            else:
+                compressed = self._compress(body, finish=True)
+                headers["content-length"] = str(len(compressed))
+            start, self.start = self.start, None
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        if more_body:
+            # Flush per chunk so every SSE event is decodable on arrival
+            await self.send({"type": "http.response.body", "body": self._compress(body, flush=True), "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self._compress(body, finish=True), "more_body": False})
@@ -1,21 +1,46 @@
 import os
 import re
 import json
+import math
+import asyncio
 import logging
+import time
 from urllib.parse import urlparse
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 from langchain_oci import ChatOCIGenAI
 from langchain.messages import AIMessage, HumanMessage
 from dotenv import load_dotenv
 
+from agent import json_codec
+from agent.admission import GOVERNOR, Overloaded, oci_backend
+from agent.graph.deadline import Deadline
+from agent.graph.hedging import hedged_call
+from agent.graph.model_router import ModelRouter
+from agent.graph.intent_cache import IntentCache, intent_key
+from agent.graph.place_ranking import PlaceRanker, merge_ranked
+from agent.graph.rate_limit import TokenBucket, backoff_delay, retry_after_seconds
 from agent.graph.struct import AgentConfig
+from agent.metrics import METRICS
+from agent.structured_logging import dumped, log_event
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Shared by every graph instance so config reloads keep the warm cache
+_INTENT_CACHE = IntentCache(
+    max_entries=int(os.getenv("PLACES_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("PLACES_CACHE_TTL_S", "900")),
+)
+
+# One bucket for the whole process, sized to the Apify plan, so concurrent requests share the quota
+_APIFY_BUCKET = TokenBucket(
+    rate=float(os.getenv("APIFY_RATE_PER_MIN", "30")) / 60.0,
+    burst=int(os.getenv("APIFY_RATE_BURST", "5")),
+)
+
 
 class ApifyPlacesAgent:
     """Direct Apify REST integration for compass/crawler-google-places.
@@ -27,15 +52,29 @@ class ApifyPlacesAgent:
 
     def __init__(self, config: Optional[AgentConfig] = None):
         self.agent_name = (config.name if config else "apify_places_agent")
+        self.model_temperature = config.temperature if config else 0.2
         self.default_location = os.getenv("DEFAULT_LOCATION", "Austin, TX")
         self.actor_id = os.getenv("APIFY_ACTOR", "compass/crawler-google-places")
         self.base_url = os.getenv("APIFY_BASE_URL", "https://api.apify.com")
-        self.token = os.getenv("APIFY_TOKEN").strip()
+        self.token = (os.getenv("APIFY_TOKEN") or "").strip()
         self.data_mode = os.getenv("APIFY_DATA_MODE", "static").lower()
         self.static_dir = os.getenv("APIFY_STATIC_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "static_data", "apify"),)
         self.static_file = os.getenv("APIFY_STATIC_FILE", "").strip()
-
-
+        self.cache_enabled = os.getenv("PLACES_CACHE_ENABLED", "true").lower() == "true"
+        self._cache = _INTENT_CACHE
+        self.fanout_enabled = os.getenv("APIFY_FANOUT", "false").lower() == "true"
+        self.fanout_overlap = float(os.getenv("APIFY_FANOUT_OVERLAP", "1.5"))
+        # Above 1, every search scrapes that many times the places asked for (and costs as much more)
+        # so the ranker has extra candidates to drop duplicates and weak results from
+        self.overfetch = max(1.0, float(os.getenv("PLACES_OVERFETCH", "1")))
+        self._ranker = PlaceRanker()
+        self.speculative = os.getenv("APIFY_SPECULATIVE", "false").lower() == "true"
+        self.llm_mapping_timeout = float(os.getenv("APIFY_LLM_MAPPING_TIMEOUT_S", "15"))
+        self.max_retries = int(os.getenv("APIFY_MAX_RETRIES", "3"))
+        self.backoff_base = float(os.getenv("APIFY_BACKOFF_BASE_S", "1"))
+        self.backoff_max = float(os.getenv("APIFY_BACKOFF_MAX_S", "30"))
+        self._bucket = _APIFY_BUCKET
+        self._router = ModelRouter.from_config("apify_places_agent", config, "openai.gpt-4.1", build=self._oci_llm)
 
     async def initialize(self):
         return True
@@ -45,21 +84,109 @@ class ApifyPlacesAgent:
         # Derive desired count
         count = self._extract_count(user_text, default=5)
 
+        # The intent (terms + location, not the count) keys the cache, so "top 5"
+        # is served from an earlier "top 10" without an LLM call or a scrape.
+        # Entries are keyed by the input a scrape actually ran with, so this
+        # heuristic key only finds places fetched for the heuristic input itself.
+        heuristic_input = self._map_query_to_actor_input(user_text)
+        key = intent_key(heuristic_input)
+        # With PLACES_OVERFETCH, over-fetch so duplicates and weak results can be ranked out of the top-N
+        fetch_count = min(50, max(count, math.ceil(count * self.overfetch)))
+        if self.cache_enabled:
+            cached = self._cache.peek(key, fetch_count)
+            if cached is not None:
+                logger.info("Serving %d places from intent cache for %s", len(cached), key)
+                return self._items_message(state, self._ranker.rank(cached, count))
+
+        budget = Deadline.from_state(state).budget_for("apify_places_agent")
+        # Retries and rate-limit waits that cannot finish in time are given up early
+        deadline = time.monotonic() + budget
+
+        # Call Apify and return RAW items so downstream FormatterAgent
+        # can normalize while preserving coordinates (lat/lng) for the map.
+        async def search() -> List[Dict[str, Any]]:
+            if self.speculative:
+                actor_input, items = await self._speculative_fetch(user_text, heuristic_input, 0, fetch_count, deadline)
+                if self.cache_enabled:
+                    self._cache.put(intent_key(actor_input), items, fetch_count)
+                return items
+            actor_input = await self._resolve_actor_input(user_text, heuristic_input, fetch_count)
+            if not self.cache_enabled:
+                return await self._fetch_places(actor_input, 0, fetch_count, deadline)
+
+            async def fetch(offset: int, limit: int) -> List[Dict[str, Any]]:
+                return await self._fetch_places(actor_input, offset, limit, deadline)
+
+            return await self._cache.get_or_fetch(intent_key(actor_input), fetch_count, fetch,
+                                                  supports_offset=self._supports_offset())
+
+        try:
+            items = await asyncio.wait_for(search(), timeout=budget)
+        except asyncio.TimeoutError:
+            logger.warning("Apify search exceeded its %.1fs budget; continuing without results", budget)
+            METRICS.incr("deadline.exceeded", node="apify_places_agent")
+            items = []
+        items = self._ranker.rank(items, count) if isinstance(items, list) else []
+        return self._items_message(state, items)
+
+    async def _resolve_actor_input(self, user_text: str, heuristic_input: Dict[str, Any], count: int) -> Dict[str, Any]:
         # Build actor input with LLM guidance; fallback to heuristic
         actor_input = await self._build_actor_input_llm(user_text, count)
         if not actor_input:
-            actor_input = self._map_query_to_actor_input(user_text)
-            actor_input["maxItems"] = count
+            actor_input = {**heuristic_input, "maxItems": count}
 
         # Ensure maxItems present
         actor_input.setdefault("maxItems", count)
         actor_input.setdefault("language", "en")
+        return actor_input
 
-        # Call Apify and return RAW items so downstream FormatterAgent
-        # can normalize while preserving coordinates (lat/lng) for the map.
-        items = await self._run_apify_actor(actor_input)
-        items = items[:count] if isinstance(items, list) else []
-        return {"messages": state["messages"] + [AIMessage(content=json.dumps(items, ensure_ascii=False))]}
+    async def _speculative_fetch(self, user_text: str, heuristic_input: Dict[str, Any], offset: int, limit: int,
+                                 deadline: Optional[float] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Start scraping with the heuristic input while the LLM builds its own.
+
+        If the LLM input canonicalizes to the same intent (or the LLM fails) the
+        in-flight scrape is kept; otherwise it is cancelled and restarted with
+        the LLM input. Returns the input the places were fetched with, and the places.
+        """
+        heuristic_input = {**heuristic_input, "maxItems": offset + limit, "language": heuristic_input.get("language", "en")}
+        scrape = asyncio.create_task(self._fetch_places(heuristic_input, offset, limit, deadline))
+        try:
+            llm_input = await self._build_actor_input_llm(user_text, offset + limit)
+            if not llm_input:
+                METRICS.incr("apify.speculation", outcome="llm_failed")
+                return heuristic_input, await scrape
+            if intent_key(llm_input) == intent_key(heuristic_input):
+                METRICS.incr("apify.speculation", outcome="heuristic_kept")
+                return heuristic_input, await scrape
+            METRICS.incr("apify.speculation", outcome="llm_restart")
+            logger.info("LLM actor input differs from heuristic; restarting scrape")
+            scrape.cancel()
+            return llm_input, await self._fetch_places(llm_input, offset, limit, deadline)
+        finally:
+            if not scrape.done():
+                scrape.cancel()
+                await asyncio.gather(scrape, return_exceptions=True)
+
+    def _items_message(self, state: Dict[str, Any], items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"messages": state["messages"] + [AIMessage(content=json_codec.dumps(items, ensure_ascii=False))]}
+
+    def _uses_static_data(self) -> bool:
+        return self.data_mode == "static" or (not self.token or self.token.startswith("<"))
+
+    def _supports_offset(self) -> bool:
+        # The Google Places actor has no paging input; only local fixtures can be sliced
+        return self._uses_static_data()
+
+    async def _fetch_places(self, actor_input: Dict[str, Any], offset: int, limit: int,
+                            deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fetch `limit` places starting at `offset` (offset is 0 unless the source supports it)."""
+        if self.fanout_enabled and not self._uses_static_data():
+            items = await self._run_actor_fanout({**actor_input, "maxItems": offset + limit}, deadline)
+        else:
+            items = await self._run_apify_actor({**actor_input, "maxItems": offset + limit}, deadline)
+        if not isinstance(items, list):
+            return []
+        return items[offset:offset + limit]
 
     def _extract_count(self, text: str, default: int = 5) -> int:
         m = re.search(r"(\d+)", text)
@@ -148,12 +275,12 @@ class ApifyPlacesAgent:
 
         return actor_input
 
-    def _oci_llm(self, temperature: float = 0.2) -> ChatOCIGenAI:
+    def _oci_llm(self, model: str, temperature: Optional[float] = None) -> ChatOCIGenAI:
         return ChatOCIGenAI(
-            model_id="openai.gpt-4.1",
+            model_id=model,
             service_endpoint=os.getenv("SERVICE_ENDPOINT"),
             compartment_id=os.getenv("COMPARTMENT_ID"),
-            model_kwargs={"temperature": temperature},
+            model_kwargs={"temperature": self.model_temperature if temperature is None else temperature},
             auth_profile=os.getenv("AUTH_PROFILE"),
         )
 
@@ -179,153 +306,217 @@ class ApifyPlacesAgent:
             "Return JSON only."
         )
         try:
-            resp = await self._oci_llm(0.2).ainvoke([HumanMessage(content=guidelines + "\n\n" + prompt)])
-            text = str(resp.content).strip().strip("` ")
-            if text.lower().startswith("json"):
-                text = text[4:].strip()
-            data = json.loads(text)
-            if not isinstance(data, dict):
-                return None
-            out: Dict[str, Any] = {"maxItems": max(1, min(50, int(count))), "language": "en"}
-            if data.get("startUrls"):
-                out["startUrls"] = data["startUrls"]
-            if data.get("categoryFilterWords"):
-                out["categoryFilterWords"] = data["categoryFilterWords"][:5]
-            if isinstance(data.get("maxItems"), int):
-                out["maxItems"] = max(1, min(50, int(data["maxItems"])) )
-            if isinstance(data.get("language"), str):
-                out["language"] = data["language"]
-            # If startUrls not present, enforce/synthesize locationQuery and sanitize search strings
-            if not out.get("startUrls"):
-                loc = data.get("locationQuery")
-                if isinstance(loc, str) and loc.strip():
-                    out["locationQuery"] = loc.strip()
-                else:
-                    out["locationQuery"] = self.default_location
-                if data.get("searchStringsArray"):
-                    terms: List[str] = []
-                    for t in data["searchStringsArray"][:3]:
-                        if isinstance(t, str):
-                            cleaned = self._sanitize_query_terms(t, out["locationQuery"]) \
-                                if hasattr(self, "_sanitize_query_terms") else t
-                            if cleaned:
-                                terms.append(cleaned)
-                    if terms:
-                        out["searchStringsArray"] = terms
-            # Ensure at least one required key besides maxItems/language
-            if not any(k in out for k in ("searchStringsArray", "startUrls", "categoryFilterWords")):
-                return None
-            return out
+            return await self._router.run(
+                lambda model, time_left: self._actor_input_attempt(model, guidelines + "\n\n" + prompt, count, time_left),
+                validate=lambda out: out is not None,
+                timeout=self.llm_mapping_timeout,
+            )
         except Exception as e:
             logger.warning("LLM actor-input mapping failed; using heuristic. Error: %s", e)
             return None
 
-    async def _summarize_places_llm(self, items: List[Dict[str, Any]], count: int) -> Optional[List[Dict[str, Any]]]:
-        if not items:
-            return []
-        schema_hint = (
-            "Return a JSON array of exactly N items with keys: name, caption, rating, location, imageURL, infoLink.\n"
-            "- name ← 'title' (or 'name')\n"
-            "- caption ← 'categoryName' or first of 'categories'\n"
-            "- rating ← unicode stars from numeric 'totalScore' (>=4.5★★★★★, >=3.5★★★★☆, >=2.5★★★☆☆, >=1.5★★☆☆☆, >=0.5★☆☆☆☆, else ☆☆☆☆☆)\n"
-            "- location ← 'address' (or 'city' + 'state')\n"
-            "- imageURL ← 'imageUrl' if present\n"
-            "- infoLink ← 'website' else 'url' else 'searchPageUrl'\n"
-        )
-        prompt = (
-            f"N={count}. {schema_hint} Return JSON only. RAW_ITEMS: {json.dumps(items)[:120000]}"
+    async def _actor_input_attempt(self, model: str, prompt: str, count: int, time_left: Optional[float]) -> Optional[Dict[str, Any]]:
+        """One model's actor input, or None when its answer is unusable."""
+        resp = await hedged_call(
+            lambda: self._router.client(model).ainvoke([HumanMessage(content=prompt)]),
+            name=f"{self.agent_name}:actor_input:{model}",
+            timeout=time_left,
+            backend=oci_backend(model),
         )
+        text = str(resp.content).strip().strip("` ")
+        if text.lower().startswith("json"):
+            text = text[4:].strip()
         try:
-            resp = await self._oci_llm(0.2).ainvoke([HumanMessage(content=prompt)])
-            text = str(resp.content).strip().strip("` ")
-            if text.lower().startswith("json"):
-                text = text[4:].strip()
-            data = json.loads(text)
-            if isinstance(data, list):
-                if len(data) > count:
-                    data = data[:count]
-                elif len(data) < count and data:
-                    i = 0
-                    while len(data) < count and i < len(data):
-                        data.append(data[i])
-                        i += 1
-                return data
+            data = json_codec.loads(text)
+        except json_codec.JSONDecodeError:
             return None
-        except Exception as e:
-            logger.warning("LLM summarization failed; using fallback. Error: %s", e)
+        if not isinstance(data, dict):
+            return None
+        out: Dict[str, Any] = {"maxItems": max(1, min(50, int(count))), "language": "en"}
+        if data.get("startUrls"):
+            out["startUrls"] = data["startUrls"]
+        if data.get("categoryFilterWords"):
+            out["categoryFilterWords"] = data["categoryFilterWords"][:5]
+        if isinstance(data.get("maxItems"), int):
+            out["maxItems"] = max(1, min(50, int(data["maxItems"])) )
+        if isinstance(data.get("language"), str):
+            out["language"] = data["language"]
+        # If startUrls not present, enforce/synthesize locationQuery and sanitize search strings
+        if not out.get("startUrls"):
+            loc = data.get("locationQuery")
+            if isinstance(loc, str) and loc.strip():
+                out["locationQuery"] = loc.strip()
+            else:
+                out["locationQuery"] = self.default_location
+            if data.get("searchStringsArray"):
+                terms: List[str] = []
+                for t in data["searchStringsArray"][:3]:
+                    if isinstance(t, str):
+                        cleaned = self._sanitize_query_terms(t, out["locationQuery"]) \
+                            if hasattr(self, "_sanitize_query_terms") else t
+                        if cleaned:
+                            terms.append(cleaned)
+                if terms:
+                    out["searchStringsArray"] = terms
+        # Ensure at least one required key besides maxItems/language
+        if not any(k in out for k in ("searchStringsArray", "startUrls", "categoryFilterWords")):
             return None
-
-    def _fallback_projection(self, items: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
-        def stars(val: Optional[float]) -> str:
-            try:
-                r = float(val)
-            except Exception:
-                return "★★★★☆"
-            if r >= 4.5:
-                return "★★★★★"
-            if r >= 3.5:
-                return "★★★★☆"
-            if r >= 2.5:
-                return "★★★☆☆"
-            if r >= 1.5:
-                return "★★☆☆☆"
-            if r >= 0.5:
-                return "★☆☆☆☆"
-            return "☆☆☆☆☆"
-
-        out: List[Dict[str, Any]] = []
-        for it in items[:count]:
-            name = it.get("title") or it.get("name") or "Unknown"
-            caption = it.get("categoryName") or (it.get("categories") or [None])[0] or "Popular spot"
-            rating_s = stars(it.get("totalScore") or it.get("rating"))
-            location = it.get("address") or ", ".join([v for v in [it.get("city"), it.get("state")] if v]) or self.default_location
-            image = it.get("imageUrl") or ""
-            info = it.get("website") or it.get("url") or it.get("searchPageUrl") or ""
-            out.append({
-                "name": name,
-                "caption": caption,
-                "rating": rating_s,
-                "location": location,
-                "imageURL": image,
-                "infoLink": info,
-            })
-        i = 0
-        while len(out) < count and out:
-            out.append(out[i])
-            i += 1
         return out
 
-    async def _run_apify_actor(self, actor_input: Dict[str, Any]) -> List[Dict[str, Any]]:
-        if self.data_mode == "static" or (not self.token or self.token.startswith("<")):
+    async def _run_apify_actor(self, actor_input: Dict[str, Any], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Run the actor synchronously and return its dataset items.
+
+        Requests go through the shared token bucket. A 429 pauses the bucket for
+        Retry-After (so concurrent requests back off too); a 5xx or a network
+        error is retried with jittered exponential backoff, as long as `deadline`
+        (monotonic) leaves room. When retries run out this raises Overloaded, so
+        the client gets a retry hint and "Apify is down" never looks like "no
+        restaurants" (nor gets cached as such). Any other 4xx raises
+        httpx.HTTPStatusError for the same reason. Only one attempt at a time
+        holds an apify admission slot.
+        """
+        if self._uses_static_data():
             return self._load_static_items(actor_input)
 
         url = f"{self.base_url}/v2/acts/{self.actor_id.replace('/', '~')}/run-sync-get-dataset-items"
         headers = {"Authorization": f"Bearer {self.token}", "X-Apify-Token": self.token}
-        logger.info("Running Apify actor '%s' with input: %s", self.actor_id, json.dumps(actor_input))
+        logger.info("Running Apify actor '%s' for %s results", self.actor_id, actor_input.get("maxItems"))
+        log_event(logger, "payload", "Apify actor input: %s", dumped(actor_input))
 
         async with httpx.AsyncClient(timeout=120) as client:
-            try:
-                resp = await client.post(url, json=actor_input, headers=headers)
-                if resp.status_code >= 400:
+            attempt = 0
+            while True:
+                attempt += 1
+                waited = await self._bucket.acquire(max_wait=self._time_left(deadline))
+                if waited is None:
+                    METRICS.incr("apify.throttled", reason="budget")
+                    raise Overloaded("apify", max(1, math.ceil(self._bucket.delay())), reason="rate_limited")
+                if waited:
+                    METRICS.observe("apify.bucket_wait_s", waited)
+                try:
+                    # Concurrent scrapes are capped; a full queue raises Overloaded so the request fails fast
+                    # with a retry hint. The slot covers one attempt, never the rate-limit or backoff waits
+                    async with GOVERNOR.slot("apify"):
+                        resp = await client.post(url, json=actor_input, headers=headers,
+                                                 timeout=self._request_timeout(deadline))
+                except httpx.RequestError as e:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                    if self._can_retry(attempt, delay, deadline):
+                        METRICS.incr("apify.retry", status="network")
+                        logger.warning("Apify network error (%s); retry %d/%d in %.1fs", e, attempt, self.max_retries, delay)
+                        await asyncio.sleep(delay)
+                        continue
+                    logger.error("Apify unreachable after %d attempts: %s", attempt, e)
+                    raise Overloaded("apify", self._retry_hint(delay), reason="unreachable") from e
+
+                status = resp.status_code
+                if status == 429 or status >= 500:
+                    retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+                    delay = retry_after if retry_after is not None else backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                    if status == 429:
+                        METRICS.incr("apify.throttled", reason="429")
+                        # Everyone backs off, not only this request; the next acquire() waits it out
+                        self._bucket.pause(delay)
+                    if self._can_retry(attempt, delay, deadline):
+                        METRICS.incr("apify.retry", status=status)
+                        logger.warning("Apify returned %s; retry %d/%d in %.1fs", status, attempt, self.max_retries, delay)
+                        if status != 429:
+                            await asyncio.sleep(delay)
+                        continue
+                    if status == 429:
+                        raise Overloaded("apify", self._retry_hint(delay), reason="rate_limited")
+                    logger.error("Apify still failing with %s after %d attempts", status, attempt)
+                    raise Overloaded("apify", self._retry_hint(delay), reason="upstream_error")
+
+                if status >= 400:
+                    # A rejected input or token is an error, not "no places"; raising keeps it out of the cache
                     logger.error(
                         "Apify REST call failed: %s %s — %s",
-                        resp.status_code,
+                        status,
                         resp.reason_phrase,
                         resp.text[:500],
                     )
+                    METRICS.incr("apify.failed", status=status)
+                    resp.raise_for_status()
+                try:
+                    data = resp.json()
+                except ValueError as e:
+                    logger.exception("Apify REST returned invalid JSON: %s", e)
                     return []
-                data = resp.json()
                 if isinstance(data, dict) and "items" in data:
                     return data.get("items", [])
                 if isinstance(data, list):
                     return data
                 return []
-            except httpx.RequestError as e:
-                logger.exception("Apify REST network error: %s", e)
-                return []
-            except Exception as e:
-                logger.exception("Apify REST unexpected error: %s", e)
-                return []
+
+    def _can_retry(self, attempt: int, delay: float, deadline: Optional[float]) -> bool:
+        time_left = self._time_left(deadline)
+        return attempt <= self.max_retries and (time_left is None or delay < time_left)
+
+    def _retry_hint(self, delay: float) -> int:
+        """Whole seconds a client should wait before retrying a failed Apify search."""
+        return max(1, math.ceil(max(delay, self.backoff_base)))
+
+    @staticmethod
+    def _time_left(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def _request_timeout(self, deadline: Optional[float]) -> float:
+        time_left = self._time_left(deadline)
+        return 120.0 if time_left is None else max(1.0, min(120.0, time_left))
+
+    def _split_actor_input(self, actor_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """One actor input per search string / start URL, each keeping the shared options."""
+        if len(actor_input.get("startUrls") or []) > 1:
+            return [{**actor_input, "startUrls": [u]} for u in actor_input["startUrls"]]
+        if len(actor_input.get("searchStringsArray") or []) > 1:
+            return [{**actor_input, "searchStringsArray": [t]} for t in actor_input["searchStringsArray"]]
+        return [actor_input]
+
+    async def _run_actor_fanout(self, actor_input: Dict[str, Any], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Run one actor call per search string concurrently and merge the results.
+
+        Each call gets a share of maxItems (with some overlap to absorb duplicates).
+        As soon as the finished calls cover maxItems distinct places, the calls
+        still running are cancelled.
+        """
+        sub_inputs = self._split_actor_input(actor_input)
+        if len(sub_inputs) <= 1:
+            return await self._run_apify_actor(actor_input, deadline)
+
+        wanted = int(actor_input.get("maxItems") or 5)
+        per_call = max(1, min(wanted, math.ceil(wanted * self.fanout_overlap / len(sub_inputs))))
+        tasks = [
+            asyncio.create_task(self._run_apify_actor({**sub, "maxItems": per_call}, deadline))
+            for sub in sub_inputs
+        ]
+        results: List[List[Dict[str, Any]]] = [[] for _ in tasks]
+        error: Optional[Exception] = None
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        items = task.result()
+                    except (Overloaded, httpx.HTTPStatusError) as e:
+                        error = e
+                        continue
+                    results[tasks.index(task)] = items if isinstance(items, list) else []
+                if pending and len(merge_ranked(results)) >= wanted:
+                    logger.info("Fan-out satisfied %d places; cancelling %d pending actor calls", wanted, len(pending))
+                    break
+        finally:
+            leftovers = [task for task in tasks if not task.done()]
+            for task in leftovers:
+                task.cancel()
+            if leftovers:
+                await asyncio.gather(*leftovers, return_exceptions=True)
+        merged = merge_ranked(results)
+        # A short merge with a failed call is incomplete, not exhausted; don't pass it off as a full answer
+        if error is not None and len(merged) < wanted:
+            raise error
+        return merged[:wanted]
 
     def _load_static_items(self, actor_input: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,60 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+# Upper bound for the whole graph run; each node also has its own cap below
+DEFAULT_REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", "90"))
+
+_DEFAULT_NODE_BUDGETS = {
+    "apify_places_agent": 60.0,
+    "formatter_agent": 30.0,
+    "presenter_agent": 60.0,
+}
+
+
+def _parse_node_budgets(raw: str) -> Dict[str, float]:
+    """Parse `node=seconds,node=seconds` overrides from NODE_BUDGETS."""
+    budgets = dict(_DEFAULT_NODE_BUDGETS)
+    for pair in raw.split(","):
+        if "=" not in pair:
+            continue
+        node, seconds = pair.split("=", 1)
+        try:
+            budgets[node.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return budgets
+
+
+NODE_BUDGETS = _parse_node_budgets(os.getenv("NODE_BUDGETS", ""))
+
+
+@dataclass(frozen=True)
+class Deadline:
+    """Wall-clock deadline for one request, carried through graph state as `deadline`."""
+
+    expires_at: float
+
+    @classmethod
+    def start(cls, seconds: Optional[float] = None) -> "Deadline":
+        return cls(time.time() + (DEFAULT_REQUEST_DEADLINE_S if seconds is None else seconds))
+
+    @classmethod
+    def from_state(cls, state: Mapping[str, Any]) -> "Deadline":
+        """Read the deadline from graph state, starting a fresh one if the caller set none."""
+        expires_at = state.get("deadline") if hasattr(state, "get") else None
+        if isinstance(expires_at, (int, float)) and expires_at > 0:
+            return cls(float(expires_at))
+        return cls.start()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.time())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def budget_for(self, node: str) -> float:
+        """Seconds `node` may spend: its own cap, bounded by what is left of the request."""
+        return min(NODE_BUDGETS.get(node, self.remaining()), self.remaining())
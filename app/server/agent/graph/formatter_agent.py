@@ -1,10 +1,31 @@
-import json
+import asyncio
+import logging
 import os
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain.agents import create_agent
 from langchain_oci import ChatOCIGenAI
-from langchain.messages import HumanMessage
+from langchain.messages import AIMessage, HumanMessage
+
+from agent import json_codec
+from agent.admission import Overloaded, oci_backend
+from agent.graph.deadline import Deadline
+from agent.graph.hedging import hedged_call
+from agent.graph.item_projection import PROJECTOR
+from agent.graph.model_router import ModelRouter
+from agent.graph.struct import AgentConfig
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Rough prompt tokens per formatter batch. The model writes every item back, so
+# latency follows batch size; smaller batches run side by side and finish sooner.
+FORMATTER_BATCH_TOKENS = int(os.getenv("FORMATTER_BATCH_TOKENS", "1500"))
+FORMATTER_BATCH_MAX_ITEMS = int(os.getenv("FORMATTER_BATCH_MAX_ITEMS", "8"))
+# Extra attempts for a batch that errors or returns invalid JSON; the other batches are kept
+FORMATTER_BATCH_RETRIES = int(os.getenv("FORMATTER_BATCH_RETRIES", "1"))
+_BYTES_PER_TOKEN = 4
 
 
 FORMATTER_PROMPT = (
@@ -30,19 +51,34 @@ FORMATTER_PROMPT = (
 )
 
 
+def rating_stars(value: Any) -> str:
+    """Unicode stars for a numeric 0-5 rating, using the thresholds from FORMATTER_PROMPT."""
+    try:
+        r = float(value)
+    except (TypeError, ValueError):
+        return "☆☆☆☆☆"
+    for threshold, stars in ((4.5, "★★★★★"), (3.5, "★★★★☆"), (2.5, "★★★☆☆"), (1.5, "★★☆☆☆"), (0.5, "★☆☆☆☆")):
+        if r >= threshold:
+            return stars
+    return "☆☆☆☆☆"
+
+
 class FormatterAgent:
     """LLM-based formatter that ensures fields required by the UI are present."""
 
-    def __init__(self, default_city: str | None = None):
+    def __init__(self, config: Optional[AgentConfig] = None, default_city: str | None = None):
         self.default_city = default_city or os.getenv("DEFAULT_LOCATION", "Austin, TX")
-        self._agent = self._build_agent()
+        self.agent_name = config.name if config else "formatter_agent"
+        self.model_temperature = config.temperature if config else 0.2
+        self._router = ModelRouter.from_config("formatter_agent", config, "openai.gpt-4.1", build=self._build_agent)
+        self._router.client(self._router.model)
 
-    def _build_agent(self):
+    def _build_agent(self, model: str):
         client = ChatOCIGenAI(
-            model_id="openai.gpt-4.1",
+            model_id=model,
             service_endpoint=os.getenv("SERVICE_ENDPOINT"),
             compartment_id=os.getenv("COMPARTMENT_ID"),
-            model_kwargs={"temperature": 0.2},
+            model_kwargs={"temperature": self.model_temperature},
             auth_profile=os.getenv("AUTH_PROFILE"),
         )
 
@@ -50,40 +86,189 @@ class FormatterAgent:
             model=client,
             tools=[],
             system_prompt=FORMATTER_PROMPT,
-            name="formatter_agent",
+            name=self.agent_name,
         )
 
+    @staticmethod
+    def _parse_items(response: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """The agent's JSON array of named items, or None if it answered anything else."""
+        text = str(response["messages"][-1].content).strip().strip("`").strip()
+        if text.lower().startswith("json"):
+            text = text[4:].strip()
+        try:
+            items = json_codec.loads(text)
+        except ValueError:
+            return None
+        if isinstance(items, list) and all(isinstance(it, dict) and it.get("name") for it in items):
+            return items
+        return None
+
+    @staticmethod
+    def _batches(items: List[Dict[str, Any]], max_tokens: int = FORMATTER_BATCH_TOKENS,
+                 max_items: int = FORMATTER_BATCH_MAX_ITEMS) -> List[List[int]]:
+        """Split item indexes into consecutive batches of at most ~`max_tokens` prompt tokens and `max_items` items."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        tokens = 0
+        for i, item in enumerate(items):
+            item_tokens = len(json_codec.dumps(item, ensure_ascii=False).encode("utf-8")) // _BYTES_PER_TOKEN + 1
+            if current and (tokens + item_tokens > max_tokens or len(current) >= max_items):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(i)
+            tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _prompt(self, items_json: str) -> str:
+        # Provide default city context inline for the model
+        return (
+            f"DEFAULT_CITY: {self.default_city}\n"
+            f"RAW_ITEMS_JSON: {items_json}\n"
+            "Return ONLY the normalized JSON array as described."
+        )
+
+    async def _invoke(self, model: str, prompt: str, time_left: Optional[float]) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+        """One model call, returned with its output parsed (None when unusable)."""
+        response = await hedged_call(
+            lambda: self._router.client(model).ainvoke({"messages": [HumanMessage(content=prompt)]}),
+            name=f"formatter_agent:{model}",
+            timeout=time_left,
+            backend=oci_backend(model),
+        )
+        return response, self._parse_items(response)
+
+    async def _format_batch(self, items_json: str, raw_items: List[Any], deadline: float,
+                            expected: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Normalize one batch, retrying only this batch; falls back to `_fallback_format` for it.
+
+        Batches are merged by position, so output with other than `expected`
+        items is rejected like invalid JSON. Returns the items and the tokens
+        the model calls reported.
+        """
+        prompt = self._prompt(items_json)
+
+        def valid(result: Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]) -> bool:
+            items = result[1]
+            return items is not None and (expected is None or len(items) == expected)
+
+        tokens = 0
+        for attempt in range(1 + max(0, FORMATTER_BATCH_RETRIES)):
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                METRICS.incr("deadline.exceeded", node="formatter_agent")
+                break
+            if attempt:
+                METRICS.incr("formatter.batch_retry")
+            try:
+                response, items = await self._router.run(
+                    lambda model, time_left: self._invoke(model, prompt, time_left),
+                    validate=valid,
+                    timeout=time_left,
+                )
+            except asyncio.TimeoutError:
+                # Out of time: normalize deterministically rather than make the user wait
+                logger.warning("Formatter batch exceeded the formatter budget; using deterministic projection")
+                METRICS.incr("deadline.exceeded", node="formatter_agent")
+                break
+            except Overloaded as e:
+                # Every model's queue is full; retrying now would only queue again
+                logger.warning("Formatter models overloaded (%s); using deterministic projection", e)
+                break
+            except Exception as e:
+                logger.warning("Formatter batch failed (attempt %d): %s", attempt + 1, e)
+                continue
+            tokens += int(response["messages"][-1].response_metadata.get("total_tokens", 0) or 0)
+            if valid((response, items)):
+                return items, tokens
+            logger.warning("Formatter batch returned %s (attempt %d)",
+                           "invalid output" if items is None else f"{len(items)} items for {expected}", attempt + 1)
+        METRICS.incr("formatter.batch_fallback")
+        return self._fallback_format(raw_items), tokens
+
     async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Takes last message as raw JSON list; returns normalized JSON list as text.
-        Also promotes nested coordinates (location.lat/lng) to top-level lat/lng when present.
+        Also promotes nested coordinates (location.lat/lng) to top-level lat/lng when present,
+        projects the items down to the fields the prompt reads, and normalizes them in
+        token-budgeted batches that run concurrently (within the OCI admission limits).
         """
         # Promote coordinates deterministically so the map can always resolve them
         raw = state["messages"][-1].content
-        raw_for_llm = raw
+        data: Any = None
         try:
-            data = json.loads(raw)
-            if isinstance(data, list):
-                for it in data:
-                    if isinstance(it, dict):
-                        # Only read from location.lat/lng
-                        loc = it.get("location")
-                        if isinstance(loc, dict):
-                            lat = loc.get("lat")
-                            lng = loc.get("lng")
-                            if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
-                                it["lat"], it["lng"] = lat, lng
-            raw_for_llm = json.dumps(data, ensure_ascii=False)
+            data = json_codec.loads(raw)
         except Exception:
             # If parsing fails, proceed with the original raw
             pass
+        budget = Deadline.from_state(state).budget_for("formatter_agent")
+        deadline = time.monotonic() + budget
 
-        # Provide default city context inline for the model
-        prompt = (
-            f"DEFAULT_CITY: {self.default_city}\n"
-            f"RAW_ITEMS_JSON: {raw_for_llm}\n"
-            "Return ONLY the normalized JSON array as described."
+        if not isinstance(data, list):
+            raw_for_llm = raw if data is None else json_codec.dumps(data, ensure_ascii=False)
+            items, tokens = await self._format_batch(raw_for_llm, [], deadline)
+            return self._items_message(items, tokens)
+
+        raw_items = [it for it in data if isinstance(it, dict)]
+        for it in raw_items:
+            # Only read from location.lat/lng
+            loc = it.get("location")
+            if isinstance(loc, dict):
+                lat = loc.get("lat")
+                lng = loc.get("lng")
+                if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
+                    it["lat"], it["lng"] = lat, lng
+        projected = PROJECTOR.project(raw_items, bytes_in=len(raw.encode("utf-8"))).items
+        # Items past the projection's request budget skip the model
+        over_budget = raw_items[len(projected):]
+
+        batches = self._batches(projected)
+        if len(batches) > 1:
+            logger.info("Formatting %d items in %d batches", len(projected), len(batches))
+        METRICS.incr("formatter.batches", len(batches))
+        results = await asyncio.gather(*(
+            self._format_batch(
+                json_codec.dumps([projected[i] for i in batch], ensure_ascii=False),
+                [raw_items[i] for i in batch],
+                deadline,
+                expected=len(batch),
+            )
+            for batch in batches
+        ))
+        # gather keeps batch order, so the merged list follows the input ranking
+        items = [item for batch_items, _ in results for item in batch_items]
+        items.extend(self._fallback_format(over_budget))
+        return self._items_message(items, sum(tokens for _, tokens in results))
+
+    def _items_message(self, items: List[Dict[str, Any]], tokens: int) -> Dict[str, Any]:
+        message = AIMessage(
+            content=json_codec.dumps(items, ensure_ascii=False),
+            name="formatter_agent",
+            response_metadata={"model_id": self._router.model, "total_tokens": tokens},
         )
-        result = await self._agent.ainvoke({"messages": [HumanMessage(content=prompt)]})
-        return result
+        return {"messages": [message]}
+
+    def _fallback_format(self, items: List[Any]) -> List[Dict[str, Any]]:
+        """Best-effort normalization following FORMATTER_PROMPT without an LLM."""
+        out: List[Dict[str, Any]] = []
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            location = it.get("address") or ", ".join(v for v in (it.get("city"), it.get("state")) if v) or self.default_city
+            categories = it.get("categories") or ([it["categoryName"]] if it.get("categoryName") else [])
+            entry: Dict[str, Any] = {
+                "name": it.get("title") or it.get("name") or "Unknown",
+                "caption": ", ".join(str(c) for c in categories[:3]) or "Popular spot",
+                "rating": rating_stars(it.get("totalScore") if it.get("totalScore") is not None else it.get("rating")),
+                "location": location,
+                "imageURL": it.get("imageUrl") or "",
+                "infoLink": it.get("website") or it.get("url") or it.get("searchPageUrl") or "",
+            }
+            lat: Optional[float] = it.get("lat")
+            lng: Optional[float] = it.get("lng")
+            if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
+                entry["lat"], entry["lng"] = lat, lng
+            out.append(entry)
+        return out
 
@@ -0,0 +1,119 @@
+import copy
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import jsonschema
+from langchain.messages import HumanMessage
+
+from agent import json_codec
+from agent.graph.hedging import hedged_call
+from agent.json_repair import repair_json
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+Path = Tuple[Any, ...]
+
+FRAGMENT_REPAIR_PROMPT = (
+    "The following A2UI {kind} is invalid.\n"
+    "Validation error: {error} (at {location})\n"
+    "It must validate against this JSON schema:\n{schema}\n"
+    "Invalid {kind}:\n{fragment}\n"
+    "Return ONLY the corrected {kind} as a single JSON object. Keep ids, paths and values unchanged "
+    "unless they cause the error."
+)
+
+
+def locate_fragment(error_path: Sequence[Any]) -> Optional[Tuple[Path, str]]:
+    """Smallest self-contained piece of a message list that contains `error_path`.
+
+    Errors inside a surfaceUpdate component map to that component; anything
+    else maps to the whole message. Errors on the list itself have no fragment.
+    """
+    path = tuple(error_path)
+    if not path or not isinstance(path[0], int):
+        return None
+    if len(path) >= 4 and path[1] == "surfaceUpdate" and path[2] == "components" and isinstance(path[3], int):
+        return path[:4], "component"
+    return path[:1], "message"
+
+
+def _get(doc: Any, path: Path) -> Any:
+    for part in path:
+        doc = doc[part]
+    return doc
+
+
+def _set(doc: Any, path: Path, value: Any) -> None:
+    _get(doc, path[:-1])[path[-1]] = value
+
+
+class FragmentRepairer:
+    """Asks the model to fix only the message or component a schema error points at.
+
+    The corrected fragment is spliced back into the message list and the whole
+    list revalidated, so prompt and output size follow the size of the broken
+    piece rather than the size of the UI.
+    """
+
+    def __init__(self, message_schema: Dict[str, Any], make_llm: Callable[[], Any], name: str, max_fragments: int = 3,
+                 backend: Optional[str] = None):
+        self.message_schema = message_schema
+        self.list_schema = {"type": "array", "items": message_schema}
+        self.validator = jsonschema.Draft7Validator(self.list_schema)
+        self.make_llm = make_llm
+        self.name = name
+        self.max_fragments = max_fragments
+        self.backend = backend
+
+    def _fragment_schema(self, kind: str) -> Dict[str, Any]:
+        if kind == "component":
+            return self.message_schema["properties"]["surfaceUpdate"]["properties"]["components"]["items"]
+        return self.message_schema
+
+    async def repair(self, messages: List[Any], time_left: float) -> Optional[List[Any]]:
+        """Return a schema-valid copy of `messages`, or None if a fragment can't be fixed in time."""
+        deadline = time.monotonic() + time_left
+        doc = copy.deepcopy(messages)
+        attempted = set()
+        for _ in range(self.max_fragments):
+            error = jsonschema.exceptions.best_match(self.validator.iter_errors(doc))
+            if error is None:
+                METRICS.incr("presenter.fragment_repair", outcome="ok")
+                return doc
+            located = locate_fragment(error.absolute_path)
+            if located is None or located[0] in attempted or time.monotonic() >= deadline:
+                break
+            fragment_path, kind = located
+            attempted.add(fragment_path)
+
+            prompt = FRAGMENT_REPAIR_PROMPT.format(
+                kind=kind,
+                error=error.message,
+                location="/" + "/".join(str(p) for p in error.absolute_path),
+                schema=json_codec.dumps(self._fragment_schema(kind)),
+                fragment=json_codec.dumps(_get(doc, fragment_path), ensure_ascii=False),
+            )
+            METRICS.observe("presenter.repair_prompt_chars", len(prompt), mode="fragment")
+            logger.info("Repairing A2UI %s at %s (%d prompt chars)", kind, fragment_path, len(prompt))
+            try:
+                resp = await hedged_call(
+                    lambda: self.make_llm().ainvoke([HumanMessage(content=prompt)]),
+                    name=f"{self.name}:fragment_repair",
+                    timeout=max(0.0, deadline - time.monotonic()),
+                    backend=self.backend,
+                )
+                fixed, _repairs = repair_json(str(resp.content))
+            except Exception as e:
+                logger.warning("Fragment repair call failed: %s", e)
+                break
+            if not isinstance(fixed, dict):
+                break
+            _set(doc, fragment_path, fixed)
+
+        if not self.validator.is_valid(doc):
+            METRICS.incr("presenter.fragment_repair", outcome="failed")
+            return None
+        METRICS.incr("presenter.fragment_repair", outcome="ok")
+        return doc
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from agent.admission import GOVERNOR
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+# A duplicate request is sent once the first runs longer than this latency percentile
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+# Until enough samples exist, hedge after a fixed delay instead
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_S", "20"))
+
+
+def hedge_delay(name: str) -> Optional[float]:
+    """Seconds to wait before hedging calls named `name`, or None to never hedge."""
+    if not HEDGE_ENABLED:
+        return None
+    if METRICS.count("llm.latency", call=name) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_S
+    return METRICS.percentile("llm.latency", HEDGE_PERCENTILE, call=name)
+
+
+async def hedged_call(make_call: Callable[[], Awaitable[T]], name: str, timeout: Optional[float] = None,
+                      backend: Optional[str] = None) -> T:
+    """Await `make_call()`, sending one duplicate if it is slower than usual.
+
+    Whichever attempt succeeds first wins and the other is cancelled. Raises
+    `asyncio.TimeoutError` when neither finishes within `timeout` seconds, and
+    re-raises the last error when both attempts fail. With a `backend`, each
+    attempt holds one of its admission slots (see agent.admission).
+    """
+    started = time.monotonic()
+    deadline = None if timeout is None else started + timeout
+
+    def time_left() -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    async def admitted_call() -> T:
+        async with GOVERNOR.slot(backend):
+            return await make_call()
+
+    attempts = [asyncio.ensure_future(admitted_call())]
+    attempt_started = [started]
+    delay = hedge_delay(name)
+    last_error: Optional[BaseException] = None
+    try:
+        if delay is not None:
+            left = time_left()
+            done, _ = await asyncio.wait(attempts, timeout=delay if left is None else min(delay, left))
+            # A duplicate only adds load when the backend is already saturated
+            if not done and (left is None or left > delay) and not GOVERNOR.saturated(backend):
+                logger.info("Hedging slow LLM call %s after %.1fs", name, delay)
+                METRICS.incr("llm.hedged", call=name)
+                attempts.append(asyncio.ensure_future(admitted_call()))
+                attempt_started.append(time.monotonic())
+
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=time_left(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                METRICS.incr("llm.timeout", call=name)
+                raise asyncio.TimeoutError(f"LLM call {name} exceeded its {timeout:.1f}s budget")
+            for attempt in done:
+                if attempt.exception() is None:
+                    if len(attempts) > 1:
+                        METRICS.incr("llm.hedge_won" if attempt is attempts[-1] else "llm.hedge_lost", call=name)
+                    # Record the winning attempt's own duration so hedging doesn't skew the percentile
+                    own_start = attempt_started[attempts.index(attempt)]
+                    METRICS.observe("llm.latency", time.monotonic() - own_start, call=name)
+                    return attempt.result()
+                last_error = attempt.exception()
+        raise last_error
+    finally:
+        leftovers = [attempt for attempt in attempts if not attempt.done()]
+        for attempt in leftovers:
+            attempt.cancel()
+        if leftovers:
+            # Let cancelled calls close their connections and release admission slots before returning
+            await asyncio.gather(*leftovers, return_exceptions=True)
@@ -0,0 +1,198 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Words that change the wording of a query but not what is being searched for
+_INTENT_STOPWORDS = {
+    "a", "an", "the", "best", "top", "good", "great", "find", "me", "show",
+    "some", "please", "of", "for", "list", "give", "near", "around", "in", "at",
+}
+
+_LOCATION_ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "ny": "new york",
+    "sf": "san francisco",
+    "la": "los angeles",
+}
+
+IntentKey = Tuple[Any, ...]
+FetchFn = Callable[[int, int], Awaitable[List[Dict[str, Any]]]]
+
+
+def canonical_terms(terms: List[str]) -> Tuple[str, ...]:
+    """Lowercased, de-duplicated, sorted search words without filler words or counts."""
+    words = set()
+    for term in terms:
+        for word in re.findall(r"[a-z]+", str(term).lower()):
+            if word in _INTENT_STOPWORDS:
+                continue
+            # Fold simple plurals so "restaurant" and "restaurants" share a key
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            words.add(word)
+    return tuple(sorted(words))
+
+
+def canonical_location(location: Optional[str]) -> str:
+    """Lowercased location with punctuation collapsed and common aliases resolved."""
+    loc = re.sub(r"[^a-z0-9]+", " ", str(location or "").lower()).strip()
+    return _LOCATION_ALIASES.get(loc, loc)
+
+
+def intent_key(actor_input: Dict[str, Any]) -> IntentKey:
+    """Build the cache key for an actor input, ignoring maxItems and language."""
+    urls = actor_input.get("startUrls") or []
+    if urls:
+        return ("urls", tuple(sorted(str(u.get("url", u) if isinstance(u, dict) else u) for u in urls)))
+    return (
+        "search",
+        canonical_terms(list(actor_input.get("searchStringsArray") or []) + list(actor_input.get("categoryFilterWords") or [])),
+        canonical_location(actor_input.get("locationQuery")),
+    )
+
+
+@dataclass
+class _CacheEntry:
+    items: List[Dict[str, Any]]
+    requested: int
+    stored_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def exhausted(self) -> bool:
+        # A successful fetch returned fewer items than asked for, so asking again won't yield more
+        return len(self.items) < self.requested
+
+
+@dataclass
+class _Flight:
+    """One fetch in progress for an intent, shared by every request waiting on it."""
+    task: "asyncio.Future[List[Dict[str, Any]]]"
+    waiters: int = 0
+
+
+class IntentCache:
+    """Caches the largest place list fetched per search intent.
+
+    A request for N items is answered by slicing the cached list when it is
+    already at least N long. Larger requests fetch only the missing tail when
+    the provider supports offsets, otherwise the full N. Concurrent requests
+    for the same intent share one fetch, which is cancelled once every request
+    waiting on it has been cancelled.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[IntentKey, _CacheEntry]" = OrderedDict()
+        self._flights: Dict[IntentKey, _Flight] = {}
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+
+    def _get_fresh(self, key: IntentKey) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl_seconds:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: IntentKey, entry: _CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def peek(self, key: IntentKey, count: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the first `count` cached items if the cache can fully serve them."""
+        entry = self._get_fresh(key)
+        if entry is not None and (len(entry.items) >= count or entry.exhausted):
+            return entry.items[:count]
+        return None
+
+    async def get_or_fetch(self, key: IntentKey, count: int, fetch: FetchFn, supports_offset: bool = False) -> List[Dict[str, Any]]:
+        """Serve `count` items for `key`, calling `fetch(offset, limit)` only for what is missing."""
+        while True:
+            cached = self.peek(key, count)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if flight is None:
+                flight = self._flights[key] = _Flight(asyncio.ensure_future(self._fill(key, count, fetch, supports_offset)))
+                flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._land(key, flight))
+            flight.waiters += 1
+            try:
+                # Shielded so one caller's cancellation doesn't abort a fetch others still wait on
+                items = await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                flight.waiters -= 1
+                if flight.waiters == 0 and not flight.task.done():
+                    # Forget it now, so a request arriving while it unwinds starts a fresh fetch
+                    # instead of joining one that is about to raise CancelledError
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                    flight.task.cancel()
+                    # Wait for the fetch to unwind so its connections and slots are free on return
+                    await asyncio.gather(flight.task, return_exceptions=True)
+                raise
+            flight.waiters -= 1
+            if not joined:
+                return items[:count]
+            # A shared fetch may have been for fewer items; the loop serves from the cache or fetches the rest
+            entry = self._get_fresh(key)
+            if entry is not None and (len(entry.items) >= count or entry.exhausted):
+                self.hits += 1
+                return entry.items[:count]
+
+    def _land(self, key: IntentKey, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception retrieved; every waiter already got it from the shield
+            flight.task.exception()
+
+    async def _fill(self, key: IntentKey, count: int, fetch: FetchFn, supports_offset: bool) -> List[Dict[str, Any]]:
+        entry = self._get_fresh(key)
+        if entry is not None and supports_offset:
+            self.partial_hits += 1
+            offset = len(entry.items)
+            tail = await fetch(offset, count - offset)
+            items = entry.items + list(tail or [])[: count - offset]
+        else:
+            self.misses += 1
+            items = list(await fetch(0, count) or [])[:count]
+
+        # Never shrink what is cached: a smaller refetch keeps the larger list
+        if entry is not None and len(entry.items) > len(items):
+            return entry.items[:count]
+        self.put(key, items, count)
+        return items[:count]
+
+    def put(self, key: IntentKey, items: List[Dict[str, Any]], requested: int) -> None:
+        """Cache `items` fetched for `requested` places outside get_or_fetch().
+
+        An empty list says nothing about the intent (it may be an upstream hiccup), so it is
+        never cached. Failed fetches raise and store nothing, so a short list here came from a
+        successful call and really is all the provider has. A shorter list never replaces a
+        longer one.
+        """
+        entry = self._get_fresh(key)
+        if items and (entry is None or len(items) >= len(entry.items)):
+            self._store(key, _CacheEntry(items=list(items), requested=requested))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+        }
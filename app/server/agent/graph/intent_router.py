@@ -0,0 +1,162 @@
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_oci import ChatOCIGenAI
+from langchain.messages import HumanMessage
+
+from agent.admission import oci_backend
+from agent.graph.hedging import hedged_call
+
+logger = logging.getLogger(__name__)
+
+SEARCH = "search"
+BOOKING = "booking"
+CONFIRMATION = "confirmation"
+REFINEMENT = "refinement"
+CHIT_CHAT = "chit_chat"
+INTENTS = (SEARCH, BOOKING, CONFIRMATION, REFINEMENT, CHIT_CHAT)
+
+# Rule matches at or above this confidence skip the LLM
+CONFIDENT = 0.75
+
+_CONFIRMATION_RE = re.compile(r"(?i)^\s*user submitted a booking\b")
+_BOOKING_ACTION_RE = re.compile(r"USER_WANTS_TO_BOOK")
+_BOOKING_RE = re.compile(r"(?i)\b(book|reserve|reservation)\b|\btable for \d+")
+_GREETING_RE = re.compile(r"(?i)^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|how are you|who are you|what can you do)\b")
+_SEARCH_RE = re.compile(
+    r"(?i)\b(restaurants?|cafes?|caf[eé]|coffee|food|eat|dinner|lunch|breakfast|brunch|bars?|bistros?|pizza|sushi|"
+    r"burgers?|tacos?|cuisine|chinese|italian|indian|mexican|thai|japanese|french|korean|vegan|places?)\b"
+)
+_REFINE_RE = re.compile(
+    r"(?i)\b(only|just|filter|sort|order by|cheaper|higher rated|better rated|best rated|of (these|those|them)|"
+    r"from (these|those|the list)|fewer|at least|above|over)\b"
+)
+# Wording that asks for a fresh list ("find", "top 10 restaurants", "cafes near") rather than a narrower one
+_NEW_SEARCH_RE = re.compile(
+    r"(?i)\b(find|search|look(?:ing)? for|recommend|suggest)\b|"
+    r"\b\d+\s+(?:\w+\s+)?(?:restaurants?|cafes?|places?|bars?|spots?)\b|"
+    r"\b(?:restaurants?|cafes?|places?|bars?|spots?)\s+(?:in|near|around)\b"
+)
+# ...unless it points back at the results already shown
+_BACK_REFERENCE_RE = re.compile(r"(?i)\b(?:of|from|among)\s+(?:these|those|them|the list|the results)\b")
+# Only the prepositions ignore case; the capital marks a place name ("in Austin", not "at least")
+_LOCATION_RE = re.compile(r"\b(?i:in|near|around|at)\s+[A-Z]")
+# Refinements refine_items() can actually apply; anything else is searched again
+_MIN_RATING_RE = re.compile(r"(\d(?:\.\d)?)\s*\+?\s*(?:stars?|★)|(?:at least|above|over)\s*(\d(?:\.\d)?)")
+_SORT_RE = re.compile(r"\b(sort|order)\b.*\brat|\b(best|higher|better)[ -]rated\b")
+_LIMIT_RE = re.compile(r"\b(?:top|only|just|show(?: me)?|first)\s+(\d+)\b")
+
+
+class IntentRouter:
+    """Rule-based intent classifier that consults a small LLM only when unsure."""
+
+    def __init__(self, model: Optional[str] = None, use_llm: Optional[bool] = None):
+        self.model = model or os.getenv("INTENT_ROUTER_MODEL", "xai.grok-4-fast-non-reasoning")
+        self.use_llm = (os.getenv("INTENT_ROUTER_LLM", "true").lower() == "true") if use_llm is None else use_llm
+        self.llm_timeout = float(os.getenv("INTENT_ROUTER_LLM_TIMEOUT_S", "5"))
+        self._llm = self._build_llm() if self.use_llm else None
+
+    def _build_llm(self) -> ChatOCIGenAI:
+        return ChatOCIGenAI(
+            model_id=self.model,
+            service_endpoint=os.getenv("SERVICE_ENDPOINT"),
+            compartment_id=os.getenv("COMPARTMENT_ID"),
+            model_kwargs={"temperature": 0.0},
+            auth_profile=os.getenv("AUTH_PROFILE"),
+        )
+
+    def classify_rules(self, text: str, has_session_items: bool) -> Tuple[str, float]:
+        t = (text or "").strip()
+        if _CONFIRMATION_RE.search(t):
+            return CONFIRMATION, 1.0
+        if _BOOKING_ACTION_RE.search(t):
+            return BOOKING, 1.0
+        searchy = bool(_SEARCH_RE.search(t) or _LOCATION_RE.search(t))
+        # "book a table at an Italian place in Austin" still needs a search first
+        if _BOOKING_RE.search(t) and not searchy:
+            return BOOKING, 0.9
+        if (has_session_items and _REFINE_RE.search(t) and not _LOCATION_RE.search(t)
+                and supports_refinement(t) and not _asks_new_search(t)):
+            return REFINEMENT, 0.8
+        if _GREETING_RE.search(t) and not searchy:
+            return CHIT_CHAT, 0.9
+        if searchy:
+            return SEARCH, 0.9
+        return SEARCH, 0.4
+
+    async def classify(self, text: str, has_session_items: bool = False) -> Tuple[str, str]:
+        """Return (intent, source) where source is "rules" or "llm"."""
+        intent, confidence = self.classify_rules(text, has_session_items)
+        if confidence >= CONFIDENT or not self.use_llm:
+            return intent, "rules"
+        llm_intent = await self._classify_llm(text, has_session_items)
+        if llm_intent is None:
+            return intent, "rules"
+        if llm_intent == REFINEMENT and (not supports_refinement(text) or _asks_new_search(text)):
+            # refine_items() would return the list unchanged, or a new list was asked for; search instead
+            return SEARCH, "llm"
+        return llm_intent, "llm"
+
+    async def _classify_llm(self, text: str, has_session_items: bool) -> Optional[str]:
+        allowed = [i for i in INTENTS if has_session_items or i != REFINEMENT]
+        prompt = (
+            "Classify the user's message for a restaurant finder assistant.\n"
+            f"Answer with exactly one word from: {', '.join(allowed)}.\n"
+            "- search: find restaurants or cafes\n"
+            "- booking: wants to book or reserve a table\n"
+            "- confirmation: submits booking details\n"
+            + ("- refinement: narrows or reorders the results already shown\n" if has_session_items else "")
+            + "- chit_chat: greetings, thanks or anything unrelated\n"
+            f"MESSAGE: {text}"
+        )
+        try:
+            resp = await hedged_call(
+                lambda: self._llm.ainvoke([HumanMessage(content=prompt)]),
+                name="intent_router",
+                timeout=self.llm_timeout,
+                backend=oci_backend(self.model),
+            )
+            answer = str(resp.content).strip().lower().replace("-", "_")
+            for intent in allowed:
+                if intent in answer:
+                    return intent
+        except Exception as e:
+            logger.warning("LLM intent classification failed; using rules. Error: %s", e)
+        return None
+
+
+def _star_count(rating: Any) -> float:
+    if isinstance(rating, (int, float)):
+        return float(rating)
+    return float(str(rating or "").count("★"))
+
+
+def _asks_new_search(text: str) -> bool:
+    return bool(_NEW_SEARCH_RE.search(text or "")) and not _BACK_REFERENCE_RE.search(text or "")
+
+
+def supports_refinement(text: str) -> bool:
+    """Whether refine_items() understands `text` (a rating floor, a rating sort or a count)."""
+    t = (text or "").lower()
+    return bool(_MIN_RATING_RE.search(t) or _SORT_RE.search(t) or _LIMIT_RE.search(t))
+
+
+def refine_items(items: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
+    """Apply simple refinements ("only 4+ stars", "top 3", "sort by rating") to shown items."""
+    t = (text or "").lower()
+    out = [it for it in items if isinstance(it, dict)]
+
+    m = _MIN_RATING_RE.search(t)
+    if m:
+        threshold = float(m.group(1) or m.group(2))
+        out = [it for it in out if _star_count(it.get("rating")) >= threshold]
+
+    if _SORT_RE.search(t):
+        out = sorted(out, key=lambda it: -_star_count(it.get("rating")))
+
+    m = _LIMIT_RE.search(t)
+    if m:
+        out = out[: max(1, int(m.group(1)))]
+    return out
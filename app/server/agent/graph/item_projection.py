@@ -0,0 +1,150 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from agent import json_codec
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_ENABLED = os.getenv("PROJECTION_ENABLED", "true").lower() == "true"
+# Longest kept value for free text (descriptions, categories); URLs are never cut
+PROJECTION_TEXT_CHARS = int(os.getenv("PROJECTION_TEXT_CHARS", "160"))
+# Items beyond this size lose their lowest-priority fields
+PROJECTION_ITEM_BYTES = int(os.getenv("PROJECTION_ITEM_BYTES", "1200"))
+# Items past this total are left out of the prompt (the lowest-ranked tail)
+PROJECTION_REQUEST_BYTES = int(os.getenv("PROJECTION_REQUEST_BYTES", "60000"))
+# Values kept from list fields such as categories
+PROJECTION_LIST_ITEMS = 3
+
+# Everything FORMATTER_PROMPT reads, most important first; the per-item budget drops from the end
+# (free text first). Google Places actor names lead each group, then the alternatives the prompt
+# accepts from other scrapers.
+DEFAULT_FIELDS = (
+    "title", "name",
+    "lat", "lng", "location", "latitude", "longitude", "coords", "geo",
+    "address", "formattedAddress", "fullAddress", "vicinity", "city", "state",
+    "totalScore", "rating",
+    "website", "url", "link", "searchPageUrl",
+    "imageUrl", "photoUrl", "thumbnail", "image", "photo",
+    "categoryName", "categories", "types", "cuisines", "labels",
+    "description",
+)
+# Never dropped by the per-item budget, whatever PROJECTION_FIELDS says: the card title,
+# and the coordinates and address the presenter's map needs
+_NEVER_TRIM = frozenset((
+    "title", "name",
+    "lat", "lng", "location", "latitude", "longitude", "coords", "geo",
+    "address", "formattedAddress", "fullAddress", "vicinity", "city", "state",
+))
+PROJECTION_FIELDS = tuple(
+    f.strip() for f in os.getenv("PROJECTION_FIELDS", ",".join(DEFAULT_FIELDS)).split(",") if f.strip()
+)
+
+
+def _size(value: Any) -> int:
+    return len(json_codec.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _is_url(key: str, value: str) -> bool:
+    lowered = key.lower()
+    return value.startswith(("http://", "https://")) or lowered.endswith(("url", "link", "website"))
+
+
+@dataclass
+class Projection:
+    items: List[Dict[str, Any]]
+    bytes_in: int
+    bytes_out: int
+    dropped_items: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+
+
+class ItemProjector:
+    """Cuts raw scraper items down to the fields the formatter needs before they reach a prompt.
+
+    Unknown fields (reviews, opening hours, popular times, image lists...) are
+    dropped, free text is trimmed to `text_chars`, and two byte budgets apply:
+    an item over `item_bytes` loses its lowest-priority fields (never its name,
+    address or coordinates), and items past
+    `request_bytes` in total are left out. Items are expected in ranked order.
+    """
+
+    def __init__(self, fields: Sequence[str] = PROJECTION_FIELDS, text_chars: int = PROJECTION_TEXT_CHARS,
+                 item_bytes: int = PROJECTION_ITEM_BYTES, request_bytes: int = PROJECTION_REQUEST_BYTES,
+                 enabled: bool = PROJECTION_ENABLED):
+        self.fields = tuple(fields)
+        self.text_chars = text_chars
+        self.item_bytes = item_bytes
+        self.request_bytes = request_bytes
+        self.enabled = enabled
+
+    def _value(self, key: str, value: Any, depth: int = 0) -> Any:
+        if isinstance(value, str):
+            if len(value) > self.text_chars and not _is_url(key, value):
+                return value[:self.text_chars].rstrip() + "…"
+            return value
+        if isinstance(value, (int, float, bool)) or value is None:
+            return value
+        if depth > 0:
+            return None
+        if isinstance(value, list):
+            kept = [self._value(key, v, depth + 1) for v in value[:PROJECTION_LIST_ITEMS]]
+            return [v for v in kept if v is not None]
+        if isinstance(value, dict):
+            # Nested objects (location, photo) keep only their scalar members
+            kept = {k: self._value(k, v, depth + 1) for k, v in value.items()}
+            return {k: v for k, v in kept.items() if v is not None}
+        return None
+
+    def project_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for key in self.fields:
+            if key not in item:
+                continue
+            value = self._value(key, item[key])
+            if value is not None and value != [] and value != {} and value != "":
+                out[key] = value
+        trimmable = [key for key in out if key not in _NEVER_TRIM]
+        while trimmable and _size(out) > self.item_bytes:
+            out.pop(trimmable.pop())
+        return out
+
+    def project(self, items: List[Any], bytes_in: Optional[int] = None, node: str = "formatter_agent") -> Projection:
+        """Project `items`; pass `bytes_in` when the raw JSON size is already known."""
+        if bytes_in is None:
+            bytes_in = _size(items)
+        if not self.enabled:
+            return Projection([it for it in items if isinstance(it, dict)], bytes_in, bytes_in)
+        kept: List[Dict[str, Any]] = []
+        total = 2  # the enclosing brackets
+        dropped = 0
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if dropped:
+                dropped += 1
+                continue
+            projected = self.project_item(item)
+            size = _size(projected) + 1
+            if kept and total + size > self.request_bytes:
+                # Only a tail is ever cut, so kept items line up with the first dict items of the input
+                dropped += 1
+                continue
+            kept.append(projected)
+            total += size
+        projection = Projection(kept, bytes_in, total, dropped)
+        METRICS.observe("projection.bytes_in", bytes_in, node=node)
+        METRICS.observe("projection.bytes_out", total, node=node)
+        if dropped:
+            METRICS.incr("projection.dropped_items", dropped, node=node)
+        logger.info("%s: projected %d items from %d to %d bytes (%.1fx)%s", node, len(kept), bytes_in, total,
+                    projection.ratio, f", {dropped} over budget" if dropped else "")
+        return projection
+
+
+PROJECTOR = ItemProjector()
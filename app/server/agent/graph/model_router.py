@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from agent.admission import Overloaded
+from agent.graph.struct import AgentConfig
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Off: every node sticks to its configured model, even when the output fails validation
+MODEL_ESCALATION = os.getenv("MODEL_ESCALATION", "true").lower() == "true"
+
+
+class ModelRouter:
+    """Picks the model a graph node calls: the configured (fast) model first,
+    then `escalation_model` when the fast model's output fails validation.
+
+    Latency and outcome are recorded per (node, model) as `model.latency` and
+    `model.calls{outcome=ok|invalid|error|timeout|rejected}`. Routers are built
+    from the graph config, so POST /agent/config changes routing on the next version.
+    """
+
+    def __init__(self, node: str, model: str, escalation_model: Optional[str] = None,
+                 build: Optional[Callable[[str], Any]] = None):
+        self.node = node
+        self.model = model
+        self.escalation_model = escalation_model if escalation_model != model else None
+        self._build = build
+        self._clients: Dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, node: str, config: Optional[AgentConfig], default_model: str,
+                    build: Optional[Callable[[str], Any]] = None) -> "ModelRouter":
+        if config is None:
+            return cls(node, default_model, build=build)
+        return cls(node, config.model, config.escalation_model, build=build)
+
+    @property
+    def models(self) -> List[str]:
+        """Models in the order they are tried."""
+        if MODEL_ESCALATION and self.escalation_model:
+            return [self.model, self.escalation_model]
+        return [self.model]
+
+    def client(self, model: str) -> Any:
+        """The client (LLM or agent) for `model`, built once per router."""
+        if model not in self._clients:
+            self._clients[model] = self._build(model)
+        return self._clients[model]
+
+    def record(self, model: str, seconds: float, outcome: str) -> None:
+        METRICS.observe("model.latency", seconds, node=self.node, model=model)
+        METRICS.incr("model.calls", node=self.node, model=model, outcome=outcome)
+
+    async def run(self, call: Callable[[str, Optional[float]], Awaitable[T]],
+                  validate: Callable[[T], bool], timeout: Optional[float] = None) -> T:
+        """Await `call(model, time_left)` for each model until `validate` accepts the result.
+
+        All attempts share `timeout`. A timeout ends routing (the node's budget is
+        spent) and is re-raised; other errors escalate like invalid output. If every
+        model fails validation the last result is returned so callers keep their
+        own repair or fallback path; if every model errors, the last error is raised.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        models = self.models
+        result: Optional[T] = None
+        have_result = False
+        last_error: Optional[BaseException] = None
+        for i, model in enumerate(models):
+            time_left = None if deadline is None else deadline - time.monotonic()
+            if time_left is not None and time_left <= 0:
+                break
+            started = time.monotonic()
+            try:
+                result = await call(model, time_left)
+            except asyncio.TimeoutError:
+                self.record(model, time.monotonic() - started, "timeout")
+                raise
+            except Overloaded as e:
+                # A saturated model is skipped like a failed one; the next model has its own queue
+                self.record(model, time.monotonic() - started, "rejected")
+                last_error = e
+            except Exception as e:
+                self.record(model, time.monotonic() - started, "error")
+                logger.warning("%s: %s failed: %s", self.node, model, e)
+                last_error = e
+            else:
+                have_result = True
+                try:
+                    ok = bool(validate(result))
+                except Exception:
+                    ok = False
+                self.record(model, time.monotonic() - started, "ok" if ok else "invalid")
+                if ok:
+                    return result
+            if i + 1 < len(models):
+                logger.info("%s: escalating from %s to %s", self.node, model, models[i + 1])
+                METRICS.incr("model.escalated", node=self.node, model=models[i + 1])
+        if have_result:
+            return result
+        if last_error is not None:
+            raise last_error
+        raise asyncio.TimeoutError()
@@ -0,0 +1,170 @@
+import heapq
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_PUNCT_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(value: Any) -> str:
+    """Accent-folded, lowercased text with punctuation collapsed to single spaces."""
+    if not value:
+        return ""
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", str(value)) if not unicodedata.combining(ch))
+    # Other non-ASCII characters (dashes, curly quotes) separate words like ASCII punctuation does
+    text = text.encode("ascii", "replace").decode("ascii").lower()
+    return _PUNCT_RE.sub(" ", text).strip()
+
+
+def place_key(item: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """Identity of a place: its `placeId`, else normalized name + address."""
+    place_id = item.get("placeId")
+    if place_id:
+        return ("id", str(place_id))
+    name = normalize_text(item.get("title") or item.get("name"))
+    if not name:
+        return None
+    address = normalize_text(item.get("address") or item.get("street") or item.get("city"))
+    return ("name", f"{name}|{address}")
+
+
+def merge_ranked(result_lists: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Interleave ranked result lists by position and drop repeated places.
+
+    The first result of every list outranks the second result of any list, so
+    each search string contributes its best matches before anyone's runners-up.
+    """
+    lists = [lst for lst in result_lists if lst]
+    merged: List[Dict[str, Any]] = []
+    seen = set()
+    depth = max((len(lst) for lst in lists), default=0)
+    for position in range(depth):
+        for lst in lists:
+            if position >= len(lst):
+                continue
+            item = lst[position]
+            if not isinstance(item, dict):
+                continue
+            key = place_key(item)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(item)
+    return merged
+
+
+def _coords(item: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    loc = item.get("location")
+    if isinstance(loc, dict):
+        lat, lng = loc.get("lat"), loc.get("lng")
+    else:
+        lat, lng = item.get("lat"), item.get("lng")
+    if isinstance(lat, (int, float)) and isinstance(lng, (int, float)):
+        return float(lat), float(lng)
+    return None
+
+
+def _distance_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    # Equirectangular approximation: accurate enough at city scale and much cheaper than haversine
+    lat1, lng1 = math.radians(a[0]), math.radians(a[1])
+    lat2, lng2 = math.radians(b[0]), math.radians(b[1])
+    x = (lng2 - lng1) * math.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return 6371.0 * math.hypot(x, y)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RankingWeights:
+    """Relative weight of each signal in the final score (each signal is scaled to 0-1)."""
+    rating: float = 0.55
+    popularity: float = 0.25
+    proximity: float = 0.20
+    temporarily_closed_penalty: float = 0.5
+    # Bayesian prior: a rating backed by few reviews is pulled toward the candidates' mean
+    prior_reviews: float = 20.0
+
+
+class PlaceRanker:
+    """Dedupes raw Apify places and orders them by quality and distance.
+
+    Permanently closed places are dropped; temporarily closed ones are
+    penalised. Distance is measured from the median coordinate of the
+    candidates, which approximates the centre of the searched location.
+    """
+
+    def __init__(self, weights: Optional[RankingWeights] = None):
+        self.weights = weights or RankingWeights()
+
+    def dedupe(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop repeated places, keeping the variant with the most reviews."""
+        best: Dict[Any, int] = {}
+        out: List[Dict[str, Any]] = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            key = place_key(item)
+            if key is None:
+                out.append(item)
+                continue
+            index = best.get(key)
+            if index is None:
+                best[key] = len(out)
+                out.append(item)
+            elif (_number(item.get("reviewsCount")) or 0) > (_number(out[index].get("reviewsCount")) or 0):
+                out[index] = item
+        return out
+
+    def rank(self, items: Iterable[Dict[str, Any]], count: Optional[int] = None) -> List[Dict[str, Any]]:
+        candidates = [it for it in self.dedupe(items) if not it.get("permanentlyClosed")]
+        if not candidates:
+            return []
+        w = self.weights
+
+        ratings = [_number(it.get("totalScore") if it.get("totalScore") is not None else it.get("rating")) for it in candidates]
+        reviews = [max(0.0, _number(it.get("reviewsCount")) or 0.0) for it in candidates]
+        coords = [_coords(it) for it in candidates]
+
+        rated = [r for r in ratings if r is not None]
+        prior_mean = sum(rated) / len(rated) if rated else 3.5
+        max_log_reviews = max((math.log1p(v) for v in reviews), default=0.0) or 1.0
+
+        known = [c for c in coords if c is not None]
+        centroid = (median(c[0] for c in known), median(c[1] for c in known)) if known else None
+        distances = [_distance_km(c, centroid) if (c is not None and centroid is not None) else None for c in coords]
+        known_distances = [d for d in distances if d is not None]
+        # Half of the proximity score is lost at the typical candidate distance
+        distance_scale = (median(known_distances) if known_distances else 0.0) or 1.0
+
+        scored = []
+        for index, item in enumerate(candidates):
+            rating = ratings[index]
+            n = reviews[index]
+            bayes = ((rating if rating is not None else prior_mean) * n + prior_mean * w.prior_reviews) / (n + w.prior_reviews)
+            score = w.rating * (bayes / 5.0) + w.popularity * (math.log1p(n) / max_log_reviews)
+            distance = distances[index]
+            if distance is not None:
+                score += w.proximity * (distance_scale / (distance_scale + distance))
+            else:
+                score += w.proximity * 0.5
+            if item.get("temporarilyClosed"):
+                score *= w.temporarily_closed_penalty
+            # Ties keep the provider's original order
+            scored.append((-score, index, item))
+
+        # (score, index) is unique, so items themselves are never compared
+        if count is not None and count < len(scored):
+            top = heapq.nsmallest(count, scored, key=lambda entry: (entry[0], entry[1]))
+        else:
+            top = sorted(scored, key=lambda entry: (entry[0], entry[1]))
+        return [item for _, _, item in top]
@@ -1,6 +1,7 @@
-import json
+import asyncio
 import logging
 import os
+import time
 from langchain.agents import create_agent
 from langchain_oci import ChatOCIGenAI
 from langchain.messages import HumanMessage, AIMessage
@@ -9,12 +10,22 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import jsonschema
+from agent import json_codec
+from agent.admission import Overloaded, oci_backend
 from agent.prompt_builder import (
     A2UI_SCHEMA,
     RESTAURANT_UI_EXAMPLES,
     get_ui_prompt,
 )
+from agent.a2ui_templates import inject_items, restaurant_list_messages
+from agent.graph.deadline import Deadline
+from agent.graph.fragment_repair import FragmentRepairer
+from agent.graph.hedging import hedged_call
+from agent.graph.model_router import ModelRouter
 from agent.graph.struct import AgentConfig
+from agent.json_repair import repair_json
+from agent.metrics import METRICS
+from agent.structured_logging import log_event, truncated
 
 logger = logging.getLogger(__name__)
 
@@ -44,12 +55,19 @@ class PresenterAgent:
             self.agent_name = "presenter_agent"
         self.base_url = base_url
         self.use_ui = use_ui
-        self._agent = self._build_agent()
+        # "fragment" asks the model to fix only the invalid piece; "full" regenerates everything
+        self.repair_mode = os.getenv("PRESENTER_REPAIR_MODE", "fragment").lower()
+        # "native" sends /items once as A2UI valueMap entries; "json" keeps the JSON-string blob
+        self.items_encoding = os.getenv("A2UI_ITEMS_ENCODING", "native").lower()
+        # The first attempt uses the configured model, the retry after a failed validation the escalation model
+        self._router = ModelRouter.from_config("presenter_agent", config, self.oci_model, build=self._build_agent)
+        self._router.client(self.oci_model)
+        self._repairer = None
 
         # Load the A2UI_SCHEMA string into a Python object for validation
         try:
             # First, load the schema for a *single message*
-            single_message_schema = json.loads(A2UI_SCHEMA)
+            single_message_schema = json_codec.loads(A2UI_SCHEMA)
 
             # The prompt instructs the LLM to return a *list* of messages.
             # Therefore, our validation schema must be an *array* of the single message schema.
@@ -57,23 +75,29 @@ class PresenterAgent:
             logger.info(
                 "A2UI_SCHEMA successfully loaded and wrapped in an array validator."
             )
-        except json.JSONDecodeError as e:
+            repair_llm = self._build_llm(temperature=0.0)
+            self._repairer = FragmentRepairer(single_message_schema, lambda: repair_llm, name=self.agent_name,
+                                              backend=oci_backend(self.oci_model))
+        except json_codec.JSONDecodeError as e:
             logger.error(f"CRITICAL: Failed to parse A2UI_SCHEMA: {e}")
             self.a2ui_schema_object = None
 
-    def _build_agent(self) -> CompiledStateGraph:
+    def _build_llm(self, temperature: float, model: str | None = None) -> ChatOCIGenAI:
+        return ChatOCIGenAI(
+            model_id=model or self.oci_model,
+            service_endpoint=os.getenv("SERVICE_ENDPOINT"),
+            compartment_id=os.getenv("COMPARTMENT_ID"),
+            model_kwargs={"temperature": temperature},
+            auth_profile=os.getenv("AUTH_PROFILE"),
+        )
+
+    def _build_agent(self, model: str) -> CompiledStateGraph:
         """Builds the agent for the presenter."""
         instruction = AGENT_INSTRUCTION + get_ui_prompt(
             self.base_url, RESTAURANT_UI_EXAMPLES
         )
 
-        oci_llm = ChatOCIGenAI(
-            model_id=self.oci_model,
-            service_endpoint=os.getenv("SERVICE_ENDPOINT"),
-            compartment_id=os.getenv("COMPARTMENT_ID"),
-            model_kwargs={"temperature": self.model_temperature},
-            auth_profile=os.getenv("AUTH_PROFILE"),
-        )
+        oci_llm = self._build_llm(self.model_temperature, model)
 
         return create_agent(
             model=oci_llm,
@@ -89,7 +113,7 @@ class PresenterAgent:
         # Try to parse the formatter's normalized array so we can ensure `/items` exists.
         formatter_items = None
         try:
-            parsed = json.loads(data)
+            parsed = json_codec.loads(data)
             if isinstance(parsed, list):
                 # Shallow aliasing for UI compatibility: imageURL -> imageUrl
                 normalized_list = []
@@ -118,14 +142,39 @@ class PresenterAgent:
                 ]
             }
 
+        # Retries share the node's budget; once it is spent we fall back instead of waiting
+        node_deadline = time.monotonic() + Deadline.from_state(state).budget_for("presenter_agent")
+
         while attempt <= max_retries:
+            time_left = node_deadline - time.monotonic()
+            if time_left <= 0:
+                break
             attempt += 1
             logger.info(
                 f"--- PresenterAgent: Validation attempt {attempt}/{max_retries + 1} ---"
             )
 
+            models = self._router.models
+            model = models[min(attempt, len(models)) - 1]
+            agent = self._router.client(model)
             messages = {'messages': [HumanMessage(content=current_query_text)]}
-            response = await self._agent.ainvoke(messages)
+            started = time.monotonic()
+            try:
+                response = await hedged_call(
+                    lambda: agent.ainvoke(messages),
+                    name=f"presenter_agent:{model}",
+                    timeout=time_left,
+                    backend=oci_backend(model),
+                )
+            except asyncio.TimeoutError:
+                self._router.record(model, time.monotonic() - started, "timeout")
+                logger.warning("--- PresenterAgent: Budget exhausted during attempt %d ---", attempt)
+                break
+            except Overloaded as e:
+                # The deterministic card list beats waiting on a saturated model
+                self._router.record(model, time.monotonic() - started, "rejected")
+                logger.warning("--- PresenterAgent: %s; using fallback ---", e)
+                break
             final_response_content = response['messages'][-1].content
 
             # Validate the response
@@ -147,15 +196,14 @@ class PresenterAgent:
                     if not json_string.strip():
                         raise ValueError("JSON part is empty.")
 
-                    json_string_cleaned = (
-                        json_string.strip().lstrip("```json").rstrip("```").strip()
-                    )
-
-                    if not json_string_cleaned:
-                        raise ValueError("Cleaned JSON string is empty.")
-
-                    # Parse JSON
-                    parsed_json_data = json.loads(json_string_cleaned)
+                    # Parse JSON, fixing mechanical mistakes (fences, comments, trailing
+                    # commas, bare keys) locally instead of paying for a second generation
+                    parsed_json_data, repairs = repair_json(json_string, expect_list=True)
+                    if repairs:
+                        logger.info("--- PresenterAgent: Repaired UI JSON locally: %s ---", repairs)
+                        for repair in repairs:
+                            METRICS.incr("presenter.json_repair", repair=repair)
+                        json_string = json_codec.dumps(parsed_json_data, ensure_ascii=False)
 
                     # Validate against A2UI_SCHEMA
                     logger.info(
@@ -171,21 +219,32 @@ class PresenterAgent:
                     )
                     is_valid = True
                     final_response_content = f"{text_part}\n---a2ui_JSON---\n{json_string}"
+                except jsonschema.exceptions.ValidationError as e:
+                    logger.warning(
+                        f"--- PresenterAgent: A2UI schema validation failed: {e.message} (Attempt {attempt}) ---"
+                    )
+                    error_message = f"Validation failed: {e.message}."
+                    # The JSON parsed, so only the offending fragment needs the model's attention
+                    if self.repair_mode == "fragment" and self._repairer is not None:
+                        repaired = await self._repairer.repair(parsed_json_data, node_deadline - time.monotonic())
+                        if repaired is not None:
+                            is_valid = True
+                            json_string = json_codec.dumps(repaired, ensure_ascii=False)
+                            final_response_content = f"{text_part}\n---a2ui_JSON---\n{json_string}"
                 except (
                     ValueError,
-                    json.JSONDecodeError,
-                    jsonschema.exceptions.ValidationError,
+                    json_codec.JSONDecodeError,
                 ) as e:
                     logger.warning(
-                        f"--- PresenterAgent: A2UI validation failed: {e} (Attempt {attempt}) ---"
-                    )
-                    logger.warning(
-                        f"--- Failed response content: {final_response_content[:500]}... ---"
+                        "--- PresenterAgent: A2UI validation failed: %s (Attempt %d) ---", e, attempt
                     )
+                    log_event(logger, "payload", "Failed response content: %s",
+                              truncated(final_response_content, 500), level=logging.WARNING)
                     error_message = f"Validation failed: {e}."
 
             else:  # Not using UI, so text is always "valid"
                 is_valid = True
+            self._router.record(model, time.monotonic() - started, "ok" if is_valid else "invalid")
 
             if is_valid:
                 logger.info(
@@ -202,54 +261,17 @@ class PresenterAgent:
                         # Extract the JSON list of messages from the validated content.
                         _text_part, json_string = final_response_content.split("---a2ui_JSON---", 1)
                         json_string_cleaned = json_string.strip().lstrip("```json").rstrip("```").strip()
-                        ui_msgs = json.loads(json_string_cleaned)
+                        ui_msgs = json_codec.loads(json_string_cleaned)
                         if isinstance(ui_msgs, list):
-                            # Find surfaceId from any existing message; fallback to "default".
-                            surface_id = "default"
-                            for m in ui_msgs:
-                                sid = (
-                                    (m.get("beginRendering") or {}).get("surfaceId")
-                                    or (m.get("surfaceUpdate") or {}).get("surfaceId")
-                                    or (m.get("dataModelUpdate") or {}).get("surfaceId")
-                                )
-                                if isinstance(sid, str) and sid:
-                                    surface_id = sid
-                                    break
-
-                            # Create a dataModelUpdate that writes the raw items array at `/items`.
-                            # We use the special `{ key: '.', valueString: JSON }` convention at a non-root path
-                            # so the client sets the primitive value at that exact location.
-                            ensure_items_msg = {
-                                "dataModelUpdate": {
-                                    "surfaceId": surface_id,
-                                    "path": "/items",
-                                    "contents": [
-                                        {
-                                            "key": ".",
-                                            "valueString": json.dumps(formatter_items, ensure_ascii=False),
-                                        }
-                                    ],
-                                }
-                            }
-
-                            # Append our injection just after the LLM messages in the same assistant turn.
-                            # The client collects all parts from this message stream already, so we can
-                            # return the validated messages and rely on the router to send `ensure_items_msg`
-                            # as an additional part.
-                            # We encode both messages into the final assistant content expected by the client
-                            # by concatenating another JSON list element.
-                            try:
-                                # Merge by materializing both messages back into the `---a2ui_JSON---` payload.
-                                ui_msgs.append(ensure_items_msg)
-                                merged = json.dumps(ui_msgs, ensure_ascii=False)
-                                validated_response['messages'][-1] = AIMessage(
-                                    content=f"{_text_part}\n---a2ui_JSON---\n{merged}"
-                                )
-                            except Exception:
-                                # If merging fails, we still return the validated response.
-                                pass
+                            # Materialize the items back into the `---a2ui_JSON---` payload, either merged
+                            # into the LLM's own valueMap ("native") or as a trailing JSON-string update ("json").
+                            ui_msgs = inject_items(ui_msgs, formatter_items, self.items_encoding)
+                            merged = json_codec.dumps(ui_msgs, ensure_ascii=False)
+                            validated_response['messages'][-1] = AIMessage(
+                                content=f"{_text_part}\n---a2ui_JSON---\n{merged}"
+                            )
                 except Exception as e:
-                    logger.warning(f"--- PresenterAgent: Failed to inject /items dataModelUpdate: {e} ---")
+                    logger.warning("--- PresenterAgent: Failed to inject /items dataModelUpdate: %s ---", e)
 
                 return validated_response
 
@@ -258,6 +280,10 @@ class PresenterAgent:
                 logger.warning(
                     f"--- PresenterAgent: Retrying... ({attempt}/{max_retries + 1}) ---"
                 )
+                METRICS.incr("presenter.retry")
+                if attempt < len(models):
+                    logger.info("--- PresenterAgent: Escalating to %s ---", models[attempt])
+                    METRICS.incr("model.escalated", node="presenter_agent", model=models[attempt])
                 # Prepare retry query
                 current_query_text = (
                     f"Your previous response was invalid. {error_message} "
@@ -268,15 +294,24 @@ class PresenterAgent:
                 )
                 # Loop continues for retry
 
-        # If here, max retries exhausted
+        # If here, max retries or the time budget were exhausted
+        if node_deadline - time.monotonic() <= 0:
+            METRICS.incr("deadline.exceeded", node="presenter_agent")
         logger.error(
-            "--- PresenterAgent: Max retries exhausted. Returning error. ---"
+            "--- PresenterAgent: Max retries or budget exhausted. Returning fallback. ---"
         )
-        return {
-            'messages': state['messages'] + [
-                AIMessage(content=(
-                    "I'm sorry, I'm having trouble generating the interface for that request right now. "
-                    "Please try again in a moment."
-                ))
-            ]
-        }
+        return {'messages': state['messages'] + [AIMessage(content=self._fallback_content(formatter_items))]}
+
+    def _fallback_content(self, formatter_items) -> str:
+        """Deterministic response used when the LLM could not produce a valid UI in time."""
+        if not formatter_items:
+            return (
+                "I'm sorry, I'm having trouble generating the interface for that request right now. "
+                "Please try again in a moment."
+            )
+        if not self.use_ui:
+            lines = [f"- {it.get('name', 'Unknown')} {it.get('rating', '')} — {it.get('location', '')}"
+                     for it in formatter_items if isinstance(it, dict)]
+            return "Here are the restaurants I found:\n" + "\n".join(lines)
+        ui_msgs = restaurant_list_messages(formatter_items)
+        return f"Here are the restaurants I found.\n---a2ui_JSON---\n{json_codec.dumps(ui_msgs, ensure_ascii=False)}"
@@ -0,0 +1,66 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """Client-side request rate limit: `rate` requests per second with bursts of up to `burst`.
+
+    Implemented as a generic cell rate algorithm, so a reservation is plain
+    arithmetic and callers sleep outside any lock. `pause()` holds everyone
+    back, e.g. for a server's Retry-After.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.interval = 1.0 / rate
+        self.tolerance = (max(1, burst) - 1) * self.interval
+        self._tat = 0.0  # theoretical arrival time of the next request
+        self._paused_until = 0.0
+
+    def delay(self) -> float:
+        """Seconds a request made now would wait."""
+        now = time.monotonic()
+        tat = max(self._tat, now, self._paused_until + self.tolerance)
+        return max(0.0, tat - self.tolerance - now)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Wait for a token and return how long that took, or None (without waiting) if it would exceed `max_wait`."""
+        now = time.monotonic()
+        tat = max(self._tat, now, self._paused_until + self.tolerance)
+        wait = max(0.0, tat - self.tolerance - now)
+        if max_wait is not None and wait > max_wait:
+            return None
+        self._tat = tat + self.interval
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give the reservation back so a cancelled caller doesn't delay everyone after it
+                self._tat -= self.interval
+                raise
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (1-based)."""
+    return random.uniform(0.0, min(cap, base * (2 ** (attempt - 1))))
@@ -1,49 +1,161 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
 from collections.abc import AsyncIterable
 from typing import Any
-from langgraph.graph import StateGraph, START, END, MessagesState
+from langgraph.graph import MessagesState, StateGraph, START, END
 from langgraph.checkpoint.memory import InMemorySaver
 from langchain.messages import HumanMessage, AIMessage, AnyMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 
+from agent import json_codec
 from agent.graph.apify_places_agent import ApifyPlacesAgent
+from agent.graph.deadline import Deadline
 from agent.graph.formatter_agent import FormatterAgent
+from agent.graph.intent_router import (
+    BOOKING, CHIT_CHAT, CONFIRMATION, REFINEMENT, SEARCH, IntentRouter, refine_items,
+)
 from agent.graph.presenter_agent import PresenterAgent
-from agent.graph.struct import AgentConfig, RestaurantGraphException
+from agent.graph.struct import AgentConfig, RestaurantGraphException, SUPPORTED_CONTENT_TYPES
+from agent.image_variants import IMAGE_VARIANTS
+from agent.metrics import METRICS
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Graph state shared by all nodes
+class RestaurantState(MessagesState):
+    """Messages plus the request deadline as epoch seconds (see graph.deadline.Deadline)"""
+    deadline: float
+    # Conversation the request belongs to, and the route chosen by graph.intent_router
+    session_id: str
+    intent: str
+
 class RestaurantGraph:
     """ Graph to call the agent chain """
 
-    SUPPORTED_CONTENT_TYPES = ["text", "text/plain", "text/event-stream"]
+    SUPPORTED_CONTENT_TYPES = SUPPORTED_CONTENT_TYPES
     CONTENT_TRUNCATION_LENGTH = 50
+    # Sessions whose last shown items are kept for refinements
+    MAX_SESSIONS = 1024
+    # Keys the formatter guarantees; items that already have them skip it
+    NORMALIZED_KEYS = ("name", "caption", "rating", "location", "infoLink")
+    CHIT_CHAT_REPLY = (
+        "Hi! I can find restaurants and cafes for you and help book a table. "
+        "Try something like \"top 5 Italian restaurants in Austin\"."
+    )
 
-    def __init__(self, base_url:str, use_ui:bool = False, graph_configuration: dict[str, AgentConfig] = None):
+    def __init__(self, base_url:str, use_ui:bool = False, graph_configuration: dict[str, AgentConfig] = None,
+                 session_items: "OrderedDict[str, list] | None" = None):
         if not graph_configuration:
             raise RestaurantGraphException()
 
         self._apify_places = ApifyPlacesAgent(graph_configuration["apify_places_agent"])
-        self._formatter = FormatterAgent()
+        self._formatter = FormatterAgent(graph_configuration["formatter_agent"])
         self._presenter_agent = PresenterAgent(base_url, use_ui, graph_configuration["presenter_agent"])
+        self._intent_router = IntentRouter()
+        # session_id -> normalized items last shown to that session; shared across config versions
+        self._session_items: "OrderedDict[str, list]" = session_items if session_items is not None else OrderedDict()
+
+    @property
+    def session_items(self) -> "OrderedDict[str, list]":
+        return self._session_items
 
     async def build_graph(self):
         await self._apify_places.initialize()
 
-        checkpointer = InMemorySaver()
+        self._checkpointer = InMemorySaver()
 
-        graph_builder = StateGraph(MessagesState)
+        graph_builder = StateGraph(RestaurantState)
 
+        graph_builder.add_node("intent_router", self._route_intent)
         graph_builder.add_node("apify_places_agent", self._apify_places)
         graph_builder.add_node("formatter_agent", self._formatter)
-        graph_builder.add_node("presenter_agent", self._presenter_agent)
+        graph_builder.add_node("refine_items", self._refine_items)
+        graph_builder.add_node("chit_chat", self._chit_chat)
+        graph_builder.add_node("presenter_agent", self._present)
 
-        graph_builder.add_edge(START, "apify_places_agent")
-        graph_builder.add_edge("apify_places_agent", "formatter_agent")
+        graph_builder.add_edge(START, "intent_router")
+        graph_builder.add_conditional_edges(
+            "intent_router",
+            lambda state: state["intent"],
+            {
+                SEARCH: "apify_places_agent",
+                REFINEMENT: "refine_items",
+                BOOKING: "presenter_agent",
+                CONFIRMATION: "presenter_agent",
+                CHIT_CHAT: "chit_chat",
+            },
+        )
+        graph_builder.add_conditional_edges(
+            "apify_places_agent",
+            lambda state: "presenter_agent" if self._is_normalized(state["messages"][-1].content) else "formatter_agent",
+            ["formatter_agent", "presenter_agent"],
+        )
         graph_builder.add_edge("formatter_agent", "presenter_agent")
+        graph_builder.add_edge("refine_items", "presenter_agent")
         graph_builder.add_edge("presenter_agent", END)
+        graph_builder.add_edge("chit_chat", END)
+
+        self._restaurant_graph = graph_builder.compile(checkpointer=self._checkpointer)
+
+    # region routing nodes
+    async def _route_intent(self, state: RestaurantState) -> dict[str, Any]:
+        session_id = state.get("session_id", "")
+        intent, source = await self._intent_router.classify(
+            str(state["messages"][-1].content),
+            has_session_items=bool(self._session_items.get(session_id)),
+        )
+        METRICS.incr("graph.intent", intent=intent, source=source)
+        return {"intent": intent}
+
+    async def _refine_items(self, state: RestaurantState) -> dict[str, Any]:
+        """Narrow the items this session already saw instead of scraping again."""
+        shown = self._session_items.get(state.get("session_id", ""), [])
+        items = refine_items(shown, str(state["messages"][-1].content))
+        return {"messages": state["messages"] + [AIMessage(content=json_codec.dumps(items, ensure_ascii=False), name="refine_items")]}
+
+    async def _chit_chat(self, state: RestaurantState) -> dict[str, Any]:
+        return {"messages": state["messages"] + [AIMessage(content=self.CHIT_CHAT_REPLY, name="chit_chat")]}
+
+    async def _present(self, state: RestaurantState) -> dict[str, Any]:
+        if state.get("intent") in (SEARCH, REFINEMENT):
+            items = self._parse_items(state["messages"][-1].content)
+            if items is not None:
+                # Cards show thumbnails, so point them at the resized variants (built once, off the loop)
+                items = await asyncio.to_thread(IMAGE_VARIANTS.rewrite_items, items)
+                self._remember_items(state.get("session_id", ""), items)
+                last = state["messages"][-1]
+                rewritten = AIMessage(content=json_codec.dumps(items, ensure_ascii=False), name=last.name, id=last.id)
+                state = {**state, "messages": state["messages"][:-1] + [rewritten]}
+        return await self._presenter_agent(state)
 
-        self._restaurant_graph = graph_builder.compile(checkpointer=checkpointer)
+    def _parse_items(self, content: Any) -> list | None:
+        try:
+            items = json_codec.loads(content)
+        except (TypeError, ValueError):
+            return None
+        return items if isinstance(items, list) else None
+
+    def _is_normalized(self, content: Any) -> bool:
+        items = self._parse_items(content)
+        return bool(items) and all(
+            isinstance(it, dict)
+            and all(k in it for k in self.NORMALIZED_KEYS)
+            and ("imageURL" in it or "imageUrl" in it)
+            and bool(it["rating"]) and set(str(it["rating"])) <= {"★", "☆"}
+            for it in items
+        )
+
+    def _remember_items(self, session_id: str, items: list) -> None:
+        if not session_id:
+            return
+        self._session_items[session_id] = items
+        self._session_items.move_to_end(session_id)
+        while len(self._session_items) > self.MAX_SESSIONS:
+            self._session_items.popitem(last=False)
+    # endregion
 
     def _format_tool_call_message(self, message: AnyMessage) -> tuple[str, str]:
         tool_name = str(message.tool_calls[0].get('name'))
@@ -89,54 +201,73 @@ class RestaurantGraph:
         return timeline_message, detailed_message
 
     async def call_restaurant_graph(self, query, session_id) -> AsyncIterable[dict[str, Any]]:
-        current_message = {"messages":[HumanMessage(query)]}
-        config:RunnableConfig = {"run_id":str(session_id), "configurable":{"thread_id":str(session_id)}}
+        current_message = {
+            "messages": [HumanMessage(query)],
+            "deadline": Deadline.start().expires_at,
+            "session_id": str(session_id),
+        }
+        # The graph is compiled once and shared, so each run gets its own checkpoint thread;
+        # what a session needs across turns lives in explicit stores (e.g. _session_items)
+        run_id = uuid.uuid4()
+        config:RunnableConfig = {"run_id":run_id, "configurable":{"thread_id":f"{session_id}:{run_id.hex}"}}
         final_response_content = None
         final_model_state = None
         model_token_count = 0
         node_name = "START"
+        route = SEARCH
+        started = time.monotonic()
 
-        # Stream graph execution
-        async for chunk in self._restaurant_graph.astream(
-                input=current_message,
-                config=config,
-                stream_mode='values',
-                subgraphs=True
-        ):
-            latest_message: AnyMessage = chunk[1]['messages'][-1]
-            final_response_content = latest_message.content
-
-            # Format the message based on its type
-            if hasattr(latest_message, 'tool_calls') and latest_message.tool_calls:
-                timeline_message, detailed_message = self._format_tool_call_message(latest_message)
-            elif isinstance(latest_message, ToolMessage):
-                timeline_message, detailed_message = self._format_tool_message(latest_message)
-            elif isinstance(latest_message, AIMessage):
-                timeline_message, model_token_count, detailed_message = self._format_ai_message(latest_message, model_token_count)
-            elif isinstance(latest_message, HumanMessage):
-                # For human messages, update node_name from state before formatting
-                state = self._restaurant_graph.get_state(config=config, subgraphs=True)
-                node_name = str(state.next[0]) if state.next else "GRAPH"
-                timeline_message, detailed_message = self._format_human_message(latest_message, node_name)
-            else:
-                timeline_message, detailed_message = self._format_other_message(latest_message, node_name)
+        try:
+            # Stream graph execution
+            async for chunk in self._restaurant_graph.astream(
+                    input=current_message,
+                    config=config,
+                    stream_mode='values',
+                    subgraphs=True
+            ):
+                route = chunk[1].get("intent", route)
+                latest_message: AnyMessage = chunk[1]['messages'][-1]
+                final_response_content = latest_message.content
+
+                # Format the message based on its type
+                if hasattr(latest_message, 'tool_calls') and latest_message.tool_calls:
+                    timeline_message, detailed_message = self._format_tool_call_message(latest_message)
+                elif isinstance(latest_message, ToolMessage):
+                    timeline_message, detailed_message = self._format_tool_message(latest_message)
+                elif isinstance(latest_message, AIMessage):
+                    timeline_message, model_token_count, detailed_message = self._format_ai_message(latest_message, model_token_count)
+                elif isinstance(latest_message, HumanMessage):
+                    # For human messages, update node_name from state before formatting
+                    state = self._restaurant_graph.get_state(config=config, subgraphs=True)
+                    node_name = str(state.next[0]) if state.next else "GRAPH"
+                    timeline_message, detailed_message = self._format_human_message(latest_message, node_name)
+                else:
+                    timeline_message, detailed_message = self._format_other_message(latest_message, node_name)
+
+                # Update node_name from graph state for non-human messages
+                if not isinstance(latest_message, HumanMessage):
+                    state = self._restaurant_graph.get_state(config=config, subgraphs=True)
+                    node_name = str(state.next[0]) if state.next else "GRAPH"
 
-            # Update node_name from graph state for non-human messages
-            if not isinstance(latest_message, HumanMessage):
-                state = self._restaurant_graph.get_state(config=config, subgraphs=True)
-                node_name = str(state.next[0]) if state.next else "GRAPH"
+                # Yield intermediate updates
+                yield {
+                    "is_task_complete": False,
+                    "updates": timeline_message,
+                    "detailed_updates": detailed_message
+                }
+        finally:
+            # Runs never resume, so their checkpoints are dropped as soon as they end
+            self._checkpointer.delete_thread(config["configurable"]["thread_id"])
 
-            # Yield intermediate updates
-            yield {
-                "is_task_complete": False,
-                "updates": timeline_message,
-                "detailed_updates": detailed_message
-            }
+        METRICS.incr("graph.route", route=route)
+        METRICS.observe("graph.latency", time.monotonic() - started, route=route)
 
         # Update the final response to contain the model_status.
-        text_part, json_string = final_response_content.split("---a2ui_JSON---", 1)
-        text_part = final_model_state
-        final_response_content = f"{text_part}\n---a2ui_JSON---\n{json_string}"
+        # Fallback responses (e.g. budget exhausted in text mode) carry no UI part.
+        if "---a2ui_JSON---" in final_response_content:
+            text_part, json_string = final_response_content.split("---a2ui_JSON---", 1)
+            text_part = final_model_state
+            final_response_content = f"{text_part}\n---a2ui_JSON---\n{json_string}"
 
         yield {
             "is_task_complete": True,
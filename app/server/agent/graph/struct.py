@@ -1,6 +1,9 @@
 from dataclasses import dataclass
 from typing import List, Optional
 
+# Content types the agent card advertises for input and output
+SUPPORTED_CONTENT_TYPES = ["text", "text/plain", "text/event-stream"]
+
 # Data class for better json handling
 @dataclass
 class AgentConfig:
@@ -10,6 +13,8 @@ class AgentConfig:
     name: str
     system_prompt: Optional[str]
     tools_enabled: List[str]
+    # Stronger model tried when `model`'s output fails validation (see ModelRouter)
+    escalation_model: Optional[str] = None
 
 # JSON Schema for validating AgentConfig
 AGENT_CONFIG_SCHEMA = {
@@ -19,7 +24,8 @@ AGENT_CONFIG_SCHEMA = {
         "temperature": {"type": "number", "minimum": 0, "maximum": 2},
         "name": {"type": "string"},
         "system_prompt": {"type": ["string", "null"]},
-        "tools_enabled": {"type": "array", "items": {"type": "string"}}
+        "tools_enabled": {"type": "array", "items": {"type": "string"}},
+        "escalation_model": {"type": ["string", "null"]}
     },
     "required": ["model", "temperature", "name", "tools_enabled"]
 }
@@ -31,6 +37,8 @@ CONFIG_SCHEMA = {
         "formatter_agent": AGENT_CONFIG_SCHEMA,
         "presenter_agent": AGENT_CONFIG_SCHEMA,
     },
+    # Every node is built from its own entry, so a config must name all of them
+    "required": ["apify_places_agent", "formatter_agent", "presenter_agent"],
     "additionalProperties": False,
 }
 
@@ -47,13 +55,15 @@ DEFAULT_CONFIG = {
             "- Return ONLY the JSON array string produced by the tool without extra commentary."
         ),
         tools_enabled=["compass/crawler-google-places"],
+        escalation_model="openai.gpt-4.1",
     ),
     "formatter_agent": AgentConfig(
-        model="openai.gpt-4.1",
+        model="xai.grok-4-fast-non-reasoning",
         temperature=0.2,
         name="formatter_agent",
         system_prompt=None,
         tools_enabled=[],
+        escalation_model="openai.gpt-4.1",
     ),
     "presenter_agent": AgentConfig(
         model="xai.grok-4",
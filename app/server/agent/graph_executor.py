@@ -1,8 +1,10 @@
-import json
 import logging
+import asyncio
 import copy
+import os
+import time
 from dataclasses import asdict
-import jsonschema
+from typing import Any, Callable, Optional
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
@@ -11,9 +13,9 @@ from a2a.types import (
     DataPart,
     Part,
     Task,
+    TaskNotFoundError,
     TaskState,
     TextPart,
-    UnsupportedOperationError,
 )
 from a2a.utils import (
     new_agent_parts_message,
@@ -22,69 +24,162 @@ from a2a.utils import (
 )
 from a2a.utils.errors import ServerError
 from a2ui.a2ui_extension import create_a2ui_part, try_activate_a2ui_extension
-from agent.graph.restaurant_graph import RestaurantGraph
+from agent import json_codec
+from agent.action_router import route_action
+from agent.admission import ADMISSION_MAX_WAIT_S, GOVERNOR, Overloaded
+from agent.cancellation import RunningTasks
 from agent.graph.struct import AgentConfig, CONFIG_SCHEMA, DEFAULT_CONFIG
+from agent.metrics import METRICS
+from agent.progress import ProgressReporter
+from agent.structured_logging import REQUEST_LOG, log_event, truncated
+from agent.surface_state import SurfaceStateStore
 
 logger = logging.getLogger(__name__)
 
+
+class GraphVersion:
+    """One numbered config and the graphs built from it.
+
+    A request takes the active version once and runs to completion on it, so
+    swapping in a newer version never changes graphs under an in-flight request.
+    """
+
+    def __init__(self, version: int, config: dict, create_graph: Callable[[bool, dict], Any]):
+        self.version = version
+        self.config = config
+        self._create_graph = create_graph
+        self._graphs: dict = {}
+        self._lock = asyncio.Lock()
+        self.build_s: Optional[float] = None
+        self.activated_at: Optional[float] = None
+
+    async def graph(self, use_ui: bool):
+        """Compiled graph for the UI or text flavour, built on first use"""
+        graph = self._graphs.get(use_ui)
+        if graph is not None:
+            return graph
+        async with self._lock:
+            if use_ui not in self._graphs:
+                # Client construction and imports run off the event loop
+                graph = await asyncio.to_thread(self._create_graph, use_ui, self.config)
+                await graph.build_graph()
+                self._graphs[use_ui] = graph
+            return self._graphs[use_ui]
+
+    def built_graph(self, use_ui: bool):
+        return self._graphs.get(use_ui)
+
+    async def build(self) -> None:
+        started = time.perf_counter()
+        await self.graph(use_ui=True)
+        await self.graph(use_ui=False)
+        self.build_s = time.perf_counter() - started
+
+    def status(self) -> dict:
+        return {
+            "version": self.version,
+            "build_s": round(self.build_s, 3) if self.build_s is not None else None,
+            "activated_at": self.activated_at,
+        }
+
+
 class RestaurantGraphExecutor(AgentExecutor):
     """Executor of a full graph"""
 
     def __init__(self, base_url: str):
         self.default_config = copy.deepcopy(DEFAULT_CONFIG)
-        self.current_config = copy.deepcopy(self.default_config)
         self.base_url = base_url
-        self._recreate_graphs()
-
-    def _recreate_graphs(self):
-        """Recreate graph instances with current config"""
-        self._ui_restaurant_graph = RestaurantGraph(
-            base_url=self.base_url, 
-            use_ui=True, 
-            graph_configuration=self.current_config
-        )
-        self._restaurant_graph = RestaurantGraph(
-            base_url=self.base_url, 
-            use_ui=False, 
-            graph_configuration=self.current_config
+        # Send only what changed on surfaces the client already shows. Off by default: the
+        # bundled shell clears its surfaces before rendering each response
+        self.delta_updates = os.getenv("A2UI_DELTA_UPDATES", "false").lower() == "true"
+        self._surface_state = SurfaceStateStore()
+        self._running = RunningTasks()
+        # Render known button actions directly instead of running the graph
+        self.route_actions = os.getenv("A2UI_ACTION_ROUTER", "true").lower() == "true"
+        # Graphs (and the langchain/langgraph stack behind them) are built on first use or by warmup()
+        self._active = GraphVersion(1, copy.deepcopy(self.default_config), self._create_graph)
+        self._active.activated_at = time.time()
+        self._latest_version = 1
+        self._pending: Optional[GraphVersion] = None
+        self._build_task: Optional[asyncio.Task] = None
+        self._last_error: Optional[dict] = None
+
+    @property
+    def current_config(self) -> dict:
+        """Config of the version serving new requests"""
+        return self._active.config
+
+    def _create_graph(self, use_ui: bool, config: dict):
+        # Imported here so the server can bind before the heavy LLM stack loads
+        from agent.graph.restaurant_graph import RestaurantGraph
+        previous = self._active.built_graph(use_ui)
+        return RestaurantGraph(
+            base_url=self.base_url,
+            use_ui=use_ui,
+            graph_configuration=config,
+            # Keep what sessions were shown so refinements survive a config change
+            session_items=previous.session_items if previous else None,
         )
 
+    async def warmup(self) -> None:
+        """Build the active version's graphs ahead of the first request"""
+        await self._active.build()
+
+    def _schedule_version(self, config: dict) -> GraphVersion:
+        """Build `config` as the next version in the background and swap it in when ready"""
+        self._latest_version += 1
+        version = GraphVersion(self._latest_version, config, self._create_graph)
+        if self._build_task and not self._build_task.done():
+            # A newer config supersedes one that is still building
+            self._build_task.cancel()
+        self._pending = version
+        self._build_task = asyncio.get_running_loop().create_task(self._activate(version))
+        return version
+
+    async def _activate(self, version: GraphVersion) -> None:
+        try:
+            await version.build()
+        except asyncio.CancelledError:
+            logger.info(f"Configuration version {version.version} superseded before it was built")
+            raise
+        except Exception as e:
+            logger.error(f"Configuration version {version.version} failed to build: {e}")
+            self._last_error = {"version": version.version, "error": str(e)}
+            if self._pending is version:
+                self._pending = None
+            return
+        if self._pending is not version:
+            return
+        # Single assignment: new requests see the new version, running ones keep theirs
+        version.activated_at = time.time()
+        self._active, self._pending = version, None
+        METRICS.observe("config.build_s", version.build_s)
+        logger.info(f"Configuration version {version.version} active (built in {version.build_s:.2f}s)")
+
+    def config_status(self) -> dict:
+        """Active version with its build latency, plus any version still building"""
+        return {
+            "active": self._active.status(),
+            "pending_version": self._pending.version if self._pending else None,
+            "last_error": self._last_error,
+        }
+
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         query = ""
         ui_event_part = None
         action = None
 
-        logger.info(f"--- Client requested extensions: {context.requested_extensions} ---")
         use_ui = try_activate_a2ui_extension(context)
 
-        # Determine which agent to use based on whether the a2ui extension is active.
-        if use_ui:
-            agent = self._ui_restaurant_graph
-            await agent.build_graph()
-            logger.info("--- AGENT_EXECUTOR: A2UI extension is active. Using UI agent. ---")
-        else:
-            agent = self._restaurant_graph
-            await agent.build_graph()
-            logger.info("--- AGENT_EXECUTOR: A2UI extension is not active. Using text agent. ---")
-
         if context.message and context.message.parts:
-            logger.info(
-                f"--- AGENT_EXECUTOR: Processing {len(context.message.parts)} message parts ---"
-            )
+            logger.info("Processing %d message parts (a2ui=%s)", len(context.message.parts), use_ui)
             for i, part in enumerate(context.message.parts):
-                if isinstance(part.root, DataPart):
-                    if "userAction" in part.root.data:
-                        logger.info(f"  Part {i}: Found a2ui UI ClientEvent payload.")
-                        ui_event_part = part.root.data["userAction"]
-                    else:
-                        logger.info(f"  Part {i}: DataPart (data: {part.root.data})")
-                elif isinstance(part.root, TextPart):
-                    logger.info(f"  Part {i}: TextPart (text: {part.root.text})")
-                else:
-                    logger.info(f"  Part {i}: Unknown part type ({type(part.root)})")
+                if isinstance(part.root, DataPart) and "userAction" in part.root.data:
+                    ui_event_part = part.root.data["userAction"]
+                log_event(logger, "payload", "Message part %d: %s", i, truncated(part.root))
 
         if ui_event_part:
-            logger.info(f"Received a2ui ClientEvent: {ui_event_part}")
+            logger.info("Received a2ui ClientEvent %r", ui_event_part.get("name"))
             # Changed on event name due to new version, could change in the future
             action = ui_event_part.get("name")
             ctx = ui_event_part.get("context", {})
@@ -109,76 +204,100 @@ class RestaurantGraphExecutor(AgentExecutor):
             logger.info("No a2ui UI event part found. Falling back to text input.")
             query = context.get_user_input()
 
-        logger.info(f"--- AGENT_EXECUTOR: Final query for LLM: '{query}' ---")
-
         task = context.current_task
 
         if not task:
             task = new_task(context.message)
             await event_queue.enqueue_event(task)
         updater = TaskUpdater(event_queue, task.id, task.context_id)
+        # tasks/cancel finds this run here and cancels it
+        self._running.register(task.id)
+
+        with REQUEST_LOG.track(task.id, task.context_id, query, action=action, a2ui=use_ui) as record:
+            # Known button actions render straight from their context, skipping the graph
+            if ui_event_part and self.route_actions:
+                routed_content = route_action(action, ui_event_part.get("context", {}), use_ui)
+                if routed_content is not None:
+                    METRICS.incr("executor.action", action=action, route="direct")
+                    record["route"] = "direct"
+                    final_parts = self._final_parts(routed_content, task.context_id)
+                    final_parts.append(Part(root=TextPart(text=f"Handled action '{action}' directly")))
+                    final_parts.append(Part(root=TextPart(text="0")))
+                    await updater.update_status(
+                        TaskState.completed,
+                        new_agent_parts_message(final_parts, task.context_id, task.id),
+                        final=True,
+                    )
+                    record["outcome"] = TaskState.completed.value
+                    return
+
+            record["route"] = "graph"
+            try:
+                # Wait a bounded time for a graph slot; past that, fail fast with a retry hint
+                async with GOVERNOR.slot("graph", timeout=ADMISSION_MAX_WAIT_S):
+                    await self._run_graph(query, use_ui, action, task, updater, record)
+            except Overloaded as e:
+                record["outcome"] = "rejected"
+                await self._reject(e, task, updater)
+
+    async def _run_graph(self, query: str, use_ui: bool, action: Optional[str], task: Task, updater: TaskUpdater,
+                         record: dict) -> None:
+        # Determine which agent to use based on whether the a2ui extension is active.
+        # Pin the version now so a config swap mid-request doesn't change graphs under us
+        version = self._active
+        record["graph_version"] = version.version
+        agent = await version.graph(use_ui)
+        if use_ui:
+            logger.info("--- AGENT_EXECUTOR: A2UI extension is active. Using UI agent. ---")
+        else:
+            logger.info("--- AGENT_EXECUTOR: A2UI extension is not active. Using text agent. ---")
+
+        log_event(logger, "payload", "Final query for LLM: %s", truncated(query, 500))
+
+        async def send_progress(parts: list[Part]) -> None:
+            await updater.update_status(
+                TaskState.working,
+                new_agent_parts_message(parts, task.context_id, task.id),
+            )
 
+        progress = ProgressReporter(send_progress)
+        try:
+            await self._stream_graph(agent, query, action, task, updater, progress, record)
+        finally:
+            await progress.close()
+            record["progress_steps"] = progress.steps
+            record["progress_updates"] = progress.sent
+
+    async def _stream_graph(self, agent, query: str, action: Optional[str], task: Task, updater: TaskUpdater,
+                            progress: ProgressReporter, record: dict) -> None:
         # MAIN execution method
         async for item in agent.call_restaurant_graph(query, task.context_id):
             is_task_complete = item["is_task_complete"]
             if not is_task_complete:
-                update_parts = []
-                update_parts.append(Part(root=TextPart(text=item['updates'])))
-                update_parts.append(Part(root=TextPart(text=item['detailed_updates'])))
-                await updater.update_status(
-                    TaskState.working,
-                    new_agent_parts_message(update_parts, task.context_id, task.id),
-                )
+                await progress.add(item['updates'], item['detailed_updates'])
                 continue
 
+            # Anything still held back is superseded by the final update
+            await progress.close()
+
             final_state = (
                 TaskState.completed
                 if action == "submit_booking"
                 else TaskState.input_required
             )
 
-            content = item["content"]
-            final_parts = []
-            if "---a2ui_JSON---" in content:
-                logger.info("Splitting final response into text and UI parts.")
-                text_content, json_string = content.split("---a2ui_JSON---", 1)
-
-                if text_content.strip():
-                    final_parts.append(Part(root=TextPart(text=text_content.strip())))
-
-                if json_string.strip():
-                    try:
-                        json_string_cleaned = (json_string.strip().lstrip("```json").rstrip("```").strip())
-                        json_data = json.loads(json_string_cleaned)
-
-                        if isinstance(json_data, list):
-                            logger.info(f"Found {len(json_data)} messages. Creating individual DataParts.")
-                            for message in json_data:
-                                final_parts.append(create_a2ui_part(message))
-                        else:
-                            # Handle the case where a single JSON object is returned
-                            logger.info("Received a single JSON object. Creating a DataPart.")
-                            final_parts.append(create_a2ui_part(json_data))
-
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse UI JSON: {e}")
-                        final_parts.append(Part(root=TextPart(text=json_string)))
-            else:
-                final_parts.append(Part(root=TextPart(text=content.strip())))
-
+            final_parts = self._final_parts(item["content"], task.context_id)
             final_parts.append(Part(root=TextPart(text=item['detailed_updates'])))
             final_parts.append(Part(root=TextPart(text=item['token_count'])))
 
-            logger.info("--- FINAL PARTS TO BE SENT ---")
+            logger.info("Sending %d final parts for task %s", len(final_parts), task.id)
             for i, part in enumerate(final_parts):
-                logger.info(f"  - Part {i}: Type = {type(part.root)}")
-                if isinstance(part.root, TextPart):
-                    logger.info(f"    - Text: {part.root.text[:200]}...")
-                elif isinstance(part.root, DataPart):
-                    logger.info(f"    - Data: {str(part.root.data)[:200]}...")
-            logger.info("-----------------------------")
+                log_event(logger, "payload", "Final part %d: %s", i, truncated(part.root))
             # TODO: remove in case multiturn is enabled
             final_state = TaskState.completed
+            record["outcome"] = final_state.value
+            record["parts"] = len(final_parts)
+            record["tokens"] = item["token_count"]
 
             await updater.update_status(
                 final_state,
@@ -187,10 +306,72 @@ class RestaurantGraphExecutor(AgentExecutor):
             )
             break
 
+    async def _reject(self, error: Overloaded, task: Task, updater: TaskUpdater) -> None:
+        """Fail the task right away, telling the client when to retry."""
+        METRICS.incr("executor.rejected", backend=error.backend, reason=error.reason)
+        if error.reason in ("unreachable", "upstream_error"):
+            text = f"The restaurant search service is unavailable right now. Please try again in {error.retry_after_s} seconds."
+        else:
+            text = f"I'm handling too many requests right now. Please try again in {error.retry_after_s} seconds."
+        parts = [
+            Part(root=TextPart(text=text)),
+            Part(root=DataPart(data={"error": "overloaded", "backend": error.backend, "reason": error.reason,
+                                     "retryAfterSeconds": error.retry_after_s})),
+        ]
+        await updater.update_status(
+            TaskState.failed,
+            new_agent_parts_message(parts, task.context_id, task.id),
+            final=True,
+        )
+
+    def _final_parts(self, content: str, context_id: str) -> list[Part]:
+        """Split "text ---a2ui_JSON--- json" content into text and A2UI parts."""
+        final_parts = []
+        if "---a2ui_JSON---" in content:
+            logger.info("Splitting final response into text and UI parts.")
+            text_content, json_string = content.split("---a2ui_JSON---", 1)
+
+            if text_content.strip():
+                final_parts.append(Part(root=TextPart(text=text_content.strip())))
+
+            if json_string.strip():
+                try:
+                    json_string_cleaned = (json_string.strip().lstrip("```json").rstrip("```").strip())
+                    json_data = json_codec.loads(json_string_cleaned)
+
+                    if isinstance(json_data, list):
+                        json_data = self._surface_state.diff(
+                            context_id, json_data, full_resend=not self.delta_updates
+                        )
+                        logger.info("Found %d messages. Creating individual DataParts.", len(json_data))
+                        for message in json_data:
+                            final_parts.append(create_a2ui_part(message))
+                    else:
+                        # Handle the case where a single JSON object is returned
+                        logger.info("Received a single JSON object. Creating a DataPart.")
+                        final_parts.append(create_a2ui_part(json_data))
+
+                except json_codec.JSONDecodeError as e:
+                    logger.error("Failed to parse UI JSON: %s", e)
+                    final_parts.append(Part(root=TextPart(text=json_string)))
+        else:
+            final_parts.append(Part(root=TextPart(text=content.strip())))
+        return final_parts
+
     async def cancel(
         self, request: RequestContext, event_queue: EventQueue
     ) -> Task | None:
-        raise ServerError(error=UnsupportedOperationError())
+        """Stop the running search and mark the task canceled."""
+        task = request.current_task
+        if task is None:
+            raise ServerError(error=TaskNotFoundError())
+        # Report first: once the run is cancelled its event queue may already be closed
+        updater = TaskUpdater(event_queue, task.id, task.context_id)
+        await updater.cancel(new_agent_text_message("Request canceled.", task.context_id, task.id))
+        if await self._running.cancel(task.id):
+            METRICS.incr("executor.canceled")
+        logger.info("--- AGENT_EXECUTOR: Task %s canceled ---", task.id)
+        return None
 
     # region helper config
     def get_config(self) -> dict:
@@ -202,6 +383,8 @@ class RestaurantGraphExecutor(AgentExecutor):
         Update configuration with validation
         Returns (success, error_message)
         """
+        import jsonschema
+
         try:
             # Validate JSON schema
             jsonschema.validate(instance=new_config, schema=CONFIG_SCHEMA)
@@ -211,13 +394,10 @@ class RestaurantGraphExecutor(AgentExecutor):
             for agent_name, agent_data in new_config.items():
                 config_objects[agent_name] = AgentConfig(**agent_data)
 
-            # Update current config
-            self.current_config = config_objects
-
-            # Recreate graphs with new config
-            self._recreate_graphs()
+            # Build and swap in the new version in the background
+            version = self._schedule_version(config_objects)
 
-            logger.info("Configuration updated successfully")
+            logger.info(f"Configuration version {version.version} accepted, building")
             return True, ""
 
         except jsonschema.ValidationError as e:
@@ -231,6 +411,5 @@ class RestaurantGraphExecutor(AgentExecutor):
 
     def reset_config(self) -> None:
         """Reset configuration to default"""
-        self.current_config = copy.deepcopy(self.default_config)
-        self._recreate_graphs()
-        logger.info("Configuration reset to default")
+        version = self._schedule_version(copy.deepcopy(self.default_config))
+        logger.info(f"Configuration reset to default as version {version.version}")
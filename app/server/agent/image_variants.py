@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+try:  # Pillow is optional; without it the original images are served
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
+SOURCE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+
+class ImageVariants:
+    """Width-bounded, recompressed copies of the images served under /static.
+
+    Variants are written to `cache_dir` as `<stem>.<width>w.<hash>.<ext>`, where
+    the hash covers the source bytes and the encoding settings, so a changed
+    image or setting never reuses a stale file and the names can be cached
+    forever by clients. Generation happens once per (image, width, format),
+    either at startup via `warm` or on first use.
+    """
+
+    def __init__(
+        self,
+        source_dir: str = "images",
+        cache_dir: Optional[str] = None,
+        width: Optional[int] = None,
+        fmt: Optional[str] = None,
+        quality: Optional[int] = None,
+        mount_path: str = "/static",
+    ):
+        self.source_dir = Path(source_dir)
+        self.cache_dir = Path(cache_dir or os.getenv("IMAGE_VARIANT_CACHE_DIR", ".cache/images"))
+        self.width = int(width or os.getenv("IMAGE_VARIANT_WIDTH", "480"))
+        self.fmt = (fmt or os.getenv("IMAGE_VARIANT_FORMAT", "webp")).lower()
+        if self.fmt not in _SAVE_OPTIONS:
+            raise ValueError(f"Unsupported image variant format: {self.fmt}")
+        self.quality = int(quality or os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+        self.mount_path = mount_path.rstrip("/")
+        self.enabled = Image is not None and os.getenv("IMAGE_VARIANTS_ENABLED", "true").lower() == "true"
+        self._lock = threading.Lock()
+        # source name -> (mtime_ns, size, variant file name)
+        self._known: Dict[str, Tuple[int, int, str]] = {}
+
+    @property
+    def variants_path(self) -> str:
+        """URL prefix the cache directory is mounted under."""
+        return f"{self.mount_path}/v"
+
+    def _source(self, name: str) -> Optional[Path]:
+        path = (self.source_dir / name).resolve()
+        try:
+            path.relative_to(self.source_dir.resolve())
+        except ValueError:
+            return None
+        if path.suffix.lower() not in SOURCE_EXTENSIONS or not path.is_file():
+            return None
+        return path
+
+    def variant_name(self, name: str) -> Optional[str]:
+        """File name of the variant for source image `name`, generating it if needed."""
+        if not self.enabled:
+            return None
+        source = self._source(name)
+        if source is None:
+            return None
+        stat = source.stat()
+        with self._lock:
+            known = self._known.get(name)
+            if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                return known[2]
+            try:
+                variant = self._build(source)
+            except Exception as e:
+                logger.warning("Could not build image variant for %s: %s", name, e)
+                return None
+            self._known[name] = (stat.st_mtime_ns, stat.st_size, variant)
+            return variant
+
+    def _build(self, source: Path) -> str:
+        data = source.read_bytes()
+        digest = hashlib.sha256(data)
+        digest.update(f"|{self.width}|{self.fmt}|{self.quality}".encode())
+        ext = "jpg" if self.fmt == "jpeg" else self.fmt
+        variant = f"{source.stem}.{self.width}w.{digest.hexdigest()[:16]}.{ext}"
+        target = self.cache_dir / variant
+        if target.is_file():
+            return variant
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with Image.open(source) as img:
+            img.load()
+            if img.width > self.width:
+                img = img.resize((self.width, max(1, round(img.height * self.width / img.width))), Image.LANCZOS)
+            if self.fmt == "jpeg" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            tmp = target.with_suffix(target.suffix + ".tmp")
+            img.save(tmp, quality=self.quality, **_SAVE_OPTIONS[self.fmt])
+        os.replace(tmp, target)
+        logger.info("Built image variant %s (%d -> %d bytes)", variant, len(data), target.stat().st_size)
+        return variant
+
+    def warm(self) -> Dict[str, int]:
+        """Build variants for every source image; returns total original/variant bytes."""
+        totals = {"images": 0, "original_bytes": 0, "variant_bytes": 0}
+        if not self.enabled or not self.source_dir.is_dir():
+            return totals
+        for source in sorted(self.source_dir.iterdir()):
+            variant = self.variant_name(source.name)
+            if variant is None:
+                continue
+            totals["images"] += 1
+            totals["original_bytes"] += source.stat().st_size
+            totals["variant_bytes"] += (self.cache_dir / variant).stat().st_size
+        return totals
+
+    def variant_url(self, url: Any) -> Any:
+        """Point a `<host>/static/<image>` URL at its variant; other values pass through."""
+        if not isinstance(url, str) or not url:
+            return url
+        parts = urlsplit(url)
+        prefix = self.mount_path + "/"
+        if not parts.path.startswith(prefix) or parts.path.startswith(self.variants_path + "/"):
+            return url
+        variant = self.variant_name(unquote(parts.path[len(prefix):]))
+        if variant is None:
+            return url
+        return urlunsplit(parts._replace(path=f"{self.variants_path}/{quote(variant)}", query=""))
+
+    def rewrite_items(self, items: Iterable[Any]) -> list:
+        """Copy of formatter items with imageURL/imageUrl pointing at variants."""
+        out = []
+        for it in items:
+            if isinstance(it, dict):
+                it = {**it}
+                for key in ("imageURL", "imageUrl"):
+                    if key in it:
+                        it[key] = self.variant_url(it[key])
+            out.append(it)
+        return out
+
+
+# Shared by the /static mounts and the graph that rewrites item image URLs
+IMAGE_VARIANTS = ImageVariants()
@@ -0,0 +1,52 @@
+"""JSON encoding for the request hot path.
+
+Uses orjson when it is installed (JSON_CODEC=auto|orjson|stdlib) and the
+standard library otherwise. Both backends emit the same text: compact
+separators and non-ASCII characters (rating stars, accents) kept as-is unless
+`ensure_ascii=True` is asked for, so switching backends never changes what
+the LLMs or clients see. The one difference is NaN/Infinity, which orjson
+writes as null instead of the stdlib's non-standard literals.
+"""
+import json
+import logging
+import os
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+try:  # orjson is optional
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both backends
+JSONDecodeError = json.JSONDecodeError
+
+_SEPARATORS = (",", ":")
+_BACKEND = os.getenv("JSON_CODEC", "auto").lower()
+if _BACKEND == "orjson" and orjson is None:
+    logger.warning("JSON_CODEC=orjson but orjson is not installed; using the stdlib codec")
+USE_ORJSON = orjson is not None and _BACKEND in ("auto", "orjson")
+BACKEND = "orjson" if USE_ORJSON else "stdlib"
+
+
+def dumps(obj: Any, ensure_ascii: bool = False) -> str:
+    """Serialize `obj` to compact JSON text."""
+    if USE_ORJSON and not ensure_ascii:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            # Values orjson rejects (e.g. ints beyond 64 bits) still encode with the stdlib
+            pass
+    return json.dumps(obj, ensure_ascii=ensure_ascii, separators=_SEPARATORS)
+
+
+def loads(data: str | bytes | bytearray) -> Any:
+    """Parse JSON text; raises JSONDecodeError on invalid input."""
+    if USE_ORJSON:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # The stdlib also accepts NaN/Infinity and huge ints; it raises the canonical error otherwise
+            pass
+    return json.loads(data)
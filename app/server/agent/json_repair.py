@@ -0,0 +1,130 @@
+"""Deterministic repair of almost-JSON produced by LLMs.
+
+Models often wrap their JSON in code fences, leave trailing commas, add `//`
+comments or copy unquoted keys such as `weight: 1` straight from the prompt
+examples. These are fixed mechanically here so a response can be used
+without asking the model to generate it again.
+"""
+
+import re
+from typing import Any, List, Tuple
+
+from agent import json_codec
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+_IDENT_START = re.compile(r"[A-Za-z_$]")
+_IDENT_CHAR = re.compile(r"[\w$-]")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _strip_fences(text: str, repairs: List[str]) -> str:
+    match = _FENCE_RE.match(text)
+    if match:
+        repairs.append("code_fence")
+        return match.group(1)
+    # Unbalanced fences, e.g. only an opening "```json"
+    stripped = text.strip()
+    if stripped.startswith("```") or stripped.endswith("```"):
+        repairs.append("code_fence")
+        stripped = re.sub(r"^```[a-zA-Z]*", "", stripped)
+        stripped = re.sub(r"```$", "", stripped)
+    return stripped
+
+
+def _drop_trailing_comma(out: List[str], repairs: List[str]) -> None:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+        repairs.append("trailing_comma")
+
+
+def _last_significant(out: List[str]) -> str:
+    for ch in reversed(out):
+        if not ch.isspace():
+            return ch
+    return ""
+
+
+def _scan(text: str, repairs: List[str]) -> str:
+    """Single string-aware pass fixing comments, trailing commas, bare keys and Python literals."""
+    out: List[str] = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            # Copy the whole string literal verbatim, honouring escapes
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+            continue
+        if ch == "/" and i + 1 < n and text[i + 1] == "/":
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+            repairs.append("line_comment")
+            continue
+        if ch == "/" and i + 1 < n and text[i + 1] == "*":
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            repairs.append("block_comment")
+            continue
+        if ch in "}]":
+            _drop_trailing_comma(out, repairs)
+            out.append(ch)
+            i += 1
+            continue
+        if _IDENT_START.match(ch):
+            j = i + 1
+            while j < n and _IDENT_CHAR.match(text[j]):
+                j += 1
+            word = text[i:j]
+            k = j
+            while k < n and text[k].isspace():
+                k += 1
+            if k < n and text[k] == ":" and _last_significant(out) in ("{", ","):
+                out.append(json_codec.dumps(word))
+                repairs.append("unquoted_key")
+            elif word in _PY_LITERALS:
+                out.append(_PY_LITERALS[word])
+                repairs.append("python_literal")
+            else:
+                out.append(word)
+            i = j
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def repair_json(text: str, expect_list: bool = False) -> Tuple[Any, List[str]]:
+    """Parse `text` as JSON, repairing common LLM formatting mistakes first.
+
+    Returns the parsed value and the names of the repairs that were applied
+    (empty when the text was valid as-is). With `expect_list`, a lone object
+    or a comma-separated run of objects is wrapped into a list. Raises
+    `json_codec.JSONDecodeError` when the text cannot be repaired.
+    """
+    repairs: List[str] = []
+    candidate = _strip_fences(text, repairs)
+    try:
+        value = json_codec.loads(candidate)
+    except json_codec.JSONDecodeError:
+        candidate = _scan(candidate, repairs)
+        try:
+            value = json_codec.loads(candidate)
+        except json_codec.JSONDecodeError:
+            stripped = candidate.strip().rstrip(",")
+            if not (expect_list and stripped.startswith("{")):
+                raise
+            # "{...}, {...}" or "{...}\n{...}": objects without the enclosing array
+            joined = re.sub(r"}\s*(?=\{)", "},", stripped)
+            value = json_codec.loads(f"[{joined}]")
+            repairs.append("wrapped_sequence")
+    if expect_list and isinstance(value, dict):
+        value = [value]
+        repairs.append("wrapped_object")
+    # Keep each repair once, in the order it first fired
+    return value, list(dict.fromkeys(repairs))
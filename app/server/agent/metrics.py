@@ -0,0 +1,96 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Tuple
+
+# Recent samples kept per timing series for percentile estimates
+_WINDOW = 512
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _render(key: MetricKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+class _Series:
+    __slots__ = ("count", "total", "max", "window")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window: Deque[float] = deque(maxlen=_WINDOW)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.window.append(value)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.window:
+            return None
+        ordered = sorted(self.window)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+
+class Metrics:
+    """In-process counters and timing series, labelled like `name{label=value}`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = defaultdict(float)
+        self._series: Dict[MetricKey, _Series] = {}
+
+    def incr(self, name: str, value: float = 1, **labels: Any) -> None:
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.add(value)
+
+    def count(self, name: str, **labels: Any) -> int:
+        with self._lock:
+            series = self._series.get(_key(name, labels))
+            return series.count if series else 0
+
+    def percentile(self, name: str, q: float, **labels: Any) -> float | None:
+        with self._lock:
+            series = self._series.get(_key(name, labels))
+            return series.percentile(q) if series else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {_render(k): v for k, v in self._counters.items()}
+            timings = {
+                _render(k): {
+                    "count": s.count,
+                    "avg": round(s.total / s.count, 4) if s.count else 0.0,
+                    "p50": s.percentile(50),
+                    "p95": s.percentile(95),
+                    "max": s.max,
+                }
+                for k, s in self._series.items()
+            }
+        return {"counters": counters, "timings": timings}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._series.clear()
+
+
+METRICS = Metrics()
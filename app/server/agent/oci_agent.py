@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import jsonschema
+from agent import json_codec
 from agent.prompt_builder import (
     A2UI_SCHEMA,
     RESTAURANT_UI_EXAMPLES,
@@ -212,7 +213,7 @@ class OCIRestaurantAgent:
 
                     # --- New Validation Steps ---
                     # 1. Check if it's parsable JSON
-                    parsed_json_data = json.loads(json_string_cleaned)
+                    parsed_json_data = json_codec.loads(json_string_cleaned)
 
                     # 2. Check if it validates against the A2UI_SCHEMA
                     # This will raise jsonschema.exceptions.ValidationError if it fails
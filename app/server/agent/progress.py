@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from a2a.types import DataPart, Part, TextPart
+
+from agent.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# none: no working updates; timeline: one short line per step; detailed: also the truncated payload dump
+PROGRESS_VERBOSITY = os.getenv("PROGRESS_VERBOSITY", "timeline").lower()
+# Steps closer together than this are merged into one update
+PROGRESS_DEBOUNCE_MS = float(os.getenv("PROGRESS_DEBOUNCE_MS", "250"))
+# text: preformatted TextParts; data: one structured DataPart per update. The bundled
+# shell client renders every DataPart as A2UI, so keep "text" when serving it.
+PROGRESS_FORMAT = os.getenv("PROGRESS_FORMAT", "text").lower()
+
+
+class ProgressReporter:
+    """Turns graph steps into coalesced `working` updates.
+
+    The first step is sent at once. Steps arriving within `debounce_s` of the
+    last update are held and sent together when the window closes, so a burst
+    of graph chunks costs one event on the queue, SSE stream and push channel.
+    """
+
+    def __init__(self, send: Callable[[List[Part]], Awaitable[None]], verbosity: str = PROGRESS_VERBOSITY,
+                 debounce_ms: float = PROGRESS_DEBOUNCE_MS, fmt: str = PROGRESS_FORMAT):
+        self._send = send
+        self.verbosity = verbosity
+        self.debounce_s = max(0.0, debounce_ms / 1000.0)
+        self.fmt = fmt
+        self._pending: List[Tuple[str, str]] = []
+        self._last_sent = 0.0
+        self._last_step: Optional[str] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.steps = 0
+        self.sent = 0
+        self._closed = False
+
+    async def add(self, timeline: str, detailed: str) -> None:
+        self.steps += 1
+        if self._closed or self.verbosity == "none" or timeline == self._last_step:
+            return
+        self._last_step = timeline
+        self._pending.append((timeline, detailed if self.verbosity == "detailed" else ""))
+        wait = self._last_sent + self.debounce_s - time.monotonic()
+        if wait <= 0:
+            await self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_after(wait))
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        async with self._lock:
+            if self._closed or not self._pending:
+                return
+            steps, self._pending = self._pending, []
+            self._last_sent = time.monotonic()
+            self.sent += 1
+            await self._send(self._parts(steps))
+
+    def _parts(self, steps: List[Tuple[str, str]]) -> List[Part]:
+        if self.fmt == "data":
+            entries = [{"step": t, **({"detail": d} if d else {})} for t, d in steps]
+            return [Part(root=DataPart(data={"progress": {"steps": entries}}))]
+        parts = [Part(root=TextPart(text=" → ".join(t for t, _ in steps)))]
+        if self.verbosity == "detailed":
+            parts.append(Part(root=TextPart(text="\n\n".join(d for _, d in steps))))
+        return parts
+
+    async def close(self) -> None:
+        """Drop what is still held back (the final update follows) and stop the timer.
+
+        Returns only once no update is being sent, so nothing can follow the final one.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        # A flush that started before close() (e.g. from the timer) finishes its send first
+        async with self._lock:
+            self._pending = []
+        METRICS.incr("executor.progress_steps", self.steps)
+        METRICS.incr("executor.progress_updates", self.sent)
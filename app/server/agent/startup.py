@@ -0,0 +1,79 @@
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    """Wall-clock time of named cold-start phases, for `--profile-startup`.
+
+    Phases are timed independently and may overlap (warmup runs while the
+    server is already accepting connections), so the report lists each one
+    plus the total from process start until readiness.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases: List[Tuple[str, float, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, begin)
+
+    def record(self, name: str, begin: float, end: Optional[float] = None) -> None:
+        """Record a phase that started at perf_counter() `begin` and ends now (or at `end`)."""
+        end = end if end is not None else time.perf_counter()
+        with self._lock:
+            self._phases.append((name, begin - self.started_at, end - begin))
+
+    def import_module(self, name: str) -> Any:
+        with self.phase(f"import {name}"):
+            return importlib.import_module(name)
+
+    def report(self, total_s: Optional[float] = None) -> str:
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+        total_s = total_s if total_s is not None else time.perf_counter() - self.started_at
+        width = max([len(name) for name, _, _ in phases] + [5])
+        lines = [f"{'phase':<{width}}  {'start':>8}  {'took':>8}  {'share':>6}"]
+        for name, start, took in phases:
+            lines.append(f"{name:<{width}}  {start * 1000:>6.0f}ms  {took * 1000:>6.0f}ms  {took / total_s if total_s else 0:>6.0%}")
+        lines.append(f"{'ready':<{width}}  {total_s * 1000:>6.0f}ms")
+        return "\n".join(lines)
+
+
+class Readiness:
+    """Whether warmup has finished; backs GET /agent/ready."""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.ready_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None and self.error is None
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        logger.info("Server ready after %.2fs", self.ready_at - self.started_at)
+
+    def mark_failed(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+        logger.error("Warmup failed: %s", self.error)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "startup_s": round((self.ready_at or time.perf_counter()) - self.started_at, 3),
+            "error": self.error,
+        }
@@ -0,0 +1,206 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import stat
+import threading
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+logger = logging.getLogger(__name__)
+
+try:  # brotli is optional; gzip siblings are used without it
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Names produced by ImageVariants and other build steps: `<stem>.<16+ hex>.<ext>`
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{16,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unversioned names may change in place, so clients revalidate them with the ETag
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+# Content-Encoding -> sibling file suffix, in server preference order
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Already-compressed formats gain nothing from gzip/brotli
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single `bytes=` range; None ignores the header.
+
+    Raises ValueError when the range can't be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with strong validators and long-lived caching.
+
+    - ETags are content hashes (strong), so If-None-Match and If-Range are exact.
+    - Content-hashed names (or the whole mount when `immutable=True`) are sent
+      with `Cache-Control: immutable`; other files must be revalidated.
+    - A `<file>.br` / `<file>.gz` sibling is served instead of the file when the
+      client accepts that encoding (see `precompress`).
+    - Single `bytes=` ranges get 206 responses on the identity encoding.
+    """
+
+    def __init__(self, *args, immutable: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable = immutable
+        self._etags: Dict[Tuple[str, int, int], str] = {}
+        self._etags_lock = threading.Lock()
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            except (OSError, ValueError):
+                full_path, stat_result = "", None
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                return await self._cached_response(full_path, stat_result, scope)
+        return await super().get_response(path, scope)
+
+    def _etag(self, full_path: str, stat_result: os.stat_result) -> str:
+        key = (full_path, stat_result.st_mtime_ns, stat_result.st_size)
+        with self._etags_lock:
+            etag = self._etags.get(key)
+        if etag is None:
+            digest = hashlib.sha256()
+            with open(full_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            etag = f'"{digest.hexdigest()[:32]}"'
+            with self._etags_lock:
+                self._etags[key] = etag
+        return etag
+
+    def _representation(self, full_path: str, stat_result: os.stat_result, accept_encoding: str):
+        """Pick the file to send: (encoding, path, stat, etag, has_encoded_siblings)."""
+        accepted = _accepted_encodings(accept_encoding)
+        has_siblings = False
+        for encoding, suffix in ENCODINGS:
+            try:
+                sibling_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if not stat.S_ISREG(sibling_stat.st_mode):
+                continue
+            has_siblings = True
+            if encoding in accepted:
+                return encoding, full_path + suffix, sibling_stat, self._etag(full_path + suffix, sibling_stat), True
+        return None, full_path, stat_result, self._etag(full_path, stat_result), has_siblings
+
+    async def _cached_response(self, full_path: str, stat_result: os.stat_result, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        # One thread hop for sibling lookup and hashing; the hash itself is cached per (path, mtime, size)
+        encoding, served_path, served_stat, etag, has_siblings = await anyio.to_thread.run_sync(
+            self._representation, full_path, stat_result, request_headers.get("accept-encoding", "")
+        )
+
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        immutable = self.immutable or bool(HASHED_NAME_RE.search(os.path.basename(full_path)))
+        headers = {
+            "etag": etag,
+            "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "accept-ranges": "bytes" if encoding is None else "none",
+        }
+        if has_siblings:
+            headers["vary"] = "Accept-Encoding"
+        if encoding:
+            headers["content-encoding"] = encoding
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and encoding is None and (not if_range or if_range.strip() == etag):
+            size = served_stat.st_size
+            try:
+                byte_range = _byte_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                body = await anyio.to_thread.run_sync(self._read_range, served_path, start, end)
+                headers["content-range"] = f"bytes {start}-{end}/{size}"
+                return Response(body, status_code=206, headers=headers, media_type=media_type)
+
+        return FileResponse(served_path, stat_result=served_stat, headers=headers, media_type=media_type)
+
+    @staticmethod
+    def _read_range(path: str, start: int, end: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+
+def precompress(directory: str, min_size: int = 1024) -> Dict[str, int]:
+    """Write `.gz` (and `.br` with brotli installed) siblings for compressible files.
+
+    Images are skipped: PNG/JPEG/WebP are already compressed. A sibling is only
+    kept when it is smaller than the original. Returns bytes before and after.
+    """
+    totals = {"files": 0, "original_bytes": 0, "compressed_bytes": 0}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith((".gz", ".br")) or os.path.getsize(path) < min_size:
+                continue
+            media_type = mimetypes.guess_type(name)[0] or ""
+            if not media_type.startswith(COMPRESSIBLE_TYPES):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            totals["files"] += 1
+            totals["original_bytes"] += len(data)
+            best = len(data)
+            for suffix, compressed in variants:
+                if len(compressed) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(compressed)
+                    best = min(best, len(compressed))
+            totals["compressed_bytes"] += best
+    return totals
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from agent import json_codec
+
+logger = logging.getLogger(__name__)
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# text: the usual one-line records, with fields appended as key=value; json: one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Share of log_event() records kept per category; payload dumps are off unless asked for
+_DEFAULT_SAMPLE_RATES = {"payload": 0.0}
+# Recent requests kept for GET /agent/debug/requests
+REQUEST_LOG_SIZE = int(os.getenv("REQUEST_LOG_SIZE", "200"))
+# How much of each query the request log keeps
+REQUEST_LOG_QUERY_CHARS = int(os.getenv("REQUEST_LOG_QUERY_CHARS", "200"))
+
+
+def _parse_rates(raw: str, defaults: Dict[str, float]) -> Dict[str, float]:
+    """Parse `category=rate,category=rate`, e.g. LOG_SAMPLE_RATES=payload=0.01,progress=0.1."""
+    rates = dict(defaults)
+    for pair in raw.split(","):
+        if "=" not in pair:
+            continue
+        category, value = pair.split("=", 1)
+        try:
+            rates[category.strip()] = min(1.0, max(0.0, float(value)))
+        except ValueError:
+            continue
+    return rates
+
+
+LOG_SAMPLE_RATES = _parse_rates(os.getenv("LOG_SAMPLE_RATES", ""), _DEFAULT_SAMPLE_RATES)
+
+
+class Lazy:
+    """Defers `fn(*args)` until a handler actually formats the record."""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any):
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+    __repr__ = __str__
+
+
+def _truncate(value: Any, limit: int) -> str:
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text)} chars)"
+
+
+def truncated(value: Any, limit: int = 200) -> Lazy:
+    """`str(value)` cut to `limit` characters, computed only if the record is emitted."""
+    return Lazy(_truncate, value, limit)
+
+
+def dumped(value: Any, limit: int = 2000) -> Lazy:
+    """`value` as (truncated) JSON, computed only if the record is emitted."""
+    return Lazy(lambda: _truncate(json_codec.dumps(value), limit))
+
+
+def sampled(category: str) -> bool:
+    rate = LOG_SAMPLE_RATES.get(category, 1.0)
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def log_event(log: logging.Logger, category: str, msg: str, *args: Any,
+              level: int = logging.DEBUG, **fields: Any) -> None:
+    """Log `msg` under a sampling `category`, with `fields` attached as structured data.
+
+    Level and sampling are checked before anything is formatted, so a dropped
+    record costs one dict lookup. Pass payloads through `truncated()`/`dumped()`.
+    """
+    if not log.isEnabledFor(level) or not sampled(category):
+        return
+    log.log(level, msg, *args, extra={"category": category, "fields": fields}, stacklevel=2)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        category = getattr(record, "category", None)
+        if category:
+            entry["category"] = category
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update({k: v if isinstance(v, (int, float, bool, type(None))) else str(v) for k, v in fields.items()})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json_codec.dumps(entry)
+
+
+def configure_logging() -> None:
+    """Root logging setup for the server, from LOG_LEVEL and LOG_FORMAT."""
+    handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter(logging.BASIC_FORMAT))
+    logging.basicConfig(level=LOG_LEVEL, handlers=[handler])
+
+
+class RequestLog:
+    """The last `size` requests as small summary records, newest last.
+
+    A record is added when a request starts and filled in as it runs, so
+    in-flight requests are visible too. Nothing here holds payloads beyond
+    the truncated query.
+    """
+
+    def __init__(self, size: int = REQUEST_LOG_SIZE, query_chars: int = REQUEST_LOG_QUERY_CHARS):
+        self.query_chars = query_chars
+        self._records: Deque[Dict[str, Any]] = deque(maxlen=max(1, size))
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, task_id: str, context_id: str, query: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Record one request; the caller may set `outcome` and other keys on the yielded record."""
+        started = time.monotonic()
+        record: Dict[str, Any] = {
+            "task_id": task_id,
+            "context_id": context_id,
+            "started_at": round(time.time(), 3),
+            "query": query[:self.query_chars],
+            "query_chars": len(query),
+            "outcome": "running",
+            **fields,
+        }
+        with self._lock:
+            self._records.append(record)
+        try:
+            yield record
+        except asyncio.CancelledError:
+            record["outcome"] = "canceled"
+            raise
+        except Exception as e:
+            record["outcome"] = "error"
+            record["error"] = _truncate(e, 200)
+            raise
+        finally:
+            record["duration_s"] = round(time.monotonic() - started, 3)
+            if record["outcome"] == "running":
+                record["outcome"] = "done"
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Copies of the most recent records, newest first."""
+        with self._lock:
+            records = list(self._records)
+        records.reverse()
+        return [dict(r) for r in records[:limit]]
+
+
+REQUEST_LOG = RequestLog()
@@ -0,0 +1,173 @@
+import copy
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.a2ui_templates import decode_entries, value_entry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Surface:
+    root: Optional[str] = None
+    styles: Optional[Dict[str, Any]] = None
+    components: Dict[str, Any] = field(default_factory=dict)
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+def _split_path(path: Optional[str]) -> List[str]:
+    return [p for p in str(path or "/").split("/") if p]
+
+
+def _node_at(data: Dict[str, Any], parts: List[str], create: bool = False) -> Optional[Dict[str, Any]]:
+    node = data
+    for part in parts:
+        child = node.get(part)
+        if not isinstance(child, dict):
+            if not create:
+                return None
+            child = node[part] = {}
+        node = child
+    return node
+
+
+def _data_delta(old: Dict[str, Any], new: Dict[str, Any], parts: List[str], out: Dict[Tuple[str, ...], Dict[str, Any]]) -> None:
+    """Collect the smallest `{path: {key: value}}` writes that turn `old` into `new`."""
+    if any(key not in new for key in old):
+        # Keys can't be deleted one by one, so resend this whole level
+        parent = tuple(parts[:-1])
+        if parts:
+            out.setdefault(parent, {})[parts[-1]] = new
+        else:
+            out.setdefault(parent, {}).update(new)
+        return
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            _data_delta(previous, value, parts + [key], out)
+        elif key not in old or previous != value or type(previous) is not type(value):
+            out.setdefault(tuple(parts), {})[key] = value
+
+
+class SurfaceStateStore:
+    """Remembers what each client surface already shows, per (context_id, surfaceId).
+
+    `diff` rewrites a freshly generated message list into only what changed
+    since the last turn of the same context: unchanged beginRendering messages
+    are dropped, surfaceUpdate keeps new or modified components, and data model
+    updates are reduced to the changed paths. Surfaces seen for the first time
+    are passed through untouched. A2UI has no way to delete a single
+    component, so a surface that lost components is deleted and resent whole.
+
+    Only for clients that keep their surfaces between responses; the bundled
+    shell clears them on every response, hence A2UI_DELTA_UPDATES defaults off.
+    """
+
+    def __init__(self, max_contexts: int = 1024):
+        self.max_contexts = max_contexts
+        self._contexts: "OrderedDict[str, Dict[str, _Surface]]" = OrderedDict()
+
+    def forget(self, context_id: str) -> None:
+        self._contexts.pop(context_id, None)
+
+    def _surfaces(self, context_id: str) -> Dict[str, _Surface]:
+        surfaces = self._contexts.get(context_id)
+        if surfaces is None:
+            surfaces = self._contexts[context_id] = {}
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+        self._contexts.move_to_end(context_id)
+        return surfaces
+
+    @staticmethod
+    def _shrunk_surfaces(surfaces: Dict[str, _Surface], messages: List[Dict[str, Any]]) -> set:
+        """Known surfaces whose new surfaceUpdates leave out components the client still holds."""
+        incoming: Dict[str, set] = {}
+        for message in messages:
+            body = message.get("surfaceUpdate") if isinstance(message, dict) else None
+            if isinstance(body, dict):
+                ids = incoming.setdefault(body.get("surfaceId", "default"), set())
+                ids.update(c.get("id") for c in body.get("components") or [] if isinstance(c, dict))
+        return {
+            surface_id for surface_id, ids in incoming.items()
+            if surface_id in surfaces and not set(surfaces[surface_id].components) <= ids
+        }
+
+    def diff(self, context_id: str, messages: List[Dict[str, Any]], full_resend: bool = False) -> List[Dict[str, Any]]:
+        surfaces = self._surfaces(context_id)
+        rebuild = set() if full_resend else self._shrunk_surfaces(surfaces, messages)
+        for surface_id in rebuild:
+            del surfaces[surface_id]
+        known = {sid for sid in surfaces}
+        out: List[Dict[str, Any]] = []
+        for message in messages:
+            if not isinstance(message, dict):
+                out.append(message)
+                continue
+            if "deleteSurface" in message:
+                surfaces.pop((message["deleteSurface"] or {}).get("surfaceId"), None)
+                out.append(message)
+                continue
+            body_name = next((k for k in ("beginRendering", "surfaceUpdate", "dataModelUpdate") if k in message), None)
+            if body_name is None:
+                out.append(message)
+                continue
+            body = message[body_name]
+            surface_id = body.get("surfaceId", "default")
+            if surface_id in rebuild:
+                # Clear the stale surface on the client before its full resend
+                rebuild.discard(surface_id)
+                out.append({"deleteSurface": {"surfaceId": surface_id}})
+            surface = surfaces.setdefault(surface_id, _Surface())
+            send_all = full_resend or surface_id not in known
+
+            if body_name == "beginRendering":
+                changed = (body.get("root"), body.get("styles")) != (surface.root, surface.styles)
+                surface.root, surface.styles = body.get("root"), copy.deepcopy(body.get("styles"))
+                if send_all or changed:
+                    out.append(message)
+            elif body_name == "surfaceUpdate":
+                changed_components = []
+                for component in body.get("components") or []:
+                    component_id = component.get("id") if isinstance(component, dict) else None
+                    if send_all or component_id is None or surface.components.get(component_id) != component:
+                        changed_components.append(component)
+                    if component_id is not None:
+                        surface.components[component_id] = copy.deepcopy(component)
+                if changed_components:
+                    out.append({"surfaceUpdate": {**body, "components": changed_components}})
+            else:
+                out.extend(self._data_update(surface, surface_id, body, send_all))
+        return out
+
+    def _data_update(self, surface: _Surface, surface_id: str, body: Dict[str, Any], send_all: bool) -> List[Dict[str, Any]]:
+        parts = _split_path(body.get("path"))
+        incoming = decode_entries(body.get("contents") or [])
+        if not parts and (len(incoming) != 1 or "." not in incoming):
+            # A root update replaces the whole data model
+            new_data = copy.deepcopy(incoming)
+        else:
+            new_data = copy.deepcopy(surface.data)
+            target = _node_at(new_data, parts, create=True)
+            target.update(copy.deepcopy(incoming))
+
+        old_data, surface.data = surface.data, new_data
+        if send_all or "." in incoming:
+            # First render, or the `{key: '.'}` convention whose meaning the client decides
+            return [{"dataModelUpdate": body}]
+
+        delta: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        _data_delta(old_data, new_data, [], delta)
+        if () in delta:
+            # A root update may replace the whole model on the client, so it has to be complete
+            delta = {(): new_data}
+        return [
+            {"dataModelUpdate": {
+                "surfaceId": surface_id,
+                "path": "/" + "/".join(path),
+                "contents": [value_entry(key, value) for key, value in values.items()],
+            }}
+            for path, values in delta.items()
+        ]
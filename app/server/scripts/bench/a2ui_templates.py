@@ -0,0 +1,35 @@
+"""Payload size of the /items encodings (JSON string against native valueMap) for typical result pages.
+
+Run from app/server: python -m scripts.bench.a2ui_templates
+"""
+import copy
+from typing import Any, Dict
+
+from agent import json_codec
+from agent.a2ui_templates import inject_items, restaurant_list_messages
+
+
+def sample_item(i: int) -> Dict[str, Any]:
+    return {
+        "name": f"Restaurant {i}",
+        "caption": "Italian, Pizza, Wine bar",
+        "rating": "★★★★☆",
+        "location": f"{100 + i} Main St, Austin, TX 78701",
+        "imageURL": f"http://localhost:10002/static/italian{i % 3 + 1}.png",
+        "lat": 30.26 + i / 1000,
+        "lng": -97.74 - i / 1000,
+        "infoLink": f"https://example.com/restaurant-{i}",
+    }
+
+
+def main() -> None:
+    for n in (5, 20, 50):
+        items = [sample_item(i) for i in range(n)]
+        llm_msgs = restaurant_list_messages(items)
+        json_size = len(json_codec.dumps(inject_items(copy.deepcopy(llm_msgs), items, "json")).encode())
+        native_size = len(json_codec.dumps(inject_items(copy.deepcopy(llm_msgs), items, "native")).encode())
+        print(f"{n:>3} items: json={json_size:>7} B  native={native_size:>7} B  saved={1 - native_size / json_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
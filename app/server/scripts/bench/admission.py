@@ -0,0 +1,43 @@
+"""A burst of 200 requests against a backend that takes 50 ms per call and allows 4 at once.
+
+The queue absorbs what it can and the rest is turned away immediately
+(queue_full) or after the wait limit (wait_timeout).
+Run from app/server: python -m scripts.bench.admission
+"""
+import asyncio
+import time
+
+from agent.admission import Governor, Overloaded
+from agent.metrics import METRICS
+
+
+async def burst(governor: Governor, n: int = 200) -> None:
+    outcomes = {"ok": 0, "rejected": 0}
+    latencies = []
+
+    async def one() -> None:
+        started = time.monotonic()
+        try:
+            async with governor.slot("apify", timeout=1.0):
+                await asyncio.sleep(0.05)
+            outcomes["ok"] += 1
+        except Overloaded:
+            outcomes["rejected"] += 1
+        latencies.append(time.monotonic() - started)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    latencies.sort()
+    print(f"  ok={outcomes['ok']} rejected={outcomes['rejected']} "
+          f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms max={latencies[-1] * 1000:.0f}ms")
+
+
+def main() -> None:
+    print("limits 4/queue 16:")
+    asyncio.run(burst(Governor({"apify": 4}, {"apify": 16})))
+    print("queue timeout 1s, queue 200:")
+    asyncio.run(burst(Governor({"apify": 4}, {"apify": 200})))
+    print(METRICS.snapshot()["counters"])
+
+
+if __name__ == "__main__":
+    main()
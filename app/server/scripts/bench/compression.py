@@ -0,0 +1,58 @@
+"""Compression ratio and CPU cost on a typical final A2A message and its SSE stream.
+
+Run from app/server: python -m scripts.bench.compression
+"""
+import time
+
+from agent import json_codec
+from agent.a2ui_templates import inject_items, restaurant_list_messages
+from agent.compression import _Encoder, brotli
+
+
+def sample_item(i: int) -> dict:
+    return {
+        "name": f"Restaurant {i}",
+        "caption": "Italian, Pizza, Wine bar",
+        "rating": "★★★★☆",
+        "location": f"{100 + i} Main St, Austin, TX 78701",
+        "imageURL": f"http://localhost:10002/static/v/italian{i % 3 + 1}.480w.0123456789abcdef.webp",
+        "lat": 30.26 + i / 1000,
+        "lng": -97.74 - i / 1000,
+        "infoLink": f"https://example.com/restaurant-{i}",
+    }
+
+
+def envelope(parts: list) -> bytes:
+    return json_codec.dumps({
+        "jsonrpc": "2.0", "id": 1,
+        "result": {"kind": "status-update", "final": True, "status": {"state": "completed", "message": {
+            "role": "agent", "parts": parts, "kind": "message", "messageId": "m-1"}}},
+    }).encode()
+
+
+def main() -> None:
+    for n in (5, 20, 50):
+        items = [sample_item(i) for i in range(n)]
+        ui = inject_items(restaurant_list_messages(items), items, "native")
+        final = envelope([{"kind": "data", "data": m} for m in ui] + [{"kind": "text", "text": "details " * 40}])
+        events = [b"data: " + envelope([{"kind": "text", "text": f"node {k} responded"}] * 2) + b"\n\n" for k in range(6)]
+        events.append(b"data: " + final + b"\n\n")
+        for encoding, level in (("gzip", 1), ("gzip", 6)) + ((("br", 4), ("br", 11)) if brotli is not None else ()):
+            rounds = 50
+            started = time.thread_time()
+            for _ in range(rounds):
+                whole = _Encoder(encoding, level, level)
+                whole_out = whole.compress(final) + whole.finish()
+            whole_ms = (time.thread_time() - started) * 1000 / rounds
+            stream = _Encoder(encoding, level, level)
+            stream_out = sum(len(stream.compress(e, flush=True)) for e in events) + len(stream.finish())
+            stream_in = sum(len(e) for e in events)
+            print(
+                f"{n:>3} items {encoding:>4}-{level:<2} final: {len(final):>6} -> {len(whole_out):>5} B "
+                f"({len(whole_out) / len(final):.0%}, {whole_ms:.2f} ms CPU)  "
+                f"stream: {stream_in:>6} -> {stream_out:>5} B ({stream_out / stream_in:.0%})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Bytes a results page transfers for its thumbnails, before and after variants.
+
+Run from app/server: python -m scripts.bench.image_variants
+"""
+from agent.image_variants import IMAGE_VARIANTS
+
+
+def main() -> None:
+    variants = IMAGE_VARIANTS
+    if not variants.enabled:
+        print("Pillow is not installed; variants are disabled")
+        return
+    totals = variants.warm()
+    ratio = totals["variant_bytes"] / max(1, totals["original_bytes"])
+    print(
+        f"{totals['images']} images: original={totals['original_bytes']:>9} B  "
+        f"variants={totals['variant_bytes']:>8} B  ({ratio:.1%} of original, {variants.fmt} @ {variants.width}px)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Prompt bytes saved by projecting a page of 20 Google Places actor items with the usual heavy fields.
+
+Run from app/server: python -m scripts.bench.item_projection
+"""
+from agent import json_codec
+from agent.graph.item_projection import PROJECTOR
+
+
+def raw_item(i: int) -> dict:
+    return {
+        "title": f"Trattoria {i}", "categoryName": "Italian restaurant",
+        "categories": ["Italian restaurant", "Pizza restaurant", "Wine bar", "Caterer"],
+        "address": f"{100 + i} Congress Ave, Austin, TX 78701", "city": "Austin", "state": "Texas",
+        "totalScore": 4.6, "reviewsCount": 1200, "location": {"lat": 30.26 + i / 1000, "lng": -97.74},
+        "website": f"https://trattoria{i}.example.com", "url": f"https://www.google.com/maps/place/?q=place_id:{i}",
+        "imageUrl": f"https://lh5.googleusercontent.com/p/{'A' * 120}{i}",
+        "description": "Family-run trattoria serving handmade pasta and wood-fired pizza. " * 6,
+        "openingHours": [{"day": d, "hours": "11 AM to 10 PM"} for d in range(7)],
+        "popularTimesHistogram": {d: [{"hour": h, "occupancyPercent": h * 3} for h in range(24)] for d in "MTWRFSU"},
+        "reviews": [{"name": f"Reviewer {r}", "text": "Great food and friendly staff. " * 10, "stars": 5} for r in range(10)],
+        "imageUrls": [f"https://lh5.googleusercontent.com/p/{'B' * 120}{n}" for n in range(20)],
+        "additionalInfo": {"Service options": [{"Dine-in": True}, {"Takeout": True}], "Amenities": [{"Wi-Fi": True}]},
+    }
+
+
+def main() -> None:
+    result = PROJECTOR.project([raw_item(i) for i in range(20)])
+    print(f"items: {len(result.items)}  bytes in: {result.bytes_in}  out: {result.bytes_out}  ratio: {result.ratio:.1f}x")
+    print(json_codec.dumps(result.items[0], ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
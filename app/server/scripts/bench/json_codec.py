@@ -0,0 +1,67 @@
+"""Per-request CPU spent on JSON along the graph, stdlib json against agent.json_codec.
+
+Covers the apify dump, formatter load/dump, presenter load/dump/load and the
+executor's final load. Run from app/server: python -m scripts.bench.json_codec
+"""
+import json
+import time
+
+from agent.json_codec import BACKEND, dumps, loads
+
+
+def raw_item(i: int) -> dict:
+    return {
+        "title": f"Trattoria Número {i}",
+        "placeId": f"ChIJ{i:012d}",
+        "categoryName": "Italian restaurant",
+        "categories": ["Italian restaurant", "Pizza restaurant", "Wine bar"],
+        "address": f"{100 + i} Congress Ave, Austin, TX 78701",
+        "totalScore": 4.6,
+        "reviewsCount": 1200 + i,
+        "location": {"lat": 30.26 + i / 1000, "lng": -97.74 - i / 1000},
+        "openingHours": [{"day": d, "hours": "11 AM to 10 PM"} for d in ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")],
+        "reviews": [{"text": "Great pasta, friendly staff. " * 6, "stars": 5} for _ in range(5)],
+        "imageUrl": f"https://lh5.googleusercontent.com/p/photo-{i}=w408-h306",
+        "url": f"https://www.google.com/maps/place/?q=place_id:ChIJ{i:012d}",
+    }
+
+
+def card(i: int) -> dict:
+    return {
+        "name": f"Trattoria Número {i}", "caption": "Italian, Pizza, Wine bar", "rating": "★★★★★",
+        "location": f"{100 + i} Congress Ave, Austin, TX 78701", "imageURL": "", "lat": 30.26, "lng": -97.74,
+        "infoLink": "https://example.com",
+    }
+
+
+def one_request(codec_dumps, codec_loads, raw_items: list, cards_in: list) -> None:
+    raw = codec_dumps(raw_items)                             # ApifyPlacesAgent
+    items = codec_loads(raw)                                 # FormatterAgent
+    codec_dumps(items)
+    cards = codec_dumps(cards_in)
+    parsed = codec_loads(cards)                              # PresenterAgent
+    ui = codec_dumps([{"dataModelUpdate": {"contents": parsed}}])
+    codec_loads(ui)                                          # RestaurantGraphExecutor
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def main() -> None:
+    print(f"backend: {BACKEND}")
+    for n in (5, 20, 50):
+        raw_items, cards_in = [raw_item(i) for i in range(n)], [card(i) for i in range(n)]
+        timings = {}
+        for label, d, l in (("stdlib", stdlib_dumps, json.loads), ("codec", dumps, loads)):
+            rounds = 200
+            started = time.process_time()
+            for _ in range(rounds):
+                one_request(d, l, raw_items, cards_in)
+            timings[label] = (time.process_time() - started) * 1000 / rounds
+        saved = 1 - timings["codec"] / timings["stdlib"]
+        print(f"{n:>3} items: stdlib={timings['stdlib']:.3f} ms  codec={timings['codec']:.3f} ms  saved={saved:.0%} per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Requests per second for /static under concurrency, in-process over ASGI.
+
+Compares Starlette's StaticFiles with CachedStaticFiles for full responses,
+304s and byte ranges. Run from app/server:
+
+    python -m scripts.bench.static_files [directory]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from starlette.applications import Starlette
+from starlette.staticfiles import StaticFiles
+
+from agent.static_files import CachedStaticFiles
+
+
+async def bench(directory: str, concurrency: int = 32, requests: int = 2000) -> None:
+    url = f"/static/{sorted(os.listdir(directory))[0]}"
+    for static_cls in (StaticFiles, CachedStaticFiles):
+        app = Starlette()
+        app.mount("/static", static_cls(directory=directory), name="static")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            first = await client.get(url)
+            cases = {
+                "full": {},
+                "304": {"if-none-match": first.headers["etag"]},
+                "range": {"range": "bytes=0-16383"},
+            }
+            for label, headers in cases.items():
+                remaining = [requests]
+
+                async def worker():
+                    while remaining[0] > 0:
+                        remaining[0] -= 1
+                        await client.get(url, headers=headers)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                elapsed = time.perf_counter() - started
+                print(f"{static_cls.__name__:>17} {label:>5}: {requests / elapsed:8.0f} req/s  "
+                      f"({url}, {len(first.content)} B, concurrency={concurrency})")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(sys.argv[1] if len(sys.argv) > 1 else "images"))
@@ -0,0 +1,40 @@
+"""The cost of one final-parts dump per request, eager f-string at INFO against log_event().
+
+log_event() runs with the payload category off, its default. Also shows the
+request log keeping only the newest records.
+Run from app/server: python -m scripts.bench.structured_logging
+"""
+import io
+import logging
+import timeit
+
+from agent.structured_logging import RequestLog, log_event, truncated
+
+
+def main() -> None:
+    stream = logging.StreamHandler(io.StringIO())
+    logging.basicConfig(level=logging.INFO, handlers=[stream])
+    demo_logger = logging.getLogger("demo")
+    data = {"beginRendering": {"surfaceId": "s1", "root": "r"},
+            "items": [{"name": f"Restaurant {i}", "rating": 4.5, "address": "1 Main St " * 5} for i in range(20)]}
+
+    def eager() -> None:
+        demo_logger.info(f"    - Data: {str(data)[:200]}...")
+
+    def lazy() -> None:
+        log_event(demo_logger, "payload", "Final part data: %s", truncated(data))
+
+    n = 20000
+    for name, fn in (("eager f-string", eager), ("log_event", lazy)):
+        seconds = timeit.timeit(fn, number=n)
+        print(f"{name:>15}: {seconds / n * 1e6:.2f} us per call")
+
+    log = RequestLog(size=3)
+    for i in range(5):
+        with log.track(f"task-{i}", "ctx", "pizza in austin " * 30) as record:
+            record["route"] = "graph"
+    print([r["task_id"] for r in log.recent()])
+
+
+if __name__ == "__main__":
+    main()
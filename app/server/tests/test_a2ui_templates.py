@@ -0,0 +1,70 @@
+from agent import json_codec
+from agent.a2ui_templates import decode_entries, inject_items, restaurant_list_messages, value_entry
+
+
+def formatter_item(name, lat, **extra):
+    return {"name": name, "caption": "Pizza", "rating": "★★★★☆", "location": "Austin", "lat": lat, "lng": -97.7,
+            "infoLink": f"https://example.com/{lat}", **extra}
+
+
+def llm_messages(*cards):
+    """What the presenter LLM writes: the list template with its own (often partial) items."""
+    messages = restaurant_list_messages([])
+    root = messages[2]["dataModelUpdate"]
+    root["contents"] = [{"key": "title", "valueString": "Top"},
+                        {"key": "items", "valueMap": [value_entry(str(i), c) for i, c in enumerate(cards)]}]
+    return messages
+
+
+def shown_items(messages):
+    root = messages[2]["dataModelUpdate"]["contents"]
+    items = decode_entries(root)["items"]
+    return [items[str(i)] for i in range(len(items))]
+
+
+def test_value_entries_round_trip():
+    value = {"name": "A", "rating": 4.5, "open": True, "tags": ["x", "y"], "missing": None}
+    entry = value_entry("item", value)
+    assert entry["valueMap"][2] == {"key": "open", "valueBoolean": True}
+    assert decode_entries([entry]) == {"item": {"name": "A", "rating": 4.5, "open": True, "tags": {"0": "x", "1": "y"}}}
+
+
+def test_native_injection_matches_reordered_llm_cards_by_name():
+    formatter = [formatter_item("Joe's Pizza", 30.1), formatter_item("Home Slice", 30.2)]
+    llm = llm_messages({"name": "home slice", "detail": "Classic NY slices"},
+                       {"name": "Joe’s Pizza", "detail": "Wood-fired"})
+
+    shown = shown_items(inject_items(llm, formatter, "native"))
+
+    assert [(it["name"], it["lat"], it["detail"]) for it in shown] == [
+        ("Joe’s Pizza", 30.1, "Wood-fired"),
+        ("home slice", 30.2, "Classic NY slices"),
+    ]
+    # Sent once, inside the LLM's own root update
+    assert len(llm) == 3
+
+
+def test_native_injection_prefers_place_id_and_falls_back_to_index_without_keys():
+    formatter = [formatter_item("Renamed", 30.1, placeId="p1"), {"lat": 30.2, "lng": -97.7}]
+    llm = llm_messages({"name": "Original", "placeId": "p1"}, {"name": "Positional"})
+
+    shown = shown_items(inject_items(llm, formatter, "native"))
+
+    assert shown[0]["name"] == "Original" and shown[0]["lat"] == 30.1
+    assert shown[1]["name"] == "Positional" and shown[1]["lat"] == 30.2
+
+
+def test_native_injection_without_llm_items_adds_an_items_update():
+    messages = restaurant_list_messages([])[:2]
+    out = inject_items(messages, [formatter_item("A", 30.1)], "native")
+    update = out[-1]["dataModelUpdate"]
+    assert update["path"] == "/items"
+    assert decode_entries(update["contents"])["0"]["name"] == "A"
+
+
+def test_json_injection_appends_the_items_as_one_string():
+    formatter = [formatter_item("A", 30.1)]
+    out = inject_items(llm_messages({"name": "A"}), formatter, "json")
+    update = out[-1]["dataModelUpdate"]
+    assert update["path"] == "/items"
+    assert json_codec.loads(update["contents"][0]["valueString"]) == formatter
@@ -0,0 +1,94 @@
+import asyncio
+
+from agent.admission import GOVERNOR
+from agent.cancellation import RunningTasks
+from agent.graph.hedging import hedged_call
+from agent.graph.intent_cache import IntentCache
+
+
+def in_flight(backend: str) -> int:
+    return GOVERNOR.snapshot().get(backend, {}).get("in_flight", 0)
+
+
+def test_cancel_releases_admission_slots():
+    async def scenario():
+        running = RunningTasks()
+
+        async def llm():
+            await asyncio.sleep(60)
+
+        async def scrape():
+            async with GOVERNOR.slot("apify"):
+                await asyncio.sleep(60)
+
+        async def run():
+            running.register("task-1")
+            await asyncio.gather(hedged_call(llm, name="test", backend="oci:test-cancel"), scrape())
+
+        task = asyncio.create_task(run())
+        await asyncio.sleep(0.05)
+        assert in_flight("oci:test-cancel") == 1
+        assert in_flight("apify") == 1
+
+        assert await running.cancel("task-1")
+        assert task.cancelled()
+        assert in_flight("oci:test-cancel") == 0
+        assert in_flight("apify") == 0
+        assert len(running) == 0
+
+    asyncio.run(scenario())
+
+
+def test_shared_fetch_cancelled_only_after_last_waiter():
+    async def scenario():
+        running = RunningTasks()
+        cache = IntentCache()
+        key = ("search", ("pizza",), "austin")
+        fetch_cancelled = asyncio.Event()
+
+        async def fetch(offset, limit):
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                fetch_cancelled.set()
+                raise
+            return []
+
+        async def run(task_id):
+            running.register(task_id)
+            await cache.get_or_fetch(key, 5, fetch)
+
+        first = asyncio.create_task(run("first"))
+        second = asyncio.create_task(run("second"))
+        await asyncio.sleep(0.05)
+        assert len(cache._flights) == 1
+        assert len(running) == 2
+
+        assert await running.cancel("first")
+        assert not fetch_cancelled.is_set()
+        assert len(cache._flights) == 1
+        assert not second.done()
+
+        assert await running.cancel("second")
+        assert fetch_cancelled.is_set()
+        assert cache._flights == {}
+        assert first.cancelled() and second.cancelled()
+        assert len(running) == 0
+
+    asyncio.run(scenario())
+
+
+def test_running_tasks_forget_finished_runs():
+    async def scenario():
+        running = RunningTasks()
+
+        async def run():
+            running.register("done")
+
+        await asyncio.create_task(run())
+        await asyncio.sleep(0)
+        assert len(running) == 0
+        assert not await running.cancel("done")
+        assert not await running.cancel("unknown")
+
+    asyncio.run(scenario())
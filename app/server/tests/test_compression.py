@@ -0,0 +1,22 @@
+import pytest
+
+from agent import compression
+from agent.compression import negotiate_encoding
+
+
+def test_negotiate_encoding_picks_gzip_and_honours_q_zero(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("br, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("*, gzip;q=0") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+
+
+def test_negotiate_encoding_prefers_brotli_when_installed():
+    pytest.importorskip("brotli")
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0.1") == "gzip"
+    assert negotiate_encoding("br;q=0") is None
@@ -0,0 +1,48 @@
+import asyncio
+from dataclasses import asdict
+
+from agent.graph.struct import DEFAULT_CONFIG
+from agent.graph_executor import RestaurantGraphExecutor
+
+
+class FakeGraph:
+    async def build_graph(self):
+        pass
+
+
+def full_config() -> dict:
+    return {name: asdict(config) for name, config in DEFAULT_CONFIG.items()}
+
+
+def test_partial_config_is_rejected():
+    executor = RestaurantGraphExecutor(base_url="http://localhost")
+    partial = {"formatter_agent": full_config()["formatter_agent"]}
+
+    success, error = executor.update_config(partial)
+
+    assert not success
+    assert "validation failed" in error
+    assert "apify_places_agent" in error
+    status = executor.config_status()
+    assert status["active"]["version"] == 1
+    assert status["pending_version"] is None
+
+
+def test_full_config_builds_and_swaps_in():
+    async def scenario():
+        executor = RestaurantGraphExecutor(base_url="http://localhost")
+        executor._create_graph = lambda use_ui, config: FakeGraph()
+        config = full_config()
+        config["formatter_agent"]["temperature"] = 0.5
+
+        success, error = executor.update_config(config)
+        assert success, error
+        assert executor.config_status()["pending_version"] == 2
+
+        await executor._build_task
+        status = executor.config_status()
+        assert status["active"]["version"] == 2
+        assert status["pending_version"] is None
+        assert executor.current_config["formatter_agent"].temperature == 0.5
+
+    asyncio.run(scenario())
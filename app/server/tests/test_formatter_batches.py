@@ -0,0 +1,68 @@
+import asyncio
+
+from langchain.messages import AIMessage, HumanMessage
+
+from agent import json_codec
+from agent.graph.formatter_agent import FormatterAgent
+from agent.graph.model_router import ModelRouter
+
+
+def raw_place(i):
+    return {"title": f"Place {i}", "totalScore": 4.6, "address": f"{i} Main St", "location": {"lat": 30.0 + i, "lng": -97.0}}
+
+
+class FakeAgent:
+    """Answers each call with the next batch size from `sizes`, naming the places it was given."""
+
+    def __init__(self, sizes):
+        self.sizes = list(sizes)
+        self.calls = 0
+
+    async def ainvoke(self, payload):
+        self.calls += 1
+        prompt = payload["messages"][0].content
+        given = json_codec.loads(prompt.split("RAW_ITEMS_JSON: ", 1)[1].split("\n", 1)[0])
+        size = self.sizes.pop(0) if self.sizes else len(given)
+        items = [{"name": f"LLM {it['title']}", "rating": "★★★★★"} for it in given][:size]
+        return {"messages": [AIMessage(content=json_codec.dumps(items), response_metadata={"total_tokens": 10})]}
+
+
+def formatter(agent):
+    node = FormatterAgent.__new__(FormatterAgent)
+    node.default_city = "Austin, TX"
+    node.agent_name = "formatter_agent"
+    node.model_temperature = 0.2
+    node._router = ModelRouter("formatter_agent", "fast", build=lambda model: agent)
+    return node
+
+
+def run(node, places):
+    state = {"messages": [HumanMessage(content="pizza"), AIMessage(content=json_codec.dumps(places))]}
+    result = asyncio.run(node(state))
+    return json_codec.loads(result["messages"][0].content)
+
+
+def test_batches_respect_item_and_token_limits():
+    items = [{"name": "x" * 40} for _ in range(5)]
+    assert FormatterAgent._batches(items, max_tokens=1000, max_items=2) == [[0, 1], [2, 3], [4]]
+    # Each item is 13 tokens, so two fit under 30
+    assert FormatterAgent._batches(items, max_tokens=30, max_items=10) == [[0, 1], [2, 3], [4]]
+    # An item over the budget still gets a batch of its own
+    assert FormatterAgent._batches([{"name": "x" * 400}], max_tokens=10) == [[0]]
+    assert FormatterAgent._batches([]) == []
+
+
+def test_short_batch_is_retried():
+    agent = FakeAgent([2])
+    items = run(formatter(agent), [raw_place(i) for i in range(3)])
+    assert [it["name"] for it in items] == ["LLM Place 0", "LLM Place 1", "LLM Place 2"]
+    assert agent.calls == 2
+
+
+def test_batch_with_the_wrong_count_falls_back_in_place():
+    agent = FakeAgent([2, 2])
+    items = run(formatter(agent), [raw_place(i) for i in range(3)])
+    # Deterministic formatting, still in the input order and with coordinates
+    assert [it["name"] for it in items] == ["Place 0", "Place 1", "Place 2"]
+    assert [it["lat"] for it in items] == [30.0, 31.0, 32.0]
+    assert items[0]["rating"] == "★★★★★"
@@ -0,0 +1,81 @@
+import asyncio
+
+from langchain.messages import AIMessage
+
+from agent.graph.fragment_repair import FragmentRepairer, locate_fragment
+
+COMPONENT_SCHEMA = {
+    "type": "object",
+    "properties": {"id": {"type": "string"}, "component": {"type": "object"}},
+    "required": ["id", "component"],
+}
+MESSAGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "beginRendering": {"type": "object", "properties": {"root": {"type": "string"}}, "required": ["root"]},
+        "surfaceUpdate": {
+            "type": "object",
+            "properties": {"surfaceId": {"type": "string"}, "components": {"type": "array", "items": COMPONENT_SCHEMA}},
+        },
+    },
+}
+
+
+class FakeLLM:
+    def __init__(self, *answers: str):
+        self.answers = list(answers)
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[0].content)
+        return AIMessage(content=self.answers.pop(0))
+
+
+def test_locate_fragment():
+    assert locate_fragment([1, "surfaceUpdate", "components", 3, "component", "Text"]) == (
+        (1, "surfaceUpdate", "components", 3), "component")
+    assert locate_fragment([1, "surfaceUpdate", "components"]) == ((1,), "message")
+    assert locate_fragment([0, "beginRendering", "root"]) == ((0,), "message")
+    assert locate_fragment([]) is None
+    assert locate_fragment(["items"]) is None
+
+
+def test_repair_sends_and_replaces_only_the_broken_component():
+    messages = [
+        {"beginRendering": {"root": "col"}},
+        {"surfaceUpdate": {"surfaceId": "s", "components": [
+            {"id": "col", "component": {"Column": {}}},
+            {"id": "title"},
+        ]}},
+    ]
+    llm = FakeLLM('```json\n{"id": "title", "component": {"Text": {}},}\n```')
+    repairer = FragmentRepairer(MESSAGE_SCHEMA, lambda: llm, name="test")
+
+    repaired = asyncio.run(repairer.repair(messages, time_left=5))
+
+    assert repaired[1]["surfaceUpdate"]["components"][1] == {"id": "title", "component": {"Text": {}}}
+    assert repaired[0] == messages[0]
+    assert messages[1]["surfaceUpdate"]["components"][1] == {"id": "title"}
+    assert len(llm.prompts) == 1
+    assert "Invalid component:" in llm.prompts[0]
+    assert '{"id":"title"}' in llm.prompts[0]
+    assert "Column" not in llm.prompts[0]
+
+
+def test_repair_gives_up_when_the_fragment_stays_broken():
+    messages = [{"beginRendering": {}}]
+    llm = FakeLLM('{"beginRendering": {}}', '{"beginRendering": {}}')
+    repairer = FragmentRepairer(MESSAGE_SCHEMA, lambda: llm, name="test")
+
+    assert asyncio.run(repairer.repair(messages, time_left=5)) is None
+    # The same fragment is never asked for twice
+    assert len(llm.prompts) == 1
+
+
+def test_valid_messages_need_no_model_call():
+    messages = [{"beginRendering": {"root": "col"}}]
+    llm = FakeLLM()
+    repairer = FragmentRepairer(MESSAGE_SCHEMA, lambda: llm, name="test")
+
+    assert asyncio.run(repairer.repair(messages, time_left=5)) == messages
+    assert llm.prompts == []
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from agent.graph.intent_cache import IntentCache, intent_key
+
+KEY = ("search", ("pizza",), "austin")
+
+
+def places(n, start=0):
+    return [{"title": f"Place {i}"} for i in range(start, start + n)]
+
+
+class Source:
+    """Fake provider recording each (offset, limit) it is asked for."""
+
+    def __init__(self, available: int = 100):
+        self.available = available
+        self.calls = []
+
+    async def __call__(self, offset, limit):
+        self.calls.append((offset, limit))
+        return places(max(0, min(limit, self.available - offset)), offset)
+
+
+def test_request_arriving_while_cancelled_fetch_unwinds_starts_its_own():
+    async def scenario():
+        cache = IntentCache()
+        unwinding = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def slow_to_cancel(offset, limit):
+            calls.append("first")
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                unwinding.set()
+                # Cleanup that takes a while, e.g. closing a connection
+                await release.wait()
+                raise
+            return []
+
+        async def fetch(offset, limit):
+            calls.append("second")
+            return [{"title": "Pizza Place"}]
+
+        first = asyncio.create_task(cache.get_or_fetch(KEY, 1, slow_to_cancel))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await unwinding.wait()
+
+        second = asyncio.create_task(cache.get_or_fetch(KEY, 1, fetch))
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await second == [{"title": "Pizza Place"}]
+        assert calls == ["first", "second"]
+        await asyncio.gather(first, return_exceptions=True)
+        assert first.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_intent_key_ignores_wording_count_and_aliases():
+    a = intent_key({"searchStringsArray": ["Best pizza restaurants"], "locationQuery": "NYC", "maxItems": 10})
+    b = intent_key({"searchStringsArray": ["pizza restaurant"], "locationQuery": "New York City", "maxItems": 3})
+    assert a == b
+    assert a != intent_key({"searchStringsArray": ["pizza restaurant"], "locationQuery": "Austin, TX"})
+
+
+def test_smaller_request_is_sliced_from_the_cache():
+    async def scenario():
+        cache, source = IntentCache(), Source()
+        assert await cache.get_or_fetch(KEY, 10, source) == places(10)
+        assert await cache.get_or_fetch(KEY, 3, source) == places(3)
+        assert cache.peek(KEY, 5) == places(5)
+        assert source.calls == [(0, 10)]
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_larger_request_fetches_only_the_tail_when_offsets_work():
+    async def scenario():
+        cache, source = IntentCache(), Source()
+        await cache.get_or_fetch(KEY, 5, source, supports_offset=True)
+        assert await cache.get_or_fetch(KEY, 8, source, supports_offset=True) == places(8)
+        assert source.calls == [(0, 5), (5, 3)]
+
+        other, plain = IntentCache(), Source()
+        await other.get_or_fetch(KEY, 5, plain)
+        assert await other.get_or_fetch(KEY, 8, plain) == places(8)
+        assert plain.calls == [(0, 5), (0, 8)]
+
+    asyncio.run(scenario())
+
+
+def test_short_successful_result_is_exhausted():
+    async def scenario():
+        cache, source = IntentCache(), Source(available=2)
+        assert await cache.get_or_fetch(KEY, 5, source) == places(2)
+        # Asking for more again can't yield more, so the cache answers
+        assert await cache.get_or_fetch(KEY, 10, source) == places(2)
+        assert source.calls == [(0, 5)]
+
+    asyncio.run(scenario())
+
+
+def test_empty_and_failed_fetches_are_not_cached():
+    async def scenario():
+        cache = IntentCache()
+        empty = Source(available=0)
+        assert await cache.get_or_fetch(KEY, 5, empty) == []
+        assert cache.peek(KEY, 5) is None
+
+        async def failing(offset, limit):
+            raise RuntimeError("upstream down")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch(KEY, 5, failing)
+        assert cache.peek(KEY, 5) is None
+        assert cache._flights == {}
+
+        source = Source()
+        assert await cache.get_or_fetch(KEY, 5, source) == places(5)
+        assert source.calls == [(0, 5)]
+
+    asyncio.run(scenario())
+
+
+def test_cached_list_never_shrinks():
+    cache = IntentCache()
+    cache.put(KEY, places(10), 10)
+    cache.put(KEY, places(4), 4)
+    cache.put(KEY, [], 5)
+    assert cache.peek(KEY, 10) == places(10)
+
+
+def test_concurrent_requests_share_one_fetch():
+    async def scenario():
+        cache = IntentCache()
+        calls = []
+
+        async def slow(offset, limit):
+            calls.append(limit)
+            await asyncio.sleep(0.01)
+            return places(limit)
+
+        results = await asyncio.gather(*(cache.get_or_fetch(KEY, 5, slow) for _ in range(4)))
+        assert results == [places(5)] * 4
+        assert calls == [5]
+
+    asyncio.run(scenario())
+
+
+def test_expired_entries_are_refetched():
+    async def scenario():
+        cache, source = IntentCache(ttl_seconds=0.0), Source()
+        await cache.get_or_fetch(KEY, 3, source)
+        await asyncio.sleep(0.001)
+        await cache.get_or_fetch(KEY, 3, source)
+        assert source.calls == [(0, 3), (0, 3)]
+
+    asyncio.run(scenario())
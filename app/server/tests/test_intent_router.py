@@ -0,0 +1,67 @@
+import asyncio
+
+from agent.graph.intent_router import (
+    BOOKING, CHIT_CHAT, CONFIRMATION, REFINEMENT, SEARCH, IntentRouter, refine_items, supports_refinement,
+)
+
+
+def classify(text: str, has_session_items: bool = True) -> str:
+    return IntentRouter(use_llm=False).classify_rules(text, has_session_items)[0]
+
+
+def test_rating_floor_on_shown_results_is_a_refinement():
+    assert classify("only show ones with at least 4 stars") == REFINEMENT
+    assert classify("top 3 of these with at least 4 stars") == REFINEMENT
+    assert classify("sort them by rating") == REFINEMENT
+
+
+def test_counted_search_with_rating_floor_is_a_new_search():
+    assert classify("Top 10 restaurants with at least 4 stars") == SEARCH
+    assert classify("find cafes with at least 4.5 stars") == SEARCH
+    assert classify("restaurants near downtown with at least 4 stars") == SEARCH
+
+
+def test_refinement_needs_shown_items():
+    assert classify("only show ones with at least 4 stars", has_session_items=False) != REFINEMENT
+
+
+def test_refinement_with_a_place_name_searches_again():
+    assert classify("only the ones in Dallas") == SEARCH
+
+
+def test_booking_confirmation_and_chit_chat():
+    assert classify("USER_WANTS_TO_BOOK: Joe's Pizza, Address: 1 Main St") == BOOKING
+    assert classify("User submitted a booking for Joe's Pizza for 2 people") == CONFIRMATION
+    assert classify("reserve it for tonight") == BOOKING
+    assert classify("book a table at an Italian place in Austin") == SEARCH
+    assert classify("hello there") == CHIT_CHAT
+
+
+def test_location_prepositions_ignore_case_but_places_need_a_capital():
+    assert classify("Pizza In Austin", has_session_items=False) == SEARCH
+    assert classify("at least 4 stars") == REFINEMENT
+
+
+def test_llm_refinement_it_cannot_apply_falls_back_to_search():
+    router = IntentRouter(use_llm=False)
+    router.use_llm = True
+
+    async def llm_says_refinement(text, has_session_items):
+        return REFINEMENT
+
+    router._classify_llm = llm_says_refinement
+    assert asyncio.run(router.classify("something cozier", has_session_items=True)) == (SEARCH, "llm")
+    assert asyncio.run(router.classify("hmm, 4 stars or more", has_session_items=True)) == (REFINEMENT, "llm")
+
+
+def test_refine_items_filters_sorts_and_limits():
+    items = [
+        {"name": "A", "rating": "★★★"},
+        {"name": "B", "rating": "★★★★★"},
+        {"name": "C", "rating": 4.2},
+        "not an item",
+    ]
+    assert [it["name"] for it in refine_items(items, "at least 4 stars")] == ["B", "C"]
+    assert [it["name"] for it in refine_items(items, "sort by rating")] == ["B", "C", "A"]
+    assert [it["name"] for it in refine_items(items, "best rated, top 2")] == ["B", "C"]
+    assert not supports_refinement("something cozier")
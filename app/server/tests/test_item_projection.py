@@ -0,0 +1,47 @@
+from agent import json_codec
+from agent.graph.item_projection import ItemProjector
+
+
+def raw_place(i, **extra):
+    return {
+        "title": f"Place {i}", "address": f"{i} Main St", "location": {"lat": 30.2, "lng": -97.7},
+        "totalScore": 4.5, "website": "https://example.com/" + "a" * 300, "description": "Great food. " * 40,
+        "reviews": [{"text": "Lovely"}] * 50, "openingHours": [{"day": "Monday"}], **extra,
+    }
+
+
+def test_unknown_fields_are_dropped_and_free_text_trimmed():
+    item = ItemProjector(item_bytes=10_000).project_item(raw_place(0))
+    assert "reviews" not in item and "openingHours" not in item
+    assert len(item["description"]) == 161 and item["description"].endswith("…")
+    # URLs are never cut, however long
+    assert item["website"] == raw_place(0)["website"]
+
+
+def test_item_budget_never_trims_the_title_or_location():
+    item = ItemProjector(item_bytes=10).project_item(raw_place(0))
+    assert item == {"title": "Place 0", "location": {"lat": 30.2, "lng": -97.7}, "address": "0 Main St"}
+
+
+def test_item_budget_drops_the_lowest_priority_fields_first():
+    full = ItemProjector(item_bytes=10_000).project_item(raw_place(0))
+    without_description = {k: v for k, v in full.items() if k != "description"}
+    budget = len(json_codec.dumps(without_description, ensure_ascii=False).encode("utf-8"))
+    trimmed = ItemProjector(item_bytes=budget).project_item(raw_place(0))
+    assert trimmed == without_description
+
+
+def test_request_budget_only_drops_a_tail():
+    places = [raw_place(i) for i in range(10)]
+    one = ItemProjector().project([places[0]]).bytes_out
+    projection = ItemProjector(request_bytes=one * 3).project(places + ["not a place"])
+    assert [it["title"] for it in projection.items] == ["Place 0", "Place 1", "Place 2"]
+    assert projection.dropped_items == 7
+    assert projection.bytes_out <= one * 3 < projection.bytes_in
+
+
+def test_disabled_projection_passes_items_through():
+    places = [raw_place(0), "not a place"]
+    projection = ItemProjector(enabled=False).project(places)
+    assert projection.items == [places[0]]
+    assert projection.bytes_in == projection.bytes_out
@@ -0,0 +1,39 @@
+import pytest
+
+from agent import json_codec
+from agent.json_repair import repair_json
+
+
+def test_valid_json_needs_no_repair():
+    assert repair_json('{"a": [1, 2]}') == ({"a": [1, 2]}, [])
+
+
+def test_fences_comments_trailing_commas_and_bare_keys():
+    text = '```json\n{\n  // the card\n  name: "Joe\'s", weight: 1, /* note */ open: True,\n  tags: ["a", "b",],\n}\n```'
+    value, repairs = repair_json(text)
+    assert value == {"name": "Joe's", "weight": 1, "open": True, "tags": ["a", "b"]}
+    assert repairs == ["code_fence", "line_comment", "unquoted_key", "block_comment", "python_literal", "trailing_comma"]
+
+
+def test_string_contents_are_left_alone():
+    value, repairs = repair_json('{"url": "https://example.com//x", "note": "a, ]"}')
+    assert value == {"url": "https://example.com//x", "note": "a, ]"}
+    assert repairs == []
+
+
+def test_unbalanced_fence():
+    assert repair_json('```json\n[1, 2]') == ([1, 2], ["code_fence"])
+
+
+def test_expect_list_wraps_objects():
+    assert repair_json('{"a": 1}', expect_list=True) == ([{"a": 1}], ["wrapped_object"])
+    value, repairs = repair_json('{"a": 1}\n{"b": 2},', expect_list=True)
+    assert value == [{"a": 1}, {"b": 2}]
+    assert "wrapped_sequence" in repairs
+
+
+def test_unrepairable_text_raises_the_codec_error():
+    with pytest.raises(json_codec.JSONDecodeError):
+        repair_json("Sorry, I can't help with that.")
+    with pytest.raises(json_codec.JSONDecodeError):
+        repair_json('{"a": 1} {"b": 2}')
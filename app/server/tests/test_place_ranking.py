@@ -0,0 +1,57 @@
+from agent.graph.place_ranking import PlaceRanker, merge_ranked, normalize_text, place_key
+
+
+def place(title, score=4.5, reviews=100, lat=30.27, lng=-97.74, **extra):
+    return {"title": title, "totalScore": score, "reviewsCount": reviews, "location": {"lat": lat, "lng": lng}, **extra}
+
+
+def titles(items):
+    return [it["title"] for it in items]
+
+
+def test_place_key_prefers_place_id_then_folded_name_and_address():
+    assert place_key({"placeId": "abc", "title": "X"}) == ("id", "abc")
+    assert place_key({"title": "Café Olé!", "address": "1 Main St."}) == place_key({"name": "cafe ole", "address": "1 main st"})
+    assert place_key({"address": "1 Main St"}) is None
+    assert normalize_text("  Crème—Brûlée  ") == "creme brulee"
+
+
+def test_merge_ranked_interleaves_by_position_and_drops_repeats():
+    pizza = [place("A", placeId="a"), place("B", placeId="b"), place("C", placeId="c")]
+    pasta = [place("B", placeId="b"), place("D", placeId="d")]
+    assert titles(merge_ranked([pizza, pasta, []])) == ["A", "B", "D", "C"]
+
+
+def test_dedupe_keeps_the_variant_with_most_reviews():
+    ranker = PlaceRanker()
+    items = [place("Joe's", reviews=10, placeId="j"), place("Other"), place("Joe's", reviews=900, placeId="j")]
+    deduped = ranker.dedupe(items + ["not a place"])
+    assert titles(deduped) == ["Joe's", "Other"]
+    assert deduped[0]["reviewsCount"] == 900
+
+
+def test_rank_prefers_well_reviewed_quality_and_drops_closed_places():
+    ranker = PlaceRanker()
+    items = [
+        place("Few reviews", score=5.0, reviews=2),
+        place("Solid", score=4.7, reviews=2000),
+        place("Closed", score=5.0, reviews=5000, permanentlyClosed=True),
+        place("Paused", score=4.8, reviews=3000, temporarilyClosed=True),
+    ]
+    ranked = ranker.rank(items)
+    assert "Closed" not in titles(ranked)
+    assert titles(ranked)[0] == "Solid"
+    assert titles(ranked)[-1] == "Paused"
+
+
+def test_rank_penalises_outliers_far_from_the_other_candidates():
+    ranker = PlaceRanker()
+    items = [place(f"Near {i}", lat=30.27 + i / 1000) for i in range(4)] + [place("Far", lat=31.5)]
+    assert titles(ranker.rank(items))[-1] == "Far"
+
+
+def test_rank_returns_top_count_and_keeps_provider_order_on_ties():
+    ranker = PlaceRanker()
+    items = [place(f"P{i}") for i in range(6)]
+    assert titles(ranker.rank(items, count=3)) == ["P0", "P1", "P2"]
+    assert ranker.rank([]) == []
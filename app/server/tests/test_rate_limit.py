@@ -0,0 +1,61 @@
+import asyncio
+from email.utils import formatdate
+import time
+
+import pytest
+
+from agent.graph.rate_limit import TokenBucket, backoff_delay, retry_after_seconds
+
+
+def test_burst_is_free_then_requests_are_spaced():
+    async def scenario():
+        bucket = TokenBucket(rate=10, burst=3)
+        assert [await bucket.acquire(max_wait=0) for _ in range(3)] == [0.0, 0.0, 0.0]
+        # The fourth would have to wait ~1/rate, which max_wait=0 refuses without reserving
+        assert await bucket.acquire(max_wait=0) is None
+        assert bucket.delay() == pytest.approx(0.1, abs=0.02)
+        waited = await bucket.acquire()
+        assert waited == pytest.approx(0.1, abs=0.02)
+
+    asyncio.run(scenario())
+
+
+def test_pause_holds_everyone_back():
+    async def scenario():
+        bucket = TokenBucket(rate=100, burst=5)
+        bucket.pause(0.5)
+        assert bucket.delay() == pytest.approx(0.5, abs=0.05)
+        assert await bucket.acquire(max_wait=0.1) is None
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_its_reservation_back():
+    async def scenario():
+        bucket = TokenBucket(rate=5, burst=1)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        # The waiter holds the next slot, so a newcomer would queue behind it
+        assert bucket.delay() == pytest.approx(0.39, abs=0.03)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert bucket.delay() == pytest.approx(0.19, abs=0.03)
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_seconds_accepts_seconds_and_dates():
+    assert retry_after_seconds("7") == 7.0
+    assert retry_after_seconds(" 1.5 ") == 1.5
+    assert retry_after_seconds("-3") == 0.0
+    assert retry_after_seconds(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+
+
+def test_backoff_delay_is_jittered_under_a_growing_cap():
+    for attempt, cap in ((1, 1.0), (2, 2.0), (3, 4.0), (10, 30.0)):
+        delays = [backoff_delay(attempt, base=1.0, cap=30.0) for _ in range(200)]
+        assert all(0.0 <= d <= cap for d in delays)
+        assert max(delays) > cap / 2
@@ -0,0 +1,75 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from agent.static_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, CachedStaticFiles, _byte_range
+
+
+def test_byte_range_parsing():
+    assert _byte_range("bytes=0-9", 100) == (0, 9)
+    assert _byte_range("bytes=90-", 100) == (90, 99)
+    assert _byte_range("bytes=-10", 100) == (90, 99)
+    assert _byte_range("bytes=-500", 100) == (0, 99)
+    assert _byte_range("bytes=50-500", 100) == (50, 99)
+    # Malformed or multi-range headers are ignored, so the whole file is sent
+    assert _byte_range("bytes=-", 100) is None
+    assert _byte_range("bytes=0-1,5-6", 100) is None
+    assert _byte_range("items=0-1", 100) is None
+    for unsatisfiable in ("bytes=100-", "bytes=9-3", "bytes=-0"):
+        with pytest.raises(ValueError):
+            _byte_range(unsatisfiable, 100)
+
+
+def fetch(directory, *requests):
+    async def scenario():
+        app = Starlette(routes=[Mount("/static", CachedStaticFiles(directory=str(directory)))])
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await client.get(path, headers=headers) for path, headers in requests]
+
+    return asyncio.run(scenario())
+
+
+def test_etag_revalidation_and_ranges(tmp_path):
+    (tmp_path / "app.js").write_bytes(b"0123456789")
+    first, = fetch(tmp_path, ("/static/app.js", {}))
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.content == b"0123456789"
+    assert first.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+
+    not_modified, partial, stale_range, unsatisfiable = fetch(
+        tmp_path,
+        ("/static/app.js", {"if-none-match": etag}),
+        ("/static/app.js", {"range": "bytes=2-4", "if-range": etag}),
+        ("/static/app.js", {"range": "bytes=2-4", "if-range": '"old"'}),
+        ("/static/app.js", {"range": "bytes=20-"}),
+    )
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert partial.status_code == 206 and partial.content == b"234"
+    assert partial.headers["content-range"] == "bytes 2-4/10"
+    # A changed file ignores the range and sends everything
+    assert stale_range.status_code == 200 and stale_range.content == b"0123456789"
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */10"
+
+
+def test_hashed_names_are_immutable_and_siblings_negotiated(tmp_path):
+    (tmp_path / "logo.0123456789abcdef.svg").write_text("<svg/>")
+    (tmp_path / "index.html").write_text("<html>" * 100)
+    (tmp_path / "index.html.gz").write_bytes(gzip.compress(b"<html>" * 100))
+
+    hashed, plain, gzipped = fetch(
+        tmp_path,
+        ("/static/logo.0123456789abcdef.svg", {}),
+        ("/static/index.html", {"accept-encoding": "identity"}),
+        ("/static/index.html", {"accept-encoding": "gzip"}),
+    )
+    assert hashed.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert "content-encoding" not in plain.headers and plain.headers["vary"] == "Accept-Encoding"
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.content == b"<html>" * 100
+    # Each representation has its own validator
+    assert gzipped.headers["etag"] != plain.headers["etag"]
@@ -0,0 +1,81 @@
+from agent.a2ui_templates import restaurant_list_messages
+from agent.surface_state import SurfaceStateStore
+
+
+def items(*names):
+    return [{"name": n, "rating": "★★★★☆", "caption": "Pizza", "location": "Austin"} for n in names]
+
+
+def kinds(messages):
+    return [next(iter(m)) for m in messages]
+
+
+def test_first_turn_passes_through_untouched():
+    store = SurfaceStateStore()
+    messages = restaurant_list_messages(items("A", "B"))
+    assert store.diff("ctx", messages) == messages
+
+
+def test_unchanged_turn_sends_nothing():
+    store = SurfaceStateStore()
+    store.diff("ctx", restaurant_list_messages(items("A", "B")))
+    assert store.diff("ctx", restaurant_list_messages(items("A", "B"))) == []
+
+
+def test_changed_data_is_sent_as_the_changed_paths_only():
+    store = SurfaceStateStore()
+    store.diff("ctx", restaurant_list_messages(items("A", "B")))
+    out = store.diff("ctx", restaurant_list_messages(items("A", "C")))
+    assert kinds(out) == ["dataModelUpdate"]
+    update = out[0]["dataModelUpdate"]
+    assert update["path"] == "/items/1"
+    assert update["contents"] == [{"key": "name", "valueString": "C"}]
+
+
+def test_removed_data_keys_resend_their_level():
+    store = SurfaceStateStore()
+    store.diff("ctx", restaurant_list_messages(items("A", "B", "C")))
+    out = store.diff("ctx", restaurant_list_messages(items("A", "B")))
+    update = out[0]["dataModelUpdate"]
+    # /items lost a key, so it is rewritten from the root, and a root update is always complete
+    assert update["path"] == "/"
+    assert [entry["key"] for entry in update["contents"]] == ["title", "items"]
+    assert len(update["contents"][1]["valueMap"]) == 2
+
+
+def test_changed_component_is_sent_alone():
+    store = SurfaceStateStore()
+    first = restaurant_list_messages(items("A"))
+    store.diff("ctx", first)
+    second = restaurant_list_messages(items("A"), title="Top Pizza")
+    second[1]["surfaceUpdate"]["components"][1]["component"]["Map"]["height"] = "200px"
+    out = store.diff("ctx", second)
+    assert kinds(out) == ["surfaceUpdate", "dataModelUpdate"]
+    assert [c["id"] for c in out[0]["surfaceUpdate"]["components"]] == ["map-view"]
+
+
+def test_surface_that_loses_components_is_deleted_and_resent_whole():
+    store = SurfaceStateStore()
+    store.diff("ctx", restaurant_list_messages(items("A")))
+    smaller = restaurant_list_messages(items("A"))
+    components = smaller[1]["surfaceUpdate"]["components"]
+    smaller[1]["surfaceUpdate"]["components"] = [c for c in components if c["id"] != "map-view"]
+
+    out = store.diff("ctx", smaller)
+
+    assert out[0] == {"deleteSurface": {"surfaceId": "default"}}
+    assert out[1:] == smaller
+    # The resent surface is the new baseline
+    assert store.diff("ctx", smaller) == []
+
+
+def test_contexts_and_full_resend_are_independent():
+    store = SurfaceStateStore(max_contexts=1)
+    messages = restaurant_list_messages(items("A"))
+    store.diff("one", messages)
+    assert store.diff("two", messages) == messages
+    # "one" was evicted, so it renders from scratch again
+    assert store.diff("one", messages) == messages
+    assert store.diff("one", messages, full_resend=True) == messages
+    store.forget("one")
+    assert store.diff("one", messages) == messages